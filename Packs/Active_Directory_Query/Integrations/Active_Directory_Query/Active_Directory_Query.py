@@ -1,8 +1,9 @@
 import demistomock as demisto
 from CommonServerPython import *
 from typing import List, Dict, Optional
-from ldap3 import Server, Connection, NTLM, SUBTREE, ALL_ATTRIBUTES, Tls, Entry
+from ldap3 import Server, Connection, NTLM, SUBTREE, ALL_ATTRIBUTES, Tls
 from ldap3.extend import microsoft
+from ldap3.utils.conv import format_json, escape_filter_chars
 import ssl
 from datetime import datetime
 import traceback
@@ -47,6 +48,19 @@ DEFAULT_COMPUTER_ATTRIBUTES = [
     'memberOf'
 ]
 
+# attribute value types which are kept as is in the entries outputs
+JSON_NATIVE_TYPES = (str, int, float, bool, type(None))
+PAGED_RESULTS_CONTROL = '1.2.840.113556.1.4.319'
+
+# the filter and the name attribute used to find the DN of an object by its name, per object type
+DN_SEARCH_FILTERS = {
+    'user': ('(objectClass=user)', 'sAMAccountName'),
+    'computer': ('(&(objectClass=user)(objectCategory=computer))', 'name'),
+    'group': ('(objectClass=group)', 'cn')
+}
+# the DNs resolved during the current run, per object type, by search base and lower cased name
+DN_CACHE: Dict[str, Dict[tuple, str]] = {object_type: {} for object_type in DN_SEARCH_FILTERS}
+
 ''' HELPER FUNCTIONS '''
 
 
@@ -162,23 +176,62 @@ def search(search_filter, search_base, attributes=None, size_limit=0, time_limit
     return conn.entries
 
 
-def search_with_paging(search_filter, search_base, attributes=None, page_size=100, size_limit=0, time_limit=0):
+def attribute_value_to_json(value):
     """
-    find entries in the DIT
+    converts an ldap3 attribute value to the value it has in the entry JSON (see Entry.entry_to_json)
+    """
+    if isinstance(value, JSON_NATIVE_TYPES):
+        return value
+    # other values (dates, binary values etc.) are rare, convert them exactly like the entry JSON does
+    return json.loads(json.dumps(value, default=format_json))
+
+
+def entry_to_dict(entry):
+    """
+    converts an ldap3 entry to a dict, as if it was loaded from its JSON, without serializing it
+
+    Args:
+        entry: the ldap3 entry
+
+    Returns:
+        dict. the entry dn and attributes
+    """
+    attributes = entry.entry_attributes_as_dict
+    return {
+        'attributes': {
+            attr: [attribute_value_to_json(value) for value in attributes[attr]] for attr in sorted(attributes)
+        },
+        'dn': entry.entry_dn
+    }
+
+
+def flatten_entry(raw_entry):
+    flat_entry = {
+        'dn': raw_entry['dn']
+    }
+    flat_entry.update(raw_entry.get('attributes', {}))
+    return flat_entry
+
+
+def iter_search_with_paging(search_filter, search_base, attributes=None, page_size=100, size_limit=0, time_limit=0):
+    """
+    find entries in the DIT, yielding them page by page
 
     Args:
         search_base: the location in the DIT where the search will start
         search_filte: LDAP query string
-        attributes: the attributes to specify for each entrxy found in the DIT
+        attributes: the attributes to specify for each entry found in the DIT
 
+    Returns:
+        generator of the raw entries, as dicts with the entry dn and attributes
     """
     assert conn is not None
     total_entries = 0
     cookie = None
     start = datetime.now()
 
-    entries: List[Entry] = []
     entries_left_to_fetch = size_limit
+    yielded_entries = 0
     while True:
         if 0 < entries_left_to_fetch < page_size:
             page_size = entries_left_to_fetch
@@ -194,32 +247,39 @@ def search_with_paging(search_filter, search_base, attributes=None, page_size=10
 
         entries_left_to_fetch -= len(conn.entries)
         total_entries += len(conn.entries)
-        cookie = conn.result['controls']['1.2.840.113556.1.4.319']['value']['cookie']
-        time_diff = (start - datetime.now()).seconds
+        cookie = conn.result['controls'][PAGED_RESULTS_CONTROL]['value']['cookie']
+        time_diff = (datetime.now() - start).seconds
 
-        entries.extend(conn.entries)
+        for entry in conn.entries:
+            if size_limit and yielded_entries >= size_limit:
+                return
+            yielded_entries += 1
+            yield entry_to_dict(entry)
 
         # stop when: 1.reached size limit 2.reached time limit 3. no cookie
         if (size_limit and size_limit <= total_entries) or (time_limit and time_diff >= time_limit) or (not cookie):
             break
 
+
+def search_with_paging(search_filter, search_base, attributes=None, page_size=100, size_limit=0, time_limit=0):
+    """
+    find entries in the DIT
+
+    Args:
+        search_base: the location in the DIT where the search will start
+        search_filte: LDAP query string
+        attributes: the attributes to specify for each entrxy found in the DIT
+
+    """
     # keep the raw entry for raw content (backward compatability)
     raw = []
     # flaten the entries
     flat = []
 
-    for entry in entries:
-        entry = json.loads(entry.entry_to_json())
-
-        flat_entry = {
-            'dn': entry['dn']
-        }
-
-        for attr in entry.get('attributes', {}):
-            flat_entry[attr] = entry['attributes'][attr]
-
+    for entry in iter_search_with_paging(search_filter, search_base, attributes=attributes, page_size=page_size,
+                                         size_limit=size_limit, time_limit=time_limit):
         raw.append(entry)
-        flat.append(flat_entry)
+        flat.append(flatten_entry(entry))
 
     return {
         "raw": raw,
@@ -227,40 +287,47 @@ def search_with_paging(search_filter, search_base, attributes=None, page_size=10
     }
 
 
+def resolve_dns(object_type, names, search_base):
+    """
+    finds the DNs of objects by their names, with a single search for all the names which were not resolved yet
+
+    Args:
+        object_type: the type of the objects - user, computer or group
+        names: the names of the objects (sAMAccountName for users)
+        search_base: the location in the DIT where the search will start
+
+    Returns:
+        list. the DNs of the objects, in the same order as the names
+    """
+    cache = DN_CACHE[object_type]
+    object_filter, name_attribute = DN_SEARCH_FILTERS[object_type]
+
+    names_to_search = list(OrderedDict.fromkeys(name for name in names if (search_base, name.lower()) not in cache))
+    if names_to_search:
+        names_filter = ''.join('({}={})'.format(name_attribute, escape_filter_chars(name)) for name in names_to_search)
+        search_filter = '(&{}(|{}))'.format(object_filter, names_filter)
+        for entry in iter_search_with_paging(search_filter, search_base, attributes=[name_attribute]):
+            for name in entry['attributes'].get(name_attribute, []):
+                cache.setdefault((search_base, name.lower()), entry['dn'])
+
+    unresolved_names = [name for name in names if (search_base, name.lower()) not in cache]
+    if unresolved_names:
+        raise Exception("Could not get full DN for {} with {} '{}'".format(
+            object_type, name_attribute if object_type == 'user' else 'name', "', '".join(unresolved_names)))
+
+    return [cache[(search_base, name.lower())] for name in names]
+
+
 def user_dn(sam_account_name, search_base):
-    search_filter = '(&(objectClass=user)(sAMAccountName={}))'.format(sam_account_name)
-    entries = search(
-        search_filter,
-        search_base
-    )
-    if not entries:
-        raise Exception("Could not get full DN for user with sAMAccountName '{}'".format(sam_account_name))
-    entry = json.loads(entries[0].entry_to_json())
-    return entry['dn']
+    return resolve_dns('user', [sam_account_name], search_base)[0]
 
 
 def computer_dn(compuer_name, search_base):
-    search_filter = '(&(objectClass=user)(objectCategory=computer)(name={}))'.format(compuer_name)
-    entries = search(
-        search_filter,
-        search_base
-    )
-    if not entries:
-        raise Exception("Could not get full DN for computer with name '{}'".format(compuer_name))
-    entry = json.loads(entries[0].entry_to_json())
-    return entry['dn']
+    return resolve_dns('computer', [compuer_name], search_base)[0]
 
 
 def group_dn(group_name, search_base):
-    search_filter = '(&(objectClass=group)(cn={}))'.format(group_name)
-    entries = search(
-        search_filter,
-        search_base
-    )
-    if not entries:
-        raise Exception("Could not get full DN for group with name '{}'".format(group_name))
-    entry = json.loads(entries[0].entry_to_json())
-    return entry['dn']
+    return resolve_dns('group', [group_name], search_base)[0]
 
 
 def convert_special_chars_to_unicode(search_filter):
@@ -359,30 +426,31 @@ def search_users(default_base_dn, page_size):
 
     attributes = list(set(custom_attributes + DEFAULT_PERSON_ATTRIBUTES))
 
-    entries = search_with_paging(
-        query,
-        default_base_dn,
-        attributes=attributes,
-        size_limit=limit,
-        page_size=page_size
-    )
-
-    accounts = [account_entry(entry, custom_attributes) for entry in entries['flat']]
-
-    if args.get('user-account-control-out', '') == 'true':
-        # display a literal translation of the numeric account control flag
-        for i, user in enumerate(entries['flat']):
+    account_control_out = args.get('user-account-control-out', '') == 'true'
+    raw_entries = []
+    users = []
+    accounts = []
+    for entry in iter_search_with_paging(query, default_base_dn, attributes=attributes, size_limit=limit,
+                                         page_size=page_size):
+        user = flatten_entry(entry)
+        accounts.append(account_entry(user, custom_attributes))
+
+        if account_control_out:
+            # display a literal translation of the numeric account control flag
             flag_no = user.get('userAccountControl')[0]
-            entries['flat'][i]['userAccountControl'] = COOMON_ACCOUNT_CONTROL_FLAGS.get(flag_no) or flag_no
+            user['userAccountControl'] = COOMON_ACCOUNT_CONTROL_FLAGS.get(flag_no) or flag_no
+
+        raw_entries.append(entry)
+        users.append(user)
 
     demisto_entry = {
         'ContentsFormat': formats['json'],
         'Type': entryTypes['note'],
-        'Contents': entries['raw'],
+        'Contents': raw_entries,
         'ReadableContentsFormat': formats['markdown'],
-        'HumanReadable': tableToMarkdown("Active Directory - Get Users", entries['flat']),
+        'HumanReadable': tableToMarkdown("Active Directory - Get Users", users),
         'EntryContext': {
-            'ActiveDirectory.Users(obj.dn == val.dn)': entries['flat'],
+            'ActiveDirectory.Users(obj.dn == val.dn)': users,
             # 'backward compatability' with ADGetUser script
             'Account(obj.ID == val.ID)': accounts
         }
@@ -464,21 +532,24 @@ def search_group_members(default_base_dn, page_size):
     query = "(&(objectCategory={})(objectClass=user)(memberOf:1.2.840.113556.1.4.1941:={}))".format(member_type,
                                                                                                     group_dn)
 
-    entries = search_with_paging(
-        query,
-        default_base_dn,
-        attributes=attributes,
-        page_size=page_size
-    )
-
-    members = [{'dn': entry['dn'], 'category': member_type} for entry in entries['flat']]
+    entry_to_context = account_entry if member_type == 'person' else endpoint_entry
+    raw_entries = []
+    flat_entries = []
+    members = []
+    members_context = []
+    for entry in iter_search_with_paging(query, default_base_dn, attributes=attributes, page_size=page_size):
+        flat_entry = flatten_entry(entry)
+        members.append({'dn': flat_entry['dn'], 'category': member_type})
+        members_context.append(entry_to_context(flat_entry, custome_attributes))
+        raw_entries.append(entry)
+        flat_entries.append(flat_entry)
 
     demisto_entry = {
         'ContentsFormat': formats['json'],
         'Type': entryTypes['note'],
-        'Contents': entries['raw'],
+        'Contents': raw_entries,
         'ReadableContentsFormat': formats['markdown'],
-        'HumanReadable': tableToMarkdown("Active Directory - Get Group Members", entries['flat']),
+        'HumanReadable': tableToMarkdown("Active Directory - Get Group Members", flat_entries),
         'EntryContext': {
             'ActiveDirectory.Groups(obj.dn ==' + group_dn + ')': {
                 'dn': group_dn,
@@ -488,13 +559,11 @@ def search_group_members(default_base_dn, page_size):
     }
 
     if member_type == 'person':
-        demisto_entry['EntryContext']['ActiveDirectory.Users(obj.dn == val.dn)'] = entries['flat']
-        demisto_entry['EntryContext']['Account'] = [account_entry(
-            entry, custome_attributes) for entry in entries['flat']]
+        demisto_entry['EntryContext']['ActiveDirectory.Users(obj.dn == val.dn)'] = flat_entries
+        demisto_entry['EntryContext']['Account'] = members_context
     else:
-        demisto_entry['EntryContext']['ActiveDirectory.Computers(obj.dn == val.dn)'] = entries['flat']
-        demisto_entry['EntryContext']['Endpoint'] = [endpoint_entry(
-            entry, custome_attributes) for entry in entries['flat']]
+        demisto_entry['EntryContext']['ActiveDirectory.Computers(obj.dn == val.dn)'] = flat_entries
+        demisto_entry['EntryContext']['Endpoint'] = members_context
 
     demisto.results(demisto_entry)
 
@@ -890,6 +959,43 @@ def remove_member_from_group(default_base_dn):
     demisto.results(demisto_entry)
 
 
+def modify_members_of_groups(default_base_dn, remove=False):
+
+    args = demisto.args()
+
+    search_base = args.get('base-dn') or default_base_dn
+
+    usernames = argToList(args.get('usernames'))
+    computer_names = argToList(args.get('computer-names'))
+    group_cns = argToList(args.get('group-cns'))
+    if not usernames and not computer_names:
+        raise Exception("Please provide usernames or computer-names")
+
+    # resolve all the DNs with one search per object type
+    member_dns = resolve_dns('user', usernames, search_base) + resolve_dns('computer', computer_names, search_base)
+    group_dns = resolve_dns('group', group_cns, search_base)
+
+    if remove:
+        success = microsoft.removeMembersFromGroups.ad_remove_members_from_groups(conn, member_dns, group_dns, True)
+    else:
+        success = microsoft.addMembersToGroups.ad_add_members_to_groups(conn, member_dns, group_dns)
+    if not success:
+        raise Exception("Failed to {} {} {} groups {}".format(
+            'remove' if remove else 'add',
+            ', '.join(usernames + computer_names),
+            'from' if remove else 'to',
+            ', '.join(group_cns)
+        ))
+
+    demisto_entry = {
+        'ContentsFormat': formats['text'],
+        'Type': entryTypes['note'],
+        'Contents': "Objects with dns {} were {} groups {}".format(
+            ', '.join(member_dns), 'removed from' if remove else 'added to', ', '.join(group_cns))
+    }
+    demisto.results(demisto_entry)
+
+
 def unlock_account(default_base_dn):
     args = demisto.args()
 
@@ -1054,6 +1160,12 @@ def main():
         if demisto.command() == 'ad-add-to-group':
             add_member_to_group(DEFAULT_BASE_DN)
 
+        if demisto.command() == 'ad-add-members-to-groups':
+            modify_members_of_groups(DEFAULT_BASE_DN)
+
+        if demisto.command() == 'ad-remove-members-from-groups':
+            modify_members_of_groups(DEFAULT_BASE_DN, remove=True)
+
         if demisto.command() == 'ad-create-user':
             create_user()
 
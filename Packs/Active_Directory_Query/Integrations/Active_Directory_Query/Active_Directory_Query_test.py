@@ -0,0 +1,146 @@
+import json
+from datetime import datetime
+
+import demistomock as demisto
+import pytest
+from ldap3 import Server, Connection, MOCK_SYNC, OFFLINE_AD_2012_R2
+
+import Active_Directory_Query
+
+BASE_DN = 'dc=demisto,dc=test'
+
+
+@pytest.fixture
+def mock_connection(mocker):
+    connection = Connection(Server('fake', get_info=OFFLINE_AD_2012_R2), user='cn=admin,{}'.format(BASE_DN),
+                            password='password', client_strategy=MOCK_SYNC)
+    for i in range(5):
+        connection.strategy.add_entry('cn=user{},ou=users,{}'.format(i, BASE_DN), {
+            'objectClass': ['top', 'person', 'user'],
+            'objectCategory': 'person',
+            'sAMAccountName': 'user{}'.format(i),
+            'name': 'user{}'.format(i),
+            'mail': 'user{}@demisto.test'.format(i),
+            'memberOf': ['cn=group,{}'.format(BASE_DN)],
+            'userAccountControl': 512 if i % 2 else 514,
+            'whenCreated': datetime(2020, 1, 1, 12, 0, i),
+            'objectGUID': b'\xff\x00user' + str(i).encode()
+        })
+    for group in ('Users', 'Admins'):
+        connection.strategy.add_entry('cn={},ou=groups,{}'.format(group, BASE_DN), {
+            'objectClass': ['top', 'group'],
+            'cn': group
+        })
+    connection.bind()
+    mocker.patch.object(Active_Directory_Query, 'conn', connection)
+    mocker.patch.dict(Active_Directory_Query.DN_CACHE, {object_type: {} for object_type in
+                                                        Active_Directory_Query.DN_SEARCH_FILTERS})
+    return connection
+
+
+def test_entry_to_dict(mock_connection):
+    """
+    Given:
+        - LDAP entries with string, integer, datetime and binary attributes.
+    When:
+        - Converting the entries to dicts.
+    Then:
+        - The dicts are identical to the entries JSON.
+    """
+    mock_connection.search(BASE_DN, '(objectClass=user)', attributes=['*'])
+    for entry in mock_connection.entries:
+        assert Active_Directory_Query.entry_to_dict(entry) == json.loads(entry.entry_to_json())
+
+
+def test_iter_search_with_paging(mock_connection):
+    """
+    Given:
+        - 5 users in the directory.
+    When:
+        - Searching with a page size of 2, with and without a size limit.
+    Then:
+        - The entries of all the pages are yielded, up to the size limit.
+    """
+    entries = list(Active_Directory_Query.iter_search_with_paging('(objectClass=user)', BASE_DN,
+                                                                  attributes=['name'], page_size=2))
+    assert sorted(entry['dn'] for entry in entries) == ['cn=user{},ou=users,{}'.format(i, BASE_DN) for i in range(5)]
+
+    entries = list(Active_Directory_Query.iter_search_with_paging('(objectClass=user)', BASE_DN,
+                                                                  attributes=['name'], page_size=2, size_limit=3))
+    assert len(entries) == 3
+
+
+def test_search_users(mocker, mock_connection):
+    """
+    Given:
+        - 5 users in the directory.
+    When:
+        - Running ad-get-user with a literal translation of the account control flag.
+    Then:
+        - The raw entries, the users and the accounts are returned for all of the users.
+    """
+    mocker.patch.object(demisto, 'args', return_value={'user-account-control-out': 'true'})
+    results = mocker.patch.object(demisto, 'results')
+
+    Active_Directory_Query.search_users(BASE_DN, 2)
+
+    entry = results.call_args[0][0]
+    users = entry['EntryContext']['ActiveDirectory.Users(obj.dn == val.dn)']
+    accounts = entry['EntryContext']['Account(obj.ID == val.ID)']
+    assert len(entry['Contents']) == len(users) == len(accounts) == 5
+    assert {user['userAccountControl'] for user in users} == {'Enabled Account', 'Disabled account'}
+    assert {account['Username'][0] for account in accounts} == {'user{}'.format(i) for i in range(5)}
+
+
+def test_resolve_dns(mocker, mock_connection):
+    """
+    Given:
+        - Users in the directory.
+    When:
+        - Resolving the DNs of some users, and then of the same users again.
+    Then:
+        - All the DNs are resolved with a single search, the second resolution is served from the cache,
+          and a user which does not exist fails the resolution.
+    """
+    search = mocker.spy(mock_connection, 'search')
+
+    dns = Active_Directory_Query.resolve_dns('user', ['user1', 'USER3', 'user1'], BASE_DN)
+    assert dns == ['cn=user1,ou=users,{}'.format(BASE_DN), 'cn=user3,ou=users,{}'.format(BASE_DN),
+                   'cn=user1,ou=users,{}'.format(BASE_DN)]
+    assert Active_Directory_Query.user_dn('user3', BASE_DN) == 'cn=user3,ou=users,{}'.format(BASE_DN)
+    assert search.call_count == 1
+
+    with pytest.raises(Exception, match="Could not get full DN for user with sAMAccountName 'nobody'"):
+        Active_Directory_Query.resolve_dns('user', ['user1', 'nobody'], BASE_DN)
+
+
+@pytest.mark.parametrize('command_args, remove', [
+    ({'usernames': 'user1,user2', 'group-cns': 'Users,Admins'}, False),
+    ({'usernames': 'user1,user2', 'group-cns': 'Users,Admins'}, True)
+])
+def test_modify_members_of_groups(mocker, mock_connection, command_args, remove):
+    """
+    Given:
+        - Users and groups in the directory.
+    When:
+        - Adding or removing a list of users to/from a list of groups.
+    Then:
+        - The DNs are resolved with one search per object type and the membership is modified with a single call.
+    """
+    mocker.patch.object(demisto, 'args', return_value=command_args)
+    mocker.patch.object(demisto, 'results')
+    search = mocker.spy(mock_connection, 'search')
+    microsoft = Active_Directory_Query.microsoft
+    add_members = mocker.patch.object(microsoft.addMembersToGroups, 'ad_add_members_to_groups', return_value=True)
+    remove_members = mocker.patch.object(microsoft.removeMembersFromGroups, 'ad_remove_members_from_groups',
+                                         return_value=True)
+
+    Active_Directory_Query.modify_members_of_groups(BASE_DN, remove=remove)
+
+    modify_members = remove_members if remove else add_members
+    assert modify_members.call_count == 1
+    assert modify_members.call_args[0][1:3] == (
+        ['cn=user1,ou=users,{}'.format(BASE_DN), 'cn=user2,ou=users,{}'.format(BASE_DN)],
+        ['cn=Users,ou=groups,{}'.format(BASE_DN), 'cn=Admins,ou=groups,{}'.format(BASE_DN)]
+    )
+    assert search.call_count == 2
@@ -17,32 +17,9 @@ def auto_detect_indicator_type(indicator_value):
     Returns:
         str. The type of the indicator.
     """
-    if re.match(ipv4cidrRegex, indicator_value):
-        return FeedIndicatorType.CIDR
-
-    if re.match(ipv6cidrRegex, indicator_value):
-        return FeedIndicatorType.IPv6CIDR
-
-    if re.match(ipv4Regex, indicator_value):
-        return FeedIndicatorType.IP
-
-    if re.match(ipv6Regex, indicator_value):
-        return FeedIndicatorType.IPv6
-
-    if re.match(sha256Regex, indicator_value):
-        return FeedIndicatorType.File
-
-    if re.match(urlRegex, indicator_value):
-        return FeedIndicatorType.URL
-
-    if re.match(md5Regex, indicator_value):
-        return FeedIndicatorType.File
-
-    if re.match(sha1Regex, indicator_value):
-        return FeedIndicatorType.File
-
-    if re.match(emailRegex, indicator_value):
-        return FeedIndicatorType.Email
+    indicator_type = detect_indicator_type(indicator_value)
+    if indicator_type:
+        return indicator_type
 
     try:
         if tldextract.extract(indicator_value).suffix:
@@ -1901,10 +1901,82 @@ sha256Regex = re.compile(r'\b[0-9a-fA-F]{64}\b', regexFlags)
 
 pascalRegex = re.compile('([A-Z]?[a-z]+)')
 
+_ipv4cidrPattern = re.compile(ipv4cidrRegex)
+_ipv6cidrPattern = re.compile(ipv6cidrRegex)
+_ipv4Pattern = re.compile(ipv4Regex)
+_ipv6Pattern = re.compile(ipv6Regex)
+_urlPattern = re.compile(urlRegex)
+_emailPattern = re.compile(emailRegex)
+_fileHashPattern = re.compile(r'\b(?:[0-9a-fA-F]{32}|[0-9a-fA-F]{40}|[0-9a-fA-F]{64})\b')
+
+_DIGIT_CHARS = frozenset('0123456789')
+_HEX_CHARS = frozenset('0123456789abcdefABCDEF')
+_URL_PREFIXES = ('htt', 'hxx', 'ftp', 'www')
+
 
 # ############################## REGEX FORMATTING end ###############################
 
 
+def detect_indicator_type(indicator_value):
+    """Infers the type of an indicator from its value.
+
+    The value is first dispatched on its leading characters and a few separator characters, so at
+    most one or two of the indicator regexes are actually evaluated for any given value. The regexes
+    are matched from the start of the value, exactly like ``re.match`` with the module level patterns.
+
+    :type indicator_value: ``str``
+    :param indicator_value: The indicator whose type we want to detect.
+
+    :rtype: ``str``
+    :return: Indicator type from FeedIndicatorType, or None if the type could not be detected.
+    """
+    if not indicator_value or not isinstance(indicator_value, STRING_OBJ_TYPES):
+        return None
+
+    first_char = indicator_value[0]
+    is_hex_start = first_char in _HEX_CHARS
+    # an IPv4 address has a (possibly defanged) dot after at most three digits
+    is_ipv4_like = first_char in _DIGIT_CHARS and ('.' in indicator_value[:4] or '[' in indicator_value[:4])
+    # an IPv6 address has a colon after at most four hex digits
+    is_ipv6_like = is_hex_start and ':' in indicator_value[:5]
+
+    if is_ipv4_like:
+        if '/' in indicator_value and _ipv4cidrPattern.match(indicator_value):
+            return FeedIndicatorType.CIDR
+        if _ipv4Pattern.match(indicator_value):
+            return FeedIndicatorType.IP
+
+    elif is_ipv6_like:
+        if '/' in indicator_value and _ipv6cidrPattern.match(indicator_value):
+            return FeedIndicatorType.IPv6CIDR
+        if _ipv6Pattern.match(indicator_value):
+            return FeedIndicatorType.IPv6
+
+    elif is_hex_start and len(indicator_value) >= 32 and _fileHashPattern.match(indicator_value):
+        return FeedIndicatorType.File
+
+    if indicator_value[:3] in _URL_PREFIXES and _urlPattern.match(indicator_value):
+        return FeedIndicatorType.URL
+
+    if '@' in indicator_value and _emailPattern.match(indicator_value):
+        return FeedIndicatorType.Email
+
+    return None
+
+
+def detect_indicator_types(indicator_values):
+    """Infers the types of a list of indicators, see ``detect_indicator_type``.
+
+    :type indicator_values: ``list``
+    :param indicator_values: The indicators whose types we want to detect.
+
+    :rtype: ``list``
+    :return: The indicator types, in the same order as the given values.
+    """
+    detect = detect_indicator_type
+    return [detect(indicator_value) for indicator_value in indicator_values]
+
+
 def underscoreToCamelCase(s):
     """
        Convert an underscore separated string to camel case
@@ -14,7 +14,8 @@ from CommonServerPython import xml2json, json2xml, entryTypes, formats, tableToM
     remove_nulls_from_dictionary, is_error, get_error, hash_djb2, fileResult, is_ip_valid, get_demisto_version, \
     IntegrationLogger, parse_date_string, IS_PY3, DebugLogger, b64_encode, parse_date_range, return_outputs, \
     argToBoolean, ipv4Regex, ipv4cidrRegex, ipv6cidrRegex, ipv6Regex, batch, FeedIndicatorType, \
-    encode_string_results, safe_load_json, remove_empty_elements, aws_table_to_markdown
+    encode_string_results, safe_load_json, remove_empty_elements, aws_table_to_markdown, detect_indicator_type, \
+    detect_indicator_types
 
 try:
     from StringIO import StringIO
@@ -1213,6 +1214,38 @@ def test_ip_to_indicator(ip, indicator_type):
     assert FeedIndicatorType.ip_to_indicator_type(ip) is indicator_type
 
 
+INDICATOR_VALUE_TO_TYPE = [
+    ('192.168.1.1', FeedIndicatorType.IP),
+    ('192.168.1.1/32', FeedIndicatorType.CIDR),
+    ('192[.]168[.]1[.]1/32', FeedIndicatorType.CIDR),
+    ('2001:db8:a0b:12f0::1', FeedIndicatorType.IPv6),
+    ('2001:db8:a0b:12f0::1/64', FeedIndicatorType.IPv6CIDR),
+    ('fe80::1%eth0', FeedIndicatorType.IPv6),
+    ('d41d8cd98f00b204e9800998ecf8427e', FeedIndicatorType.File),
+    ('da39a3ee5e6b4b0d3255bfef95601890afd80709', FeedIndicatorType.File),
+    ('e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855', FeedIndicatorType.File),
+    ('https://www.example.com/path?q=1', FeedIndicatorType.URL),
+    ('hxxp://example[.]com', FeedIndicatorType.URL),
+    ('www.example.com', FeedIndicatorType.URL),
+    ('user@example.com', FeedIndicatorType.Email),
+    ('d41d8cd98f00b204e9800998ecf8427', None),
+    ('192.168.1', None),
+    ('example.com', None),
+    ('', None),
+    (None, None),
+]
+
+
+@pytest.mark.parametrize('indicator_value, indicator_type', INDICATOR_VALUE_TO_TYPE)
+def test_detect_indicator_type(indicator_value, indicator_type):
+    assert detect_indicator_type(indicator_value) == indicator_type
+
+
+def test_detect_indicator_types():
+    values = [value for value, _ in INDICATOR_VALUE_TO_TYPE]
+    assert detect_indicator_types(values) == [indicator_type for _, indicator_type in INDICATOR_VALUE_TO_TYPE]
+
+
 data_test_b64_encode = [
     (u'test', 'dGVzdA=='),
     ('test', 'dGVzdA=='),
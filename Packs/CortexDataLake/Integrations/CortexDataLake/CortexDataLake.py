@@ -9,7 +9,7 @@ import json
 from pancloud import QueryService, Credentials, exceptions
 import base64
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from typing import Dict, Any, List, Tuple, Callable
+from typing import Dict, Any, List, Tuple, Callable, Iterator, Optional
 
 # disable insecure warnings
 requests.packages.urllib3.disable_warnings()
@@ -46,30 +46,34 @@ class Client(BaseClient):
         self.trust_env = proxy
         self._get_access_token()
 
-    def _get_access_token(self):
+    def _get_access_token(self, force_refresh: bool = False):
         """
-        Checks if access token exists in the integration context and return it if it exists, if not, a new token
+        Checks if a valid access token exists in the integration context and uses it if it exists, if not, a new token
         is generated and saved in the integration context along with the query api_url and the instance_id
-        Returns:
-            The access token from the integration context or from the request.
+        Args:
+            force_refresh: Whether to generate a new token even if the token in the integration context is valid,
+                e.g. when it was rejected by the API.
         """
         integration_context = demisto.getIntegrationContext()
         access_token = integration_context.get(ACCESS_TOKEN_CONST)
         valid_until = integration_context.get(EXPIRES_IN)
-        if access_token and valid_until:
-            if int(time.time()) < valid_until:
-                self.access_token = access_token
-                self.api_url = integration_context.get(API_URL_CONST, DEFAULT_API_URL)
-                self.instance_id = integration_context.get(INSTANCE_ID_CONST)
+        if not force_refresh and access_token and valid_until and int(time.time()) < valid_until:
+            self.access_token = access_token
+            self.api_url = integration_context.get(API_URL_CONST, DEFAULT_API_URL)
+            self.instance_id = integration_context.get(INSTANCE_ID_CONST)
+            return
+
         access_token, api_url, instance_id, refresh_token, expires_in = self._oproxy_authorize()
-        updated_integration_context = {
+        updated_integration_context = dict(integration_context)
+        updated_integration_context.update({
             ACCESS_TOKEN_CONST: access_token,
             EXPIRES_IN: int(time.time()) + expires_in - SECONDS_30,
             API_URL_CONST: api_url,
             INSTANCE_ID_CONST: instance_id
-        }
+        })
         if refresh_token:
             updated_integration_context.update({REFRESH_TOKEN_CONST: refresh_token})
+            self.refresh_token = refresh_token
         demisto.setIntegrationContext(updated_integration_context)
         self.access_token = access_token
         self.api_url = api_url
@@ -98,12 +102,33 @@ class Client(BaseClient):
             query: The sql string query.
 
         Returns:
-            A list of records according to the query
+            A list of records according to the query and the raw result pages
+        """
+        raw_results: List[dict] = []
+        records = list(self.iter_query_loggings(query, raw_results))
+        return records, raw_results
+
+    def iter_query_loggings(self, query: str, raw_results: Optional[list] = None) -> Iterator[dict]:
+        """
+        Queries the Cortex Logging service and yields the records page by page, as the result pages are retrieved
+
+        Args:
+            query: The sql string query.
+            raw_results: A list to append the raw result pages to, the raw pages are not kept if not given.
+
+        Returns:
+            A generator of the records according to the query
         """
         query_data = {'query': self.add_instance_id_to_query(query),
                       'language': 'csql'}
         query_service = self.initial_query_service()
         response = query_service.create_query(query_params=query_data, enforce_json=True)
+        if response.status_code == 401:
+            # the access token was revoked or expired before its expiry time, generate a new one and retry
+            self._get_access_token(force_refresh=True)
+            query_data['query'] = self.add_instance_id_to_query(query)
+            query_service = self.initial_query_service()
+            response = query_service.create_query(query_params=query_data, enforce_json=True)
         query_result = response.json()
 
         if not response.ok:
@@ -112,21 +137,19 @@ class Client(BaseClient):
             raise DemistoException(f'Error in query to Cortex Data Lake [{status_code}] - {error_message}')
 
         try:
-            raw_results = [r.json() for r in query_service.iter_job_results(job_id=query_result.get('jobId'),
-                                                                            result_format='valuesDictionary',
-                                                                            max_wait=2000)]
+            for page_response in query_service.iter_job_results(job_id=query_result.get('jobId'),
+                                                                result_format='valuesDictionary',
+                                                                max_wait=2000):
+                result = page_response.json()
+                if raw_results is not None:
+                    raw_results.append(result)
+                page = result.get('page', {})
+                data = page.get('result', {}).get('data', [])
+                if data:
+                    yield from data
         except exceptions.HTTPError as e:
             raise DemistoException(f'Received error {str(e)} when querying logs.')
 
-        extended_results: List[Dict] = []
-        for result in raw_results:
-            page = result.get('page', {})
-            data = page.get('result', {}).get('data', [])
-            if data:
-                extended_results.extend(data)
-
-        return extended_results, raw_results
-
     def initial_query_service(self) -> QueryService:
         credentials = Credentials(
             access_token=self.access_token,
@@ -513,7 +536,8 @@ def convert_log_to_incident(log: dict) -> dict:
 
 def test_module(client: Client):
     query = 'SELECT * FROM `firewall.traffic` limit 1'
-    client.query_loggings(query)
+    for _ in client.iter_query_loggings(query):
+        pass
     return_outputs('ok')
 
 
@@ -705,13 +729,15 @@ def fetch_incidents(client: Client,
         last_fetched_event_timestamp = last_fetched_event_timestamp.replace(microsecond=0)
     query = prepare_fetch_incidents_query(last_fetched_event_timestamp, fetch_severity, fetch_subtype, fetch_limit)
     demisto.debug('Query being fetched: {}'.format(query))
-    records, _ = client.query_loggings(query)
-    if not records:
+    incidents = []
+    max_fetched_event_timestamp = 0
+    for record in client.iter_query_loggings(query):
+        incidents.append(convert_log_to_incident(record))
+        max_fetched_event_timestamp = max(max_fetched_event_timestamp, record.get('time_generated', 0))
+
+    if not incidents:
         return {'lastRun': str(last_fetched_event_timestamp)}, []
 
-    incidents = [convert_log_to_incident(record) for record in records]
-    max_fetched_event_timestamp = max(records, key=lambda record: record.get('time_generated', 0)).get('time_generated',
-                                                                                                       0)
     next_run = {'lastRun': human_readable_time_from_epoch_time(max_fetched_event_timestamp)}
     return next_run, incidents
 
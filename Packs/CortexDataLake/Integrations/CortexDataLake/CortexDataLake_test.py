@@ -105,3 +105,148 @@ def test_get_table_name():
     records = [{'log_type': {'id': 3, 'value': 'threat'}},
                {'log_type': {'id': 3, 'value': 'traffic'}}]
     assert get_table_name(records) == 'threat'
+
+
+def test_access_token_reuse(mocker, requests_mock):
+    """
+    Given:
+        - A valid access token cached in the integration context by a previous client.
+    When:
+        - Constructing consecutive clients, then constructing a client after the token expired,
+          then forcing a refresh as done when the API rejects the token.
+    Then:
+        - The token is retrieved from the token proxy only once for the consecutive clients,
+          and again on expiry and when a refresh is forced.
+    """
+    import base64
+    import time
+    import demistomock as demisto
+    from CortexDataLake import Client, EXPIRES_IN
+    integration_context: dict = {}
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=lambda: dict(integration_context))
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=integration_context.update)
+    token_request = requests_mock.post('https://oproxy.test/cdl-token', json={
+        'access_token': 'access_token', 'url': 'https://api.cdl.test', 'instance_id': 'instance_id',
+        'refresh_token': 'new_refresh_token', 'expires_in': 3600
+    })
+    enc_key = base64.b64encode(b'k' * 32).decode()
+
+    for _ in range(3):
+        client = Client('https://oproxy.test', 'reg_id', True, False, 'refresh_token', enc_key)
+        assert client.access_token == 'access_token'
+        assert client.instance_id == 'instance_id'
+    assert token_request.call_count == 1
+    assert integration_context['refresh_token'] == 'new_refresh_token'
+
+    integration_context[EXPIRES_IN] = int(time.time()) - 1
+    client = Client('https://oproxy.test', 'reg_id', True, False, 'refresh_token', enc_key)
+    assert token_request.call_count == 2
+
+    client._get_access_token(force_refresh=True)
+    assert token_request.call_count == 3
+
+
+def test_query_loggings_refreshes_rejected_token(mocker, requests_mock):
+    """
+    Given:
+        - A cached access token which the query API rejects with 401.
+    When:
+        - Querying logs.
+    Then:
+        - A new token is retrieved and the query is sent again with it.
+    """
+    import base64
+    import time
+    import demistomock as demisto
+    from CortexDataLake import Client, QueryService
+    integration_context = {'access_token': 'revoked_token', 'expires_in': int(time.time()) + 600,
+                           'api_url': 'https://api.cdl.test', 'instance_id': 'instance_id'}
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=lambda: dict(integration_context))
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=integration_context.update)
+    token_request = requests_mock.post('https://oproxy.test/cdl-token', json={
+        'access_token': 'access_token', 'url': 'https://api.cdl.test', 'instance_id': 'instance_id'
+    })
+    credentials = mocker.patch('CortexDataLake.Credentials')
+    rejected = mocker.Mock(ok=False, status_code=401)
+    accepted = mocker.Mock(ok=True, status_code=200)
+    accepted.json.return_value = {'jobId': 'job_id'}
+    create_query = mocker.patch.object(QueryService, 'create_query', side_effect=[rejected, accepted])
+    page = mocker.Mock()
+    page.json.return_value = {'page': {'result': {'data': [{'id': 1}]}}}
+    mocker.patch.object(QueryService, 'iter_job_results', return_value=iter([page]))
+
+    client = Client('https://oproxy.test', 'reg_id', True, False, 'refresh_token',
+                    base64.b64encode(b'k' * 32).decode())
+    assert token_request.call_count == 0
+
+    records, _ = client.query_loggings('SELECT * FROM `firewall.traffic`')
+
+    assert records == [{'id': 1}]
+    assert token_request.call_count == 1
+    assert create_query.call_count == 2
+    assert credentials.call_args[1]['access_token'] == 'access_token'
+
+
+def test_fetch_incidents_streams_records(mocker):
+    """
+    Given:
+        - Query results split into 2 pages.
+    When:
+        - Fetching incidents.
+    Then:
+        - An incident is created for each record of every page, the next run is the latest record time,
+          and the raw pages are not kept.
+    """
+    from CortexDataLake import Client, fetch_incidents
+    pages = [{'page': {'result': {'data': [{'time_generated': 1582210145000000}, {'time_generated': 1582210150000000}]}}},
+             {'page': {'result': {'data': [{'time_generated': 1582210146000000}]}}}]
+    client = mocker.Mock(spec=Client)
+
+    def iter_query_loggings(query, raw_results=None):
+        assert raw_results is None
+        for page in pages:
+            yield from page['page']['result']['data']
+
+    client.iter_query_loggings.side_effect = iter_query_loggings
+
+    next_run, incidents = fetch_incidents(client, '3 days', ['all'], ['all'], '10', {})
+
+    assert len(incidents) == 3
+    assert next_run == {'lastRun': '2020-02-20T14:49:10'}
+    client.query_loggings.assert_not_called()
+
+
+def test_iter_query_loggings_raw_results(mocker, requests_mock):
+    """
+    Given:
+        - Query results split into 2 pages.
+    When:
+        - Querying logs with and without keeping the raw pages.
+    Then:
+        - The records of all pages are yielded, and the raw pages are kept only when a list is given for them.
+    """
+    import base64
+    import time
+    import demistomock as demisto
+    from CortexDataLake import Client, QueryService
+    mocker.patch.object(demisto, 'getIntegrationContext', return_value={
+        'access_token': 'access_token', 'expires_in': int(time.time()) + 600,
+        'api_url': 'https://api.cdl.test', 'instance_id': 'instance_id'})
+    mocker.patch('CortexDataLake.Credentials')
+    response = mocker.Mock(ok=True, status_code=200)
+    response.json.return_value = {'jobId': 'job_id'}
+    mocker.patch.object(QueryService, 'create_query', return_value=response)
+    pages = []
+    for data in ([{'id': 1}, {'id': 2}], [{'id': 3}]):
+        page = mocker.Mock()
+        page.json.return_value = {'page': {'result': {'data': data}}}
+        pages.append(page)
+    mocker.patch.object(QueryService, 'iter_job_results', side_effect=lambda **kwargs: iter(pages))
+    client = Client('https://oproxy.test', 'reg_id', True, False, 'refresh_token',
+                    base64.b64encode(b'k' * 32).decode())
+
+    assert list(client.iter_query_loggings('SELECT * FROM `firewall.threat`')) == [{'id': 1}, {'id': 2}, {'id': 3}]
+
+    records, raw_results = client.query_loggings('SELECT * FROM `firewall.threat`')
+    assert records == [{'id': 1}, {'id': 2}, {'id': 3}]
+    assert len(raw_results) == 2
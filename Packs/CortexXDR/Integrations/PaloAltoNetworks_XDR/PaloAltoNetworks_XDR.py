@@ -2,10 +2,11 @@ from datetime import timezone
 import secrets
 import string
 import hashlib
-from typing import Any, Dict
+from typing import Any, Dict, List
 import dateparser
 import urllib3
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from CommonServerPython import *
 
 # Disable insecure warnings
@@ -17,6 +18,11 @@ API_KEY_LENGTH = 128
 
 INTEGRATION_CONTEXT_BRAND = 'PaloAltoNetworksXDR'
 
+# maximum number of incidents the API returns in a single page
+MAX_INCIDENTS_PAGE_SIZE = 100
+DEFAULT_MAX_FETCH = 50
+MAX_EXTRA_DATA_WORKERS = 10
+
 
 def convert_epoch_to_milli(timestamp):
     if timestamp is None:
@@ -1249,19 +1255,68 @@ def create_distribution_command(client, args):
     )
 
 
-def fetch_incidents(client, first_fetch_time, last_run: dict = None):
+def add_incidents_extra_data(client, raw_incidents, workers=MAX_EXTRA_DATA_WORKERS):
+    """
+    Adds the alerts and artifacts of the incidents to the raw incidents, fetching them concurrently
+
+    :param client: The XDR client
+    :param raw_incidents: The incidents to add the extra data to
+    :param workers: Maximum number of concurrent requests
+    """
+    def get_extra_data(raw_incident):
+        incident_id = raw_incident.get('incident_id')
+        try:
+            return client.get_incident_extra_data(incident_id)
+        except Exception as e:
+            demisto.debug(f'Failed to get the extra data of incident {incident_id}: {e}')
+            return None
+
+    if not raw_incidents:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(raw_incidents))) as executor:
+        for raw_incident, extra_data in zip(raw_incidents, executor.map(get_extra_data, raw_incidents)):
+            if not extra_data:
+                continue
+            raw_incident['alerts'] = extra_data.get('alerts', {}).get('data')
+            raw_incident['network_artifacts'] = extra_data.get('network_artifacts', {}).get('data')
+            raw_incident['file_artifacts'] = extra_data.get('file_artifacts', {}).get('data')
+
+
+def fetch_incidents(client, first_fetch_time, last_run: dict = None, max_fetch=DEFAULT_MAX_FETCH,
+                    fetch_extra_data=False):
     # Get the last fetch time, if exists
     last_fetch = last_run.get('time') if isinstance(last_run, dict) else None
+    # the ids of the incidents created at the last fetch time which were already fetched
+    fetched_ids = set(last_run.get('incidents_at_last_fetch', [])) if isinstance(last_run, dict) else set()
 
     # Handle first time fetch, fetch incidents retroactively
     if last_fetch is None:
         last_fetch, _ = parse_date_range(first_fetch_time, to_timestamp=True)
 
-    incidents = []
-    raw_incidents = client.get_incidents(gte_creation_time_milliseconds=last_fetch,
-                                         limit=50, sort_by_creation_time='asc')
+    # page through the incidents created since the last fetch, up to max_fetch new incidents
+    page_size = min(max_fetch, MAX_INCIDENTS_PAGE_SIZE)
+    page_number = 0
+    new_raw_incidents: List[dict] = []
+    while len(new_raw_incidents) < max_fetch:
+        raw_incidents = client.get_incidents(gte_creation_time_milliseconds=last_fetch, limit=page_size,
+                                             sort_by_creation_time='asc', page_number=page_number)
+        for raw_incident in raw_incidents:
+            if raw_incident['creation_time'] == last_fetch and raw_incident.get('incident_id') in fetched_ids:
+                continue
+            new_raw_incidents.append(raw_incident)
+            if len(new_raw_incidents) == max_fetch:
+                break
+
+        if len(raw_incidents) < page_size:
+            break
+        page_number += 1
+
+    if fetch_extra_data:
+        add_incidents_extra_data(client, new_raw_incidents)
 
-    for raw_incident in raw_incidents:
+    incidents = []
+    for raw_incident in new_raw_incidents:
         incident_id = raw_incident.get('incident_id')
         description = raw_incident.get('description')
         occurred = timestamp_to_datestring(raw_incident['creation_time'], TIME_FORMAT + 'Z')
@@ -1271,13 +1326,19 @@ def fetch_incidents(client, first_fetch_time, last_run: dict = None):
             'rawJSON': json.dumps(raw_incident)
         }
 
-        # Update last run and add incident if the incident is newer than last fetch
+        # Update last run, keeping the ids of the incidents created at the last fetch time
         if raw_incident['creation_time'] > last_fetch:
             last_fetch = raw_incident['creation_time']
+            fetched_ids = set()
+        if raw_incident['creation_time'] == last_fetch:
+            fetched_ids.add(incident_id)
 
         incidents.append(incident)
 
-    next_run = {'time': last_fetch + 1}
+    next_run = {
+        'time': last_fetch,
+        'incidents_at_last_fetch': sorted(fetched_ids)
+    }
     return next_run, incidents
 
 
@@ -1290,6 +1351,8 @@ def main():
     api_key = demisto.params().get('apikey')
     api_key_id = demisto.params().get('apikey_id')
     first_fetch_time = demisto.params().get('fetch_time', '3 days')
+    max_fetch = int(demisto.params().get('max_fetch') or DEFAULT_MAX_FETCH)
+    fetch_extra_data = demisto.params().get('fetch_incident_extra_data', False)
     base_url = urljoin(demisto.params().get('url'), '/public_api/v1')
     proxy = demisto.params().get('proxy')
     verify_cert = not demisto.params().get('insecure', False)
@@ -1321,7 +1384,8 @@ def main():
             demisto.results('ok')
 
         elif demisto.command() == 'fetch-incidents':
-            next_run, incidents = fetch_incidents(client, first_fetch_time, demisto.getLastRun())
+            next_run, incidents = fetch_incidents(client, first_fetch_time, demisto.getLastRun(), max_fetch,
+                                                  fetch_extra_data)
             demisto.setLastRun(next_run)
             demisto.incidents(incidents)
 
@@ -52,6 +52,97 @@ def test_fetch_incidents(requests_mock):
     assert incidents[0]['rawJSON'] == json.dumps(get_incidents_list_response['reply']['incidents'][0])
 
 
+def test_fetch_incidents_same_creation_time(requests_mock):
+    """
+    Given:
+        - Two incidents created at the same millisecond, which were already fetched.
+    When:
+        - Fetching incidents again.
+    Then:
+        - The incidents are not fetched again, and the next run keeps their creation time and ids.
+    """
+    from PaloAltoNetworks_XDR import fetch_incidents, Client
+
+    get_incidents_list_response = load_test_data('./test_data/get_incidents_list.json')
+    requests_mock.post(f'{XDR_URL}/public_api/v1/incidents/get_incidents/', json=get_incidents_list_response)
+
+    client = Client(
+        base_url=f'{XDR_URL}/public_api/v1'
+    )
+
+    next_run, incidents = fetch_incidents(client, '3 month', {'time': 1575806909000})
+    assert len(incidents) == 2
+    assert next_run == {'time': 1575806909185, 'incidents_at_last_fetch': ['1', '2']}
+
+    second_next_run, incidents = fetch_incidents(client, '3 month', next_run)
+    assert incidents == []
+    assert second_next_run == next_run
+    assert requests_mock.last_request.json()['request_data']['filters'] == [
+        {'field': 'creation_time', 'operator': 'gte', 'value': 1575806909185}
+    ]
+
+
+def test_fetch_incidents_paging(requests_mock):
+    """
+    Given:
+        - 250 incidents created after the last fetch.
+    When:
+        - Fetching incidents with a maximum of 150 incidents per fetch.
+    Then:
+        - The incidents are paged through in pages of 100, and the first 150 incidents are fetched.
+    """
+    from PaloAltoNetworks_XDR import fetch_incidents, Client
+
+    raw_incidents = [{'incident_id': str(i), 'description': 'incident', 'creation_time': 1575806909185 + i}
+                     for i in range(250)]
+
+    def get_incidents(request, context):
+        request_data = request.json()['request_data']
+        return {'reply': {'incidents': raw_incidents[request_data['search_from']:request_data['search_to']]}}
+
+    requests_mock.post(f'{XDR_URL}/public_api/v1/incidents/get_incidents/', json=get_incidents)
+
+    client = Client(
+        base_url=f'{XDR_URL}/public_api/v1'
+    )
+
+    next_run, incidents = fetch_incidents(client, '3 month', {'time': 1575806909185}, max_fetch=150)
+
+    assert requests_mock.call_count == 2
+    assert [json.loads(incident['rawJSON'])['incident_id'] for incident in incidents] == [str(i) for i in range(150)]
+    assert next_run == {'time': 1575806909185 + 149, 'incidents_at_last_fetch': ['149']}
+
+
+def test_fetch_incidents_extra_data(requests_mock):
+    """
+    Given:
+        - Two new incidents.
+    When:
+        - Fetching incidents with their extra data.
+    Then:
+        - The alerts and artifacts of each incident are added to its raw JSON.
+    """
+    from PaloAltoNetworks_XDR import fetch_incidents, Client
+
+    get_incidents_list_response = load_test_data('./test_data/get_incidents_list.json')
+    get_incident_extra_data_response = load_test_data('./test_data/get_incident_extra_data.json')
+    requests_mock.post(f'{XDR_URL}/public_api/v1/incidents/get_incidents/', json=get_incidents_list_response)
+    requests_mock.post(f'{XDR_URL}/public_api/v1/incidents/get_incident_extra_data/',
+                       json=get_incident_extra_data_response)
+
+    client = Client(
+        base_url=f'{XDR_URL}/public_api/v1'
+    )
+
+    _, incidents = fetch_incidents(client, '3 month', {}, fetch_extra_data=True)
+
+    extra_data = get_incident_extra_data_response['reply']
+    for incident in incidents:
+        raw_incident = json.loads(incident['rawJSON'])
+        assert raw_incident['alerts'] == extra_data['alerts']['data']
+        assert raw_incident['file_artifacts'] == extra_data['file_artifacts']['data']
+
+
 def test_get_incident_extra_data(requests_mock):
     from PaloAltoNetworks_XDR import get_incident_extra_data_command, Client
 
@@ -5,108 +5,137 @@ from CommonServerUserPython import *
 import re
 import xlrd
 import csv
+from itertools import islice
 
+TXT_CHUNK_SIZE = 1024 * 1024
+TXT_SEPARATORS_REGEX = re.compile(r"[\s\"\',\0]")
+TXT_LEADING_PUNCTUATION = ".,({[\n\t\""
+TXT_TRAILING_PUNCTUATION = ".,?:;\\)}]/!\n\t\0\""
 
-def csv_file_to_indicator_list(file_path, col_num, starting_row, auto_detect, default_type, type_col):
-    indicator_list = []
+
+def csv_file_to_indicators(file_path, col_num, starting_row, auto_detect, default_type, type_col):
+    seen_indicators = set()
 
     # TODO: add run on all columns functionality
 
-    line_index = 0
     with open(file_path) as csv_file:
         file_reader = csv.reader(csv_file)
-        for row in file_reader:
-            if line_index >= starting_row:
-                indicator = row[col_num]
+        for row in islice(file_reader, starting_row, None):
+            indicator = row[col_num]
+            if indicator in seen_indicators:
+                continue
+            seen_indicators.add(indicator)
 
-                indicator_type = detect_type(indicator)
+            indicator_type = detect_type(indicator)
+
+            if indicator_type is None:
+                continue
 
-                if indicator_type is None:
-                    continue
+            if type_col:
+                indicator_type = row[int(type_col) - 1]
 
-                if type_col:
-                    indicator_type = row[int(type_col) - 1]
+            elif not auto_detect:
+                indicator_type = default_type
 
-                elif not auto_detect:
-                    indicator_type = default_type
+            yield {
+                "type": indicator_type,
+                "value": indicator
+            }
 
-                indicator_list.append({
-                    "type": indicator_type,
-                    "value": indicator
-                })
 
-            line_index = line_index + 1
+def xls_file_rows(file_path, sheet_name):
+    """Yields the rows of a spreadsheet as lists of cell values.
+    Only the requested sheet of an xls file is loaded, xlrd parses all of the sheets of an xlsx file.
+    """
+    xl_workbook = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        if sheet_name and sheet_name != 'None':
+            xl_sheet = xl_workbook.sheet_by_name(sheet_name)
+        else:
+            xl_sheet = xl_workbook.sheet_by_index(0)
 
-    return indicator_list
+        for row_index in range(xl_sheet.nrows):
+            yield xl_sheet.row_values(row_index)
+    finally:
+        xl_workbook.release_resources()
 
 
-def xls_file_to_indicator_list(file_path, sheet_name, col_num, starting_row, auto_detect, default_type, type_col):
-    indicator_list = []
+def xls_file_to_indicators(file_path, sheet_name, col_num, starting_row, auto_detect, default_type,
+                           type_col):
+    seen_indicators = set()
 
     # TODO: add run on all columns functionality
 
-    xl_woorkbook = xlrd.open_workbook(file_path)
-    if sheet_name and sheet_name != 'None':
-        xl_sheet = xl_woorkbook.sheet_by_name(sheet_name)
+    for row in islice(xls_file_rows(file_path, sheet_name), starting_row, None):
+        indicator = row[col_num] if col_num < len(row) else None
+        if indicator is None or indicator in seen_indicators:
+            continue
+        seen_indicators.add(indicator)
 
-    else:
-        xl_sheet = xl_woorkbook.sheet_by_index(0)
+        indicator_type = detect_type(indicator)
 
-    for row_index in range(0, xl_sheet.nrows):
-        if row_index >= starting_row:
-            indicator = xl_sheet.cell(row_index, col_num).value
+        if indicator_type is None:
+            continue
 
-            indicator_type = detect_type(indicator)
+        if not auto_detect:
+            indicator_type = default_type
 
-            if indicator_type is None:
-                continue
+        if type_col:
+            indicator_type = row[int(type_col) - 1]
 
-            if not auto_detect:
-                indicator_type = default_type
+        yield {
+            'type': indicator_type,
+            'value': indicator
+        }
 
-            if type_col:
-                indicator_type = xl_sheet.cell(row_index, int(type_col) - 1).value
 
-            indicator_list.append({
-                'type': indicator_type,
-                'value': indicator
-            })
+def txt_file_tokens(file_path, chunk_size=TXT_CHUNK_SIZE):
+    """Yields the tokens of a text file, reading it in chunks of chunk_size characters.
+    The last token of every chunk may continue in the next chunk, so it is carried over and prepended to it.
+    """
+    carry = ''
+    with open(file_path, "r") as fp:
+        for chunk in iter(lambda: fp.read(chunk_size), ''):
+            tokens = TXT_SEPARATORS_REGEX.split(carry + chunk)
+            carry = tokens.pop()
+            for token in tokens:
+                yield token
 
-    return indicator_list
+    if carry:
+        yield carry
 
 
-def txt_file_to_indicator_list(file_path, auto_detect, default_type):
-    with open(file_path, "r") as fp:
-        file_data = fp.read()
+def strip_punctuation(token):
+    """Drops the punctuation around a token, always keeping at least one character."""
+    token = token.rstrip(TXT_TRAILING_PUNCTUATION) or token[0]
+    return token.lstrip(TXT_LEADING_PUNCTUATION) or token[-1]
 
-    indicator_list = []
-
-    raw_splitted_data = re.split(r"\s|\n|\t|\"|\'|\,|\0", file_data)
 
-    for indicator in raw_splitted_data:
-        # drop punctuation
-        if len(indicator) > 1:
-            while indicator[-1] in ".,?:;\\)}]/!\n\t\0\"" and len(indicator) > 1:
-                indicator = indicator[:-1]
+def txt_file_to_indicators(file_path, auto_detect, default_type):
+    seen_indicators = set()
 
-            while indicator[0] in ".,({[\n\t\"" and len(indicator) > 1:
-                indicator = indicator[1:]
+    for token in txt_file_tokens(file_path):
+        if len(token) <= 1:
+            continue
 
-            indicator_type = detect_type(indicator)
+        indicator = strip_punctuation(token)
+        if indicator in seen_indicators:
+            continue
+        seen_indicators.add(indicator)
 
-            # indicator not recognized
-            if indicator_type is None:
-                continue
+        indicator_type = detect_type(indicator)
 
-            if not auto_detect:
-                indicator_type = default_type
+        # indicator not recognized
+        if indicator_type is None:
+            continue
 
-            indicator_list.append({
-                'type': indicator_type,
-                'value': indicator
-            })
+        if not auto_detect:
+            indicator_type = default_type
 
-    return indicator_list
+        yield {
+            'type': indicator_type,
+            'value': indicator
+        }
 
 
 def detect_type(indicator):
@@ -116,31 +145,8 @@ def detect_type(indicator):
     Returns:
         str. The type of the indicator.
     """
-    if re.match(sha256Regex, indicator) or re.match(md5Regex, indicator) or re.match(sha1Regex, indicator):
-        return FeedIndicatorType.File
-
-    if re.match(ipv4cidrRegex, indicator):
-        return FeedIndicatorType.CIDR
-
-    if re.match(ipv6cidrRegex, indicator):
-        return FeedIndicatorType.IPv6CIDR
-
-    if re.match(ipv4Regex, indicator):
-        return FeedIndicatorType.IP
-
-    if re.match(ipv6Regex, indicator):
-        return FeedIndicatorType.IPv6
-
-    if re.match(urlRegex, indicator):
-        return FeedIndicatorType.URL
-
-    if re.match(emailRegex, indicator):
-        return FeedIndicatorType.Email
-
     # TODO: add domain regex or identification
-
-    else:
-        return None
+    return detect_indicator_type(indicator)
 
 
 def fetch_indicators_from_file(args):
@@ -166,27 +172,36 @@ def fetch_indicators_from_file(args):
     starting_row = args.get('starting_row')
 
     if file_name.endswith('xls') or file_name.endswith('xlsx'):
-        indicator_list = xls_file_to_indicator_list(file_path, sheet_name, int(indicator_col_num) - 1,
-                                                    int(starting_row) - 1, auto_detect, default_type,
-                                                    indicator_type_col_num)
+        indicators = xls_file_to_indicators(file_path, sheet_name,
+                                            int(indicator_col_num) - 1, int(starting_row) - 1, auto_detect,
+                                            default_type, indicator_type_col_num)
 
     elif file_name.endswith('csv'):
-        indicator_list = csv_file_to_indicator_list(file_path, int(indicator_col_num) - 1, int(starting_row) - 1,
-                                                    auto_detect, default_type, indicator_type_col_num)
+        indicators = csv_file_to_indicators(file_path, int(indicator_col_num) - 1, int(starting_row) - 1,
+                                            auto_detect, default_type, indicator_type_col_num)
 
     else:
-        indicator_list = txt_file_to_indicator_list(file_path, auto_detect, default_type)
-
-    indicator_list_len = len(indicator_list)
+        indicators = txt_file_to_indicators(file_path, auto_detect, default_type)
 
     if limit:
         limit = int(str(limit))
-        indicator_list = indicator_list[offset: limit + offset]
+
+    # Create indicators in demisto while the file is being parsed
+    indicator_list = []
+    errors = []
+    for indicator in islice(indicators, offset, limit + offset if limit else None):
+        res = demisto.executeCommand("createNewIndicator", indicator)
+        if is_error(res[0]):
+            errors.append("Error creating indicator - {}".format(res[0]["Contents"]))
+        indicator_list.append(indicator)
+
+    if errors:
+        return_error(json.dumps(errors, indent=4))
 
     human_readable = tableToMarkdown("Indicators from {}:".format(file_path), indicator_list,
                                      headers=['value', 'type'], removeNull=True)
 
-    if limit and indicator_list_len > limit:
+    if limit and next(indicators, None) is not None:
         human_readable = human_readable + "\nTo bring the next batch of indicators run:\n!FetchIndicatorsFromFile " \
             "limit={} offset={} entry_id={}".format(limit, int(limit) + int(offset), args.get('entry_id'))
 
@@ -199,16 +214,6 @@ def fetch_indicators_from_file(args):
         if indicator_type_col_num:
             human_readable = human_readable + " indicator_type_column_number={}".format(indicator_type_col_num)
 
-    # Create indicators in demisto
-    errors = []
-    for indicator in indicator_list:
-        res = demisto.executeCommand("createNewIndicator", indicator)
-        if is_error(res[0]):
-            errors.append("Error creating indicator - {}".format(res[0]["Contents"]))
-
-    if errors:
-        return_error(json.dumps(errors, indent=4))
-
     return human_readable, None, indicator_list
 
 
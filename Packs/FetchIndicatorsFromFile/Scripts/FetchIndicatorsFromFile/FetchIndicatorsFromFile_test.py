@@ -0,0 +1,95 @@
+import re
+
+import demistomock as demisto
+import pytest
+
+from FetchIndicatorsFromFile import txt_file_tokens, strip_punctuation, txt_file_to_indicators, \
+    xls_file_to_indicators, fetch_indicators_from_file
+
+TXT_DATA = 'Reported 1.1.1.1, (2.2.2.2) and "https://example.com/path".\n' \
+           'Contact admin@example.com about 1.1.1.1 and d41d8cd98f00b204e9800998ecf8427e! ...\n\n'
+
+
+def old_strip_punctuation(indicator):
+    while indicator[-1] in ".,?:;\\)}]/!\n\t\0\"" and len(indicator) > 1:
+        indicator = indicator[:-1]
+    while indicator[0] in ".,({[\n\t\"" and len(indicator) > 1:
+        indicator = indicator[1:]
+    return indicator
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 64, 1024])
+def test_txt_file_tokens_chunk_boundaries(tmp_path, chunk_size):
+    """
+    Given:
+        - A text file read in chunks of different sizes.
+    When:
+        - Tokenizing the file.
+    Then:
+        - Tokens split between chunks are joined back, as if the whole file was split at once.
+    """
+    file_path = tmp_path / 'indicators.txt'
+    file_path.write_text(TXT_DATA)
+    expected = [token for token in re.split(r"\s|\n|\t|\"|\'|\,|\0", TXT_DATA) if token]
+    assert [token for token in txt_file_tokens(str(file_path), chunk_size) if token] == expected
+
+
+@pytest.mark.parametrize('token', ['1.1.1.1,', '(2.2.2.2)', '...', '"', '.a.', 'admin@example.com!', '[(x'])
+def test_strip_punctuation(token):
+    assert strip_punctuation(token) == old_strip_punctuation(token)
+
+
+def test_txt_file_to_indicators(tmp_path):
+    """
+    Given:
+        - A text file with a repeated indicator.
+    When:
+        - Parsing the file with auto detection.
+    Then:
+        - Every indicator is detected once, in file order.
+    """
+    file_path = tmp_path / 'indicators.txt'
+    file_path.write_text(TXT_DATA)
+    assert list(txt_file_to_indicators(str(file_path), True, None)) == [
+        {'type': 'IP', 'value': '1.1.1.1'},
+        {'type': 'IP', 'value': '2.2.2.2'},
+        {'type': 'URL', 'value': 'https://example.com/path'},
+        {'type': 'Email', 'value': 'admin@example.com'},
+        {'type': 'File', 'value': 'd41d8cd98f00b204e9800998ecf8427e'},
+    ]
+
+
+def test_xlsx_file_to_indicators():
+    """
+    Given:
+        - An xlsx file with a header row and an indicator type column, in its second sheet.
+    When:
+        - Parsing the sheet.
+    Then:
+        - The rows are read from the starting row and the type is taken from the type column.
+    """
+    assert list(xls_file_to_indicators('test_data/indicators.xlsx', 'Indicators', 0, 1, True, None, '2')) == [
+        {'type': 'IP', 'value': '1.1.1.1'}
+    ]
+
+
+def test_fetch_indicators_from_file_limit(mocker, tmp_path):
+    """
+    Given:
+        - A text file with more indicators than the limit.
+    When:
+        - Running the script with a limit and an offset.
+    Then:
+        - Only the requested indicators are created, and the next batch command is suggested.
+    """
+    file_path = tmp_path / 'indicators.txt'
+    file_path.write_text(TXT_DATA)
+    mocker.patch.object(demisto, 'getFilePath', return_value={'path': str(file_path), 'name': 'indicators.txt'})
+    execute_command = mocker.patch.object(demisto, 'executeCommand', return_value=[{'Type': 1, 'Contents': ''}])
+
+    human_readable, _, indicators = fetch_indicators_from_file({'entry_id': '1', 'auto_detect': 'True', 'limit': '2',
+                                                                'offset': '1', 'indicator_column_number': '1'})
+
+    assert indicators == [{'type': 'IP', 'value': '2.2.2.2'}, {'type': 'URL', 'value': 'https://example.com/path'}]
+    assert execute_command.call_count == 2
+    assert 'limit=2 offset=3 entry_id=1' in human_readable
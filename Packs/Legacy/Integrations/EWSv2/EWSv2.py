@@ -918,14 +918,26 @@ def fetch_last_emails(account, folder_name='Inbox', since_datetime=None, exclude
         if not FETCH_ALL_HISTORY:
             last_10_min = EWSDateTime.now(tz=EWSTimeZone.timezone('UTC')) - timedelta(minutes=10)
             qs = qs.filter(datetime_received__gte=last_10_min)
-    qs = qs.filter().only(*map(lambda x: x.name, Message.FIELDS))
     qs = qs.filter().order_by('datetime_received')
 
-    result = qs.all()
+    # page over a light projection of the emails and stop once MAX_FETCH new emails were found,
+    # so only the emails which become incidents are retrieved in full
+    exclude_ids = exclude_ids if isinstance(exclude_ids, set) else set(exclude_ids or [])
+    new_items = []
+    for item in qs.only('message_id').iterator():
+        if isinstance(item, Message) and item.message_id and item.message_id not in exclude_ids:
+            new_items.append(item)
+            if len(new_items) >= MAX_FETCH:
+                break
+    if not new_items:
+        return []
+
+    # attachments are only retrieved with their metadata here, their content is loaded once accessed
+    result = account.fetch(ids=new_items, only_fields=map(lambda x: x.name, Message.FIELDS))
     result = [x for x in result if isinstance(x, Message)]
-    if exclude_ids and len(exclude_ids) > 0:
-        exclude_ids = set(exclude_ids)
-        result = [x for x in result if x.message_id not in exclude_ids]
+    if exchangelib.__version__ != "1.12.0":  # Docker BC
+        for item in result:
+            item.folder = Folder(account=account)
     return result
 
 
@@ -1185,9 +1197,10 @@ def fetch_emails_as_incidents(account_email, folder_name):
 
     try:
         account = get_account(account_email)
-        last_emails = fetch_last_emails(account, folder_name, last_run.get(LAST_RUN_TIME), last_run.get(LAST_RUN_IDS))
-
+        # bounded set of the already fetched ids, the deque keeps the insertion order for eviction
         ids = deque(last_run.get(LAST_RUN_IDS, []), maxlen=LAST_RUN_IDS_QUEUE_SIZE)
+        last_emails = fetch_last_emails(account, folder_name, last_run.get(LAST_RUN_TIME), set(ids))
+
         incidents = []
         incident = {}  # type: Dict[Any, Any]
         for item in last_emails:
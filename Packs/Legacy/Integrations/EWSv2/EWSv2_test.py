@@ -18,3 +18,35 @@ def test_start_logging():
     EWSv2.start_logging()
     logging.getLogger().debug("test this")
     assert "test this" in EWSv2.log_stream.getvalue()
+
+
+def test_fetch_last_emails_stops_at_max_fetch(mocker):
+    from exchangelib.items import Message, MeetingRequest
+
+    class MockQuerySet(object):
+        def __init__(self, items):
+            self.items = items
+
+        def filter(self, **kwargs):
+            return self
+
+        def order_by(self, *args):
+            return self
+
+        def only(self, *args):
+            return self
+
+        def iterator(self):
+            for item in self.items:
+                yield item
+
+    items = [Message(message_id='seen'), MeetingRequest(message_id='meeting')] + \
+        [Message(message_id='id{}'.format(i)) for i in range(100)]
+    mocker.patch.object(EWSv2, 'get_folder_by_path', return_value=MockQuerySet(items))
+    mocker.patch.object(EWSv2, 'MAX_FETCH', 3)
+    account = mocker.Mock()
+    account.fetch.side_effect = lambda ids, only_fields: ids
+
+    result = EWSv2.fetch_last_emails(account, since_datetime='time', exclude_ids={'seen'})
+    assert [item.message_id for item in result] == ['id0', 'id1', 'id2']
+    assert account.fetch.call_count == 1
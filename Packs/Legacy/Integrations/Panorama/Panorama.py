@@ -5,6 +5,8 @@ from CommonServerUserPython import *
 ''' IMPORTS '''
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
+import concurrent.futures
+import time
 import uuid
 import json
 import requests
@@ -20,6 +22,17 @@ URL = demisto.params()['server'].rstrip('/:') + ':' + demisto.params().get('port
 API_KEY = str(demisto.params().get('key'))
 USE_SSL = not demisto.params().get('insecure')
 
+# maximal number of requests sent in parallel to the firewall/Panorama of this instance
+MAX_CONCURRENT_REQUESTS = int(demisto.params().get('max_concurrent_requests') or 5)
+# time (in minutes) a URL category lookup is kept in the integration context, 0 disables the cache
+URL_CATEGORY_CACHE_TTL = int(demisto.params().get('url_category_cache_ttl') or 0)
+URL_CATEGORY_CACHE_MAX_SIZE = 10000
+
+# pooled session, shared between the worker threads of a single command
+SESSION = requests.Session()
+SESSION.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=MAX_CONCURRENT_REQUESTS))
+SESSION.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=MAX_CONCURRENT_REQUESTS))
+
 # determine a vsys or a device-group
 VSYS = demisto.params().get('vsys')
 if demisto.args() and demisto.args().get('device-group', None):
@@ -109,12 +122,16 @@ class PAN_OS_Not_Found(Exception):
         pass
 
 
+class PAN_OS_IPs_Already_Registered(Exception):
+    """ Some of the IPs of an ip-tag registration are already registered to the tag. """
+
+
 def http_request(uri: str, method: str, headers: Dict = {},
                  body: Dict = {}, params: Dict = {}, files=None) -> Any:
     """
     Makes an API call with the given arguments
     """
-    result = requests.request(
+    result = SESSION.request(
         method,
         uri,
         headers=headers,
@@ -166,9 +183,8 @@ def http_request(uri: str, method: str, headers: Dict = {},
                            json_result['response']['msg']['line']['uid-response']['payload']['register']['entry']]
                 else:
                     ips = json_result['response']['msg']['line']['uid-response']['payload']['register']['entry']['@ip']
-                demisto.results(
+                raise PAN_OS_IPs_Already_Registered(
                     'IP ' + str(ips) + ' already exist in the tag. All submitted IPs were not registered to the tag.')
-                sys.exit(0)
 
             # catch timed out log queries and return this as an entry.note
             elif str(json_result['response']['msg']['line']).find('Query timed out') != -1:
@@ -2176,36 +2192,112 @@ def panorama_get_url_category(url_cmd, url):
     return category
 
 
-def populate_url_filter_category_from_context(category):
-    url_filter_category = demisto.dt(demisto.context(), f'Panorama.URLFilter(val.Category === "{category}")')
-    if not url_filter_category:
-        return []
+def get_url_filter_categories_from_context() -> Dict[str, List[str]]:
+    """
+    Collects the URLs of every category already in the context, in a single context lookup
+    """
+    url_filters = demisto.dt(demisto.context(), 'Panorama.URLFilter')
+    if not url_filters:
+        return {}
+    if isinstance(url_filters, dict):
+        url_filters = [url_filters]
 
-    if type(url_filter_category) is list:
-        return url_filter_category[0].get("URL")
-    else:  # url_filter_category is a dict
-        context_urls = url_filter_category.get("URL", None)  # pylint: disable=no-member
-        if type(context_urls) is str:
-            return [context_urls]
-        else:
-            return context_urls
+    context_categories: Dict[str, List[str]] = {}
+    for url_filter in url_filters:
+        category = url_filter.get('Category')
+        context_urls = url_filter.get('URL') or []
+        if isinstance(context_urls, str):
+            context_urls = [context_urls]
+        # first entry of a category wins, same as the val.Category === category lookup
+        if category and category not in context_categories:
+            context_categories[category] = context_urls
+    return context_categories
+
+
+def get_cached_url_categories(url_cmd: str, urls: List[str]) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """
+    Returns the non expired cached categories of the given URLs, and the cache itself
+    """
+    cache: Dict[str, Any] = {}
+    cached_categories: Dict[str, str] = {}
+    if not URL_CATEGORY_CACHE_TTL:
+        return cached_categories, cache
+
+    now = int(time.time())
+    cache = {key: value for key, value in demisto.getIntegrationContext().get('url_category_cache', {}).items()
+             if value.get('expires', 0) > now}
+    for url in urls:
+        cached = cache.get(f'{url_cmd}:{url}')
+        if cached:
+            cached_categories[url] = cached['category']
+    return cached_categories, cache
+
+
+def set_cached_url_categories(url_cmd: str, categories: Dict[str, str], cache: Dict[str, Any]):
+    """
+    Stores newly looked up categories in the integration context, evicting the entries closest to expiry
+    """
+    if not URL_CATEGORY_CACHE_TTL or not categories:
+        return
+
+    expires = int(time.time()) + URL_CATEGORY_CACHE_TTL * 60
+    for url, category in categories.items():
+        cache[f'{url_cmd}:{url}'] = {'category': category, 'expires': expires}
+    if len(cache) > URL_CATEGORY_CACHE_MAX_SIZE:
+        newest_keys = sorted(cache, key=lambda key: cache[key]['expires'], reverse=True)[:URL_CATEGORY_CACHE_MAX_SIZE]
+        cache = {key: cache[key] for key in newest_keys}
+
+    integration_context = demisto.getIntegrationContext()
+    integration_context['url_category_cache'] = cache
+    demisto.setIntegrationContext(integration_context)
+
+
+def panorama_get_url_categories(url_cmd: str, urls: List[str]) -> Dict[str, str]:
+    """
+    Gets the categories of the given URLs, from the cache or concurrently from the firewall
+
+    Args:
+        url_cmd: url, url-info-cloud or url-info-host
+        urls: URLs to categorize
+
+    Returns:
+        A mapping of each URL to its category
+    """
+    url_categories, cache = get_cached_url_categories(url_cmd, urls)
+    urls_to_lookup = [url for url in urls if url not in url_categories]
+
+    looked_up_categories: Dict[str, str] = {}
+    if urls_to_lookup:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+            future_to_url = {executor.submit(panorama_get_url_category, url_cmd, url): url for url in urls_to_lookup}
+            for future in concurrent.futures.as_completed(future_to_url):
+                looked_up_categories[future_to_url[future]] = future.result()
+
+    set_cached_url_categories(url_cmd, looked_up_categories, cache)
+    url_categories.update(looked_up_categories)
+    return url_categories
 
 
 def panorama_get_url_category_command(url_cmd: str):
     """
     Get the url category from Palo Alto URL Filtering
     """
-    urls = argToList(demisto.args()['url'])
+    # remove duplicates while keeping the order of the URLs
+    urls = list(dict.fromkeys(argToList(demisto.args()['url'])))
+
+    url_categories = panorama_get_url_categories(url_cmd, urls)
+    context_categories = get_url_filter_categories_from_context()
 
     categories_dict: Dict[str, list] = {}
     for url in urls:
-        category = panorama_get_url_category(url_cmd, url)
+        category = url_categories[url]
         if category in categories_dict:
             categories_dict[category].append(url)
         else:
             categories_dict[category] = [url]
-        context_urls = populate_url_filter_category_from_context(category)
-        categories_dict[category] = list((set(categories_dict[category])).union(set(context_urls)))
+    for category, category_urls in categories_dict.items():
+        context_urls = context_categories.get(category, [])
+        categories_dict[category] = list(set(category_urls).union(set(context_urls)))
 
     url_category_output = []
     for key, value in categories_dict.items():
@@ -3487,16 +3579,24 @@ def panorama_refresh_edl_command():
 ''' IP Tags '''
 
 
-@logger
-def panorama_register_ip_tag(tag: str, ips: List, persistent: str):
-    entry: str = ''
+def build_ip_tag_uid_message(tag: str, ips: List, register: bool, persistent: str = None) -> str:
+    entry = ''
     for ip in ips:
-        entry += f'<entry ip=\"{ip}\" persistent=\"{persistent}\"><tag><member>{tag}</member></tag></entry>'
+        if register:
+            entry += f'<entry ip=\"{ip}\" persistent=\"{persistent}\"><tag><member>{tag}</member></tag></entry>'
+        else:
+            entry += f'<entry ip=\"{ip}\"><tag><member>{tag}</member></tag></entry>'
+
+    action = 'register' if register else 'unregister'
+    return f'<uid-message><version>2.0</version><type>update</type><payload><{action}>{entry}' \
+           f'</{action}></payload></uid-message>'
 
+
+@logger
+def panorama_register_ip_tag(tag: str, ips: List, persistent: str):
     params = {
         'type': 'user-id',
-        'cmd': '<uid-message><version>2.0</version><type>update</type><payload><register>' + entry
-               + '</register></payload></uid-message>',
+        'cmd': build_ip_tag_uid_message(tag, ips, True, persistent),
         'key': API_KEY
     }
 
@@ -3509,34 +3609,120 @@ def panorama_register_ip_tag(tag: str, ips: List, persistent: str):
     return result
 
 
+def panorama_ip_tag_chunk(tag: str, ips: List, register: bool, persistent: str = None) -> Dict[str, Any]:
+    """
+    Registers or unregisters a single chunk of IPs, sending the uid-message in the POST body
+
+    Returns:
+        A report of the chunk, failures are reported rather than raised
+    """
+    body = {
+        'type': 'user-id',
+        'cmd': build_ip_tag_uid_message(tag, ips, register, persistent),
+        'key': API_KEY
+    }
+    chunk_report: Dict[str, Any] = {'IPCount': len(ips), 'Status': 'Success'}
+    start_time = time.time()
+    try:
+        http_request(URL, 'POST', body=body)
+    except Exception as err:
+        chunk_report['Status'] = 'Failed'
+        chunk_report['Error'] = str(err)
+    chunk_report['Time'] = round(time.time() - start_time, 3)
+    return chunk_report
+
+
+def panorama_ip_tag_bulk(tag: str, ips: List, register: bool, chunk_size: int,
+                         persistent: str = None) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Registers or unregisters IPs to a tag in chunks, sent in parallel over the pooled session
+
+    Args:
+        tag: The tag to register the IPs to or to unregister the IPs from
+        ips: The IPs
+        register: True to register the IPs, False to unregister them
+        chunk_size: Maximal number of IPs sent in a single request
+        persistent: '1' for persistent registration, '0' otherwise
+
+    Returns:
+        The chunk reports, and the IPs of the chunks which succeeded
+    """
+    if chunk_size < 1:
+        raise Exception(f'chunk_size must be a positive integer, got {chunk_size}.')
+    chunks = [ips[i:i + chunk_size] for i in range(0, len(ips), chunk_size)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        futures = [executor.submit(panorama_ip_tag_chunk, tag, chunk, register, persistent) for chunk in chunks]
+        chunk_reports = [future.result() for future in futures]
+
+    succeeded_ips: List[str] = []
+    for index, (chunk, chunk_report) in enumerate(zip(chunks, chunk_reports)):
+        chunk_report['Chunk'] = index + 1
+        if chunk_report['Status'] == 'Success':
+            succeeded_ips.extend(chunk)
+    return chunk_reports, succeeded_ips
+
+
+def get_context_tag_ips(tag: str) -> List[str]:
+    context_ips = demisto.dt(demisto.context(), 'Panorama.DynamicTags(val.Tag ==\"' + tag + '\").IPs')
+    if not context_ips:
+        return []
+    if isinstance(context_ips, str):
+        return [context_ips]
+    return context_ips
+
+
+def ip_tag_bulk_results(tag: str, action: str, chunk_reports: List[Dict[str, Any]], dynamic_tag: Dict):
+    failed_chunks = [chunk_report for chunk_report in chunk_reports if chunk_report['Status'] != 'Success']
+    human_readable = tableToMarkdown(
+        f'{action} ip-tag {tag}: {len(chunk_reports) - len(failed_chunks)} of {len(chunk_reports)} chunks succeeded',
+        chunk_reports, ['Chunk', 'IPCount', 'Status', 'Time', 'Error'], removeNull=True)
+
+    demisto.results({
+        'Type': entryTypes['error'] if failed_chunks and len(failed_chunks) == len(chunk_reports) else entryTypes['note'],
+        'ContentsFormat': formats['json'],
+        'Contents': chunk_reports,
+        'ReadableContentsFormat': formats['markdown'],
+        'HumanReadable': human_readable,
+        'EntryContext': {
+            "Panorama.DynamicTags(val.Tag == obj.Tag)": dynamic_tag
+        }
+    })
+
+
 def panorama_register_ip_tag_command():
     """
     Register IPs to a Tag
     """
     tag = demisto.args()['tag']
     ips = argToList(demisto.args()['IPs'])
+    chunk_size = demisto.args().get('chunk_size')
 
     persistent = demisto.args()['persistent'] if 'persistent' in demisto.args() else 'true'
     persistent = '1' if persistent == 'true' else '0'
 
-    result = panorama_register_ip_tag(tag, ips, str(persistent))
+    if chunk_size:
+        chunk_reports, ips = panorama_ip_tag_bulk(tag, ips, True, int(chunk_size), str(persistent))
+    else:
+        try:
+            result = panorama_register_ip_tag(tag, ips, str(persistent))
+        except PAN_OS_IPs_Already_Registered as err:
+            demisto.results(str(err))
+            return
 
-    registered_ip: Dict[str, str] = {}
+    registered_ip: Dict[str, Any] = {}
     # update context only if IPs are persistent
-    if persistent == '1':
+    if persistent == '1' and ips:
         # get existing IPs for this tag
-        context_ips = demisto.dt(demisto.context(), 'Panorama.DynamicTags(val.Tag ==\"' + tag + '\").IPs')
-
-        if context_ips:
-            all_ips = ips + context_ips
-        else:
-            all_ips = ips
-
+        context_ips = get_context_tag_ips(tag)
         registered_ip = {
             'Tag': tag,
-            'IPs': all_ips
+            'IPs': list(set(ips).union(context_ips))
         }
 
+    if chunk_size:
+        ip_tag_bulk_results(tag, 'Registered', chunk_reports, registered_ip)
+        return
+
     demisto.results({
         'Type': entryTypes['note'],
         'ContentsFormat': formats['json'],
@@ -3551,14 +3737,9 @@ def panorama_register_ip_tag_command():
 
 @logger
 def panorama_unregister_ip_tag(tag: str, ips: list):
-    entry = ''
-    for ip in ips:
-        entry += '<entry ip=\"' + ip + '\"><tag><member>' + tag + '</member></tag></entry>'
-
     params = {
         'type': 'user-id',
-        'cmd': '<uid-message><version>2.0</version><type>update</type><payload><unregister>' + entry
-               + '</unregister></payload></uid-message>',
+        'cmd': build_ip_tag_uid_message(tag, ips, False),
         'key': API_KEY
     }
     result = http_request(
@@ -3576,6 +3757,19 @@ def panorama_unregister_ip_tag_command():
     """
     tag = demisto.args()['tag']
     ips = argToList(demisto.args()['IPs'])
+    chunk_size = demisto.args().get('chunk_size')
+
+    if chunk_size:
+        chunk_reports, unregistered_ips = panorama_ip_tag_bulk(tag, ips, False, int(chunk_size))
+        unregistered_ip: Dict[str, Any] = {}
+        context_ips = get_context_tag_ips(tag)
+        if context_ips and unregistered_ips:
+            unregistered_ip = {
+                'Tag': tag,
+                'IPs': list(set(context_ips).difference(unregistered_ips))
+            }
+        ip_tag_bulk_results(tag, 'Unregistered', chunk_reports, unregistered_ip)
+        return
 
     result = panorama_unregister_ip_tag(tag, ips)
 
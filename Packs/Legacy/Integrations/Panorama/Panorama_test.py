@@ -197,3 +197,89 @@ def test_validate_search_time():
     with pytest.raises(Exception):
         assert validate_search_time('219/12/26 00:00:00')
         assert validate_search_time('219/10/35')
+
+
+def test_get_url_filter_categories_from_context(mocker):
+    from Panorama import get_url_filter_categories_from_context
+    mocker.patch.object(demisto, 'dt', return_value=[{'Category': 'shopping', 'URL': 'ebay.com'},
+                                                     {'Category': 'search-engines', 'URL': ['google.com', 'bing.com']}])
+    response = get_url_filter_categories_from_context()
+    expected = {'shopping': ['ebay.com'], 'search-engines': ['google.com', 'bing.com']}
+    assert response == expected
+
+
+def test_panorama_get_url_categories_uses_cache(mocker):
+    import Panorama
+    mocker.patch.object(Panorama, 'URL_CATEGORY_CACHE_TTL', 60)
+    integration_context: dict = {}
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=lambda: integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=integration_context.update)
+    get_url_category = mocker.patch.object(Panorama, 'panorama_get_url_category',
+                                           side_effect=lambda url_cmd, url: 'category-' + url)
+
+    response = Panorama.panorama_get_url_categories('url', ['a.com', 'b.com'])
+    assert response == {'a.com': 'category-a.com', 'b.com': 'category-b.com'}
+    assert get_url_category.call_count == 2
+
+    response = Panorama.panorama_get_url_categories('url', ['a.com', 'c.com'])
+    assert response == {'a.com': 'category-a.com', 'c.com': 'category-c.com'}
+    assert get_url_category.call_count == 3
+
+    # the cache is keyed by the url command as well
+    Panorama.panorama_get_url_categories('url-info-host', ['a.com'])
+    assert get_url_category.call_count == 4
+
+
+def test_build_ip_tag_uid_message():
+    from Panorama import build_ip_tag_uid_message
+    response = build_ip_tag_uid_message('tag1', ['1.1.1.1'], True, '1')
+    expected = '<uid-message><version>2.0</version><type>update</type><payload><register>' \
+               '<entry ip="1.1.1.1" persistent="1"><tag><member>tag1</member></tag></entry>' \
+               '</register></payload></uid-message>'
+    assert response == expected
+
+    response = build_ip_tag_uid_message('tag1', ['1.1.1.1'], False)
+    expected = '<uid-message><version>2.0</version><type>update</type><payload><unregister>' \
+               '<entry ip="1.1.1.1"><tag><member>tag1</member></tag></entry>' \
+               '</unregister></payload></uid-message>'
+    assert response == expected
+
+
+def test_panorama_ip_tag_bulk(mocker):
+    import Panorama
+
+    def http_request_mock(uri, method, body=None, **kwargs):
+        if '2.2.2.2' in body['cmd']:
+            raise Panorama.PAN_OS_IPs_Already_Registered('IP 2.2.2.2 already exist in the tag.')
+        return {'response': {'@status': 'success'}}
+
+    http_request = mocker.patch.object(Panorama, 'http_request', side_effect=http_request_mock)
+    ips = ['1.1.1.1', '1.1.1.2', '2.2.2.2', '1.1.1.3', '1.1.1.4']
+    chunk_reports, succeeded_ips = Panorama.panorama_ip_tag_bulk('tag1', ips, True, 2, '1')
+
+    assert http_request.call_count == 3
+    assert [chunk_report['Status'] for chunk_report in chunk_reports] == ['Success', 'Failed', 'Success']
+    assert [chunk_report['IPCount'] for chunk_report in chunk_reports] == [2, 2, 1]
+    assert succeeded_ips == ['1.1.1.1', '1.1.1.2', '1.1.1.4']
+    assert chunk_reports[1]['Error'] == 'IP 2.2.2.2 already exist in the tag.'
+
+
+def test_panorama_ip_tag_bulk_invalid_chunk_size(mocker):
+    import Panorama
+
+    http_request = mocker.patch.object(Panorama, 'http_request')
+    with pytest.raises(Exception, match='chunk_size must be a positive integer'):
+        Panorama.panorama_ip_tag_bulk('tag1', ['1.1.1.1'], True, 0, '1')
+    assert http_request.call_count == 0
+
+
+def test_http_request_already_registered_ips(requests_mock):
+    import Panorama
+
+    requests_mock.post(
+        'https://1.1.1.1:443/api/',
+        text='<response status="error"><msg><line><uid-response><version>2.0</version><payload><register>'
+             '<entry ip="1.1.1.1" message="tag tag1 already exists, ignore"/></register></payload>'
+             '</uid-response></line></msg></response>')
+    with pytest.raises(Panorama.PAN_OS_IPs_Already_Registered, match='1.1.1.1'):
+        Panorama.http_request('https://1.1.1.1:443/api/', 'POST', body={'type': 'user-id'})
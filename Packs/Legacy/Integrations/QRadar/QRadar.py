@@ -9,6 +9,7 @@ import urllib
 import re
 from requests.exceptions import HTTPError, ConnectionError
 from copy import deepcopy
+from collections import OrderedDict
 
 # disable insecure warnings
 requests.packages.urllib3.disable_warnings()
@@ -26,6 +27,10 @@ if TOKEN:
     AUTH_HEADERS['SEC'] = str(TOKEN)
 OFFENSES_PER_CALL = int(demisto.params().get('offensesPerCall', 50))
 OFFENSES_PER_CALL = 50 if OFFENSES_PER_CALL > 50 else OFFENSES_PER_CALL
+# Max length of the ids list in a single `filter=id in (...)` query, keeps the request url under the common limits
+ADDRESS_IDS_FILTER_MAX_LENGTH = 1500
+# Max number of address id to ip mappings kept in the integration context between fetches
+ADDRESS_CACHE_MAX_SIZE = 10000
 
 if not TOKEN and not (USERNAME and PASSWORD):
     raise Exception('Either credentials or auth token should be provided.')
@@ -496,6 +501,7 @@ def fetch_incidents():
     full_enrich = demisto.params().get('full_enrich')
     last_run = demisto.getLastRun()
     offense_id = last_run['id'] if last_run and 'id' in last_run else 0
+    last_page_pos = last_run.get('last_page_pos') if last_run else None
     if last_run and offense_id == 0:
         start_time = last_run['startTime'] if 'startTime' in last_run else '0'
         fetch_query = 'start_time>{0}{1}'.format(start_time, ' AND ({0})'.format(query) if query else '')
@@ -509,38 +515,66 @@ def fetch_incidents():
     demisto.debug('QRadarMsg - Fetching {}'.format(fetch_query))
     raw_offenses = get_offenses(_range='0-{0}'.format(OFFENSES_PER_CALL), _filter=fetch_query)
     demisto.debug('QRadarMsg - Fetched {} successfully'.format(fetch_query))
+    new_last_run = {}  # type: dict
     if len(raw_offenses) >= OFFENSES_PER_CALL:
-        last_offense_pos = find_last_page_pos(fetch_query)
+        last_offense_pos = find_last_page_pos(fetch_query, last_page_pos)
         raw_offenses = get_offenses(_range='{0}-{1}'.format(last_offense_pos - OFFENSES_PER_CALL + 1, last_offense_pos),
                                     _filter=fetch_query)
+        # the fetched offenses are the last page, so on the next fetch the list end is expected a page earlier
+        new_last_run['last_page_pos'] = last_offense_pos - OFFENSES_PER_CALL
     raw_offenses = unicode_to_str_recur(raw_offenses)
     incidents = []
     if full_enrich:
         demisto.debug('QRadarMsg - Enriching  {}'.format(fetch_query))
-        enrich_offense_res_with_source_and_destination_address(raw_offenses)
+        enrich_offense_res_with_source_and_destination_address(raw_offenses, use_address_cache=True)
         demisto.debug('QRadarMsg - Enriched  {} successfully'.format(fetch_query))
     for offense in raw_offenses:
         offense_id = max(offense_id, offense['id'])
         incidents.append(create_incident_from_offense(offense))
-    demisto.setLastRun({'id': offense_id})
+    new_last_run['id'] = offense_id
+    demisto.setLastRun(new_last_run)
     return incidents
 
 
+# Checks whether the QRadar query has a result in the given position
+def offense_exists_in_pos(fetch_query, pos):
+    return len(get_offenses(_range='{0}-{0}'.format(pos), _filter=fetch_query)) == 1
+
+
 # Finds the last page position for QRadar query that receives a range parameter
-def find_last_page_pos(fetch_query):
+# last_pos_hint - the expected position (from the previous fetch), the search starts around it when given
+def find_last_page_pos(fetch_query, last_pos_hint=None):
     # Make sure it wasn't a fluke we have exactly OFFENSES_PER_CALL results
-    if len(get_offenses(_range='{0}-{0}'.format(OFFENSES_PER_CALL), _filter=fetch_query)) == 0:
+    if not offense_exists_in_pos(fetch_query, OFFENSES_PER_CALL):
         return OFFENSES_PER_CALL - 1
-    # Search up until we don't have any more results
-    pos = OFFENSES_PER_CALL * 2
-    while len(get_offenses(_range='{0}-{0}'.format(pos), _filter=fetch_query)) == 1:
-        pos = pos * 2
-    # Binary search the gap from the las step
-    high = pos
-    low = pos / 2
+    if last_pos_hint and last_pos_hint > OFFENSES_PER_CALL:
+        # Search outwards from the hint with a growing step, until the end of the list is between low and high
+        step = 1
+        if offense_exists_in_pos(fetch_query, last_pos_hint):
+            low = last_pos_hint
+            high = last_pos_hint + step
+            while offense_exists_in_pos(fetch_query, high):
+                low = high
+                step = step * 2
+                high = last_pos_hint + step
+        else:
+            high = last_pos_hint
+            low = max(last_pos_hint - step, OFFENSES_PER_CALL)
+            while low > OFFENSES_PER_CALL and not offense_exists_in_pos(fetch_query, low):
+                high = low
+                step = step * 2
+                low = max(last_pos_hint - step, OFFENSES_PER_CALL)
+    else:
+        # Search up until we don't have any more results
+        pos = OFFENSES_PER_CALL * 2
+        while offense_exists_in_pos(fetch_query, pos):
+            pos = pos * 2
+        high = pos
+        low = pos // 2
+    # Binary search the gap from the last step
     while high > low + 1:
-        pos = (high + low) / 2
-        if len(get_offenses(_range='{0}-{0}'.format(pos), _filter=fetch_query)) == 1:
+        pos = (high + low) // 2
+        if offense_exists_in_pos(fetch_query, pos):
             # we still have results, raise the bar
             low = pos
         else:
@@ -610,15 +644,20 @@ def enrich_single_offense_result(offense, full_enrichment, type_dict=None, closi
 
 
 # Enriches offense result dictionary with source and destination addresses
-def enrich_offense_res_with_source_and_destination_address(response):
+# use_address_cache - resolve the addresses ids from (and save them to) the integration context cache
+def enrich_offense_res_with_source_and_destination_address(response, use_address_cache=False):
     src_adrs, dst_adrs = extract_source_and_destination_addresses_ids(response)
     # This command might encounter HTML error page in certain cases instead of JSON result. Fallback: cancel the
     # enrichment
     try:
+        src_cache = get_address_cache('source_addresses') if use_address_cache else None
+        dst_cache = get_address_cache('destination_addresses') if use_address_cache else None
         if src_adrs:
-            enrich_source_addresses_dict(src_adrs)
+            enrich_source_addresses_dict(src_adrs, src_cache)
         if dst_adrs:
-            enrich_destination_addresses_dict(dst_adrs)
+            enrich_destination_addresses_dict(dst_adrs, dst_cache)
+        if use_address_cache:
+            set_address_caches({'source_addresses': src_cache, 'destination_addresses': dst_cache})
         if isinstance(response, list):
             for offense in response:
                 enrich_single_offense_res_with_source_and_destination_address(offense, src_adrs, dst_adrs)
@@ -653,25 +692,64 @@ def populate_src_and_dst_dicts_with_single_offense(offense, src_ids, dst_ids):
     return None
 
 
+# Helper method: Loads an address id to ip LRU cache (least recently used first) from the integration context
+def get_address_cache(cache_key):
+    return OrderedDict((adr_id, adr) for adr_id, adr in demisto.getIntegrationContext().get(cache_key, []))
+
+
+# Helper method: Saves the address LRU caches to the integration context, keeping the most recently used entries
+def set_address_caches(caches):
+    integration_context = demisto.getIntegrationContext()
+    for cache_key, cache in caches.items():
+        integration_context[cache_key] = list(cache.items())[-ADDRESS_CACHE_MAX_SIZE:]
+    demisto.setIntegrationContext(integration_context)
+
+
+# Helper method: Splits ids into chunks whose comma separated string is at most ADDRESS_IDS_FILTER_MAX_LENGTH long
+def chunk_address_ids(ids):
+    chunk = []  # type: list
+    chunk_length = 0
+    for adr_id in ids:
+        adr_id = convert_to_str(adr_id)
+        if chunk and chunk_length + len(adr_id) + 1 > ADDRESS_IDS_FILTER_MAX_LENGTH:
+            yield chunk
+            chunk = []
+            chunk_length = 0
+        chunk.append(adr_id)
+        chunk_length += len(adr_id) + 1
+    if chunk:
+        yield chunk
+
+
+# Helper method: Enriches an addresses ids dictionary with the addresses values corresponding to the ids, taken from
+# the address_cache when given, otherwise queried from the endpoint in chunks
+def enrich_addresses_dict(adrs, endpoint, ip_field, address_cache=None):
+    ids_to_query = []
+    for adr_id in adrs:
+        if address_cache is not None and adr_id in address_cache:
+            # re-insert to mark the entry as recently used
+            adrs[adr_id] = address_cache[adr_id] = address_cache.pop(adr_id)
+        else:
+            ids_to_query.append(adr_id)
+    for ids_chunk in chunk_address_ids(ids_to_query):
+        url = '{0}/api/siem/{1}?filter=id in ({2})'.format(SERVER, endpoint, ','.join(ids_chunk))
+        res = send_request('GET', url, AUTH_HEADERS)
+        for adr in res:
+            adrs[adr['id']] = convert_to_str(adr[ip_field])
+            if address_cache is not None:
+                address_cache[adr['id']] = adrs[adr['id']]
+    return adrs
+
+
 # Helper method: Enriches the source addresses ids dictionary with the source addresses values corresponding to the ids
-def enrich_source_addresses_dict(src_adrs):
-    src_ids_str = dict_values_to_comma_separated_string(src_adrs)
-    source_url = '{0}/api/siem/source_addresses?filter=id in ({1})'.format(SERVER, src_ids_str)
-    src_res = send_request('GET', source_url, AUTH_HEADERS)
-    for src_adr in src_res:
-        src_adrs[src_adr['id']] = convert_to_str(src_adr['source_ip'])
-    return src_adrs
+def enrich_source_addresses_dict(src_adrs, address_cache=None):
+    return enrich_addresses_dict(src_adrs, 'source_addresses', 'source_ip', address_cache)
 
 
 # Helper method: Enriches the destination addresses ids dictionary with the source addresses values corresponding to
 # the ids
-def enrich_destination_addresses_dict(dst_adrs):
-    dst_ids_str = dict_values_to_comma_separated_string(dst_adrs)
-    destination_url = '{0}/api/siem/local_destination_addresses?filter=id in ({1})'.format(SERVER, dst_ids_str)
-    dst_res = send_request('GET', destination_url, AUTH_HEADERS)
-    for dst_adr in dst_res:
-        dst_adrs[dst_adr['id']] = convert_to_str(dst_adr['local_destination_ip'])
-    return dst_adrs
+def enrich_destination_addresses_dict(dst_adrs, address_cache=None):
+    return enrich_addresses_dict(dst_adrs, 'local_destination_addresses', 'local_destination_ip', address_cache)
 
 
 # Helper method: For a single offense replaces the source and destination ids with the actual addresses
@@ -279,6 +279,53 @@ def test_upload_indicators_command_no_indicators_found(mocker):
     assert res == "No indicators found, Reference set test_ref_set didn't change"
 
 
+def test_find_last_page_pos_with_hint(mocker):
+    """
+    Given:
+        - A fetch query with 130 results, and the last page position of the previous fetch
+    When:
+        - Looking for the last page position
+    Then:
+        - The last position is found, with less queries when the hint is close to it
+    """
+    import QRadar as qradar
+    get_offenses = mocker.patch.object(qradar, 'get_offenses',
+                                       side_effect=lambda _range, _filter: [{}] if int(_range.split('-')[0]) < 130 else [])
+    assert qradar.find_last_page_pos('id>0') == 129
+    calls_without_hint = get_offenses.call_count
+
+    get_offenses.reset_mock()
+    assert qradar.find_last_page_pos('id>0', 128) == 129
+    assert get_offenses.call_count < calls_without_hint
+
+    get_offenses.reset_mock()
+    assert qradar.find_last_page_pos('id>0', 140) == 129
+
+
+def test_enrich_addresses_dict_with_cache(mocker):
+    """
+    Given:
+        - Addresses ids, some of them already in the addresses cache
+    When:
+        - Enriching the addresses ids dictionary
+    Then:
+        - Only the ids missing from the cache are queried, in chunks, and the cache is updated
+    """
+    import QRadar as qradar
+    from collections import OrderedDict
+    mocker.patch.object(qradar, 'ADDRESS_IDS_FILTER_MAX_LENGTH', 6)
+    send_request = mocker.patch.object(qradar, 'send_request', side_effect=[
+        [{'id': 11, 'source_ip': '1.1.1.1'}, {'id': 12, 'source_ip': '1.1.1.2'}],
+        [{'id': 13, 'source_ip': '1.1.1.3'}]
+    ])
+    address_cache = OrderedDict([(10, '1.1.1.0')])
+    src_adrs = {10: 10, 11: 11, 12: 12, 13: 13}
+    qradar.enrich_source_addresses_dict(src_adrs, address_cache)
+    assert src_adrs == {10: '1.1.1.0', 11: '1.1.1.1', 12: '1.1.1.2', 13: '1.1.1.3'}
+    assert send_request.call_count == 2
+    assert dict(address_cache) == src_adrs
+
+
 """ CONSTANTS """
 REQUEST_HEADERS = {'Content-Type': 'application/json', 'SEC': 'token'}
 NON_URL_SAFE_MSG = 'non-safe/;/?:@=&"<>#%{}|\\^~[] `'
@@ -4,6 +4,9 @@ from CommonServerUserPython import *
 import zlib
 import pyshark
 from datetime import datetime
+from collections import deque
+from contextlib import closing
+from itertools import islice
 import re
 
 # Used to convert pyshark keys to Demisto's conventions
@@ -115,25 +118,6 @@ def get_entry_from_args():
     return res, entry_id
 
 
-def _chunker(seq, size):
-    """
-    Function that groups items in a sequence for easier iteration of multiple items at once.
-
-    :param seq: the sequence (list/generator)
-    :param size: the size of the group (chunk)
-    :return: an iterator that outputs groups of items (chunks) from the sequence
-    """
-    ret = []
-    for i in range(0, len(seq), size):
-        chunk = seq[i: i + size]
-
-        # Make sure the chunks are with a specified size
-        padding = ["" for j in range(size - len(chunk))]
-        ret.append(chunk + padding)
-
-    return iter(ret)
-
-
 def decode_gzip(str_compressed):
     """
     Decode a hex string with gz decompression
@@ -155,80 +139,71 @@ def _date_to_ISO(strdate):
     return datetime.strptime(strdate, '%a, %d %b %Y %H:%M:%S %Z').isoformat()
 
 
-def get_next_matching_index(http_packets, tcp_src, tcp_dst, ip_src, ip_dst):
-    for i, p in enumerate(http_packets):
-        if p["TCP"].srcport == tcp_dst and \
-                p["TCP"].dstport == tcp_src and \
-                p["IP"].src == ip_dst and \
-                p["IP"].dst == ip_src:
-            return i
-    return None
+def get_flow_key(packet):
+    """
+    Get the (ip src, tcp src port, ip dst, tcp dst port) tuple of the packet.
+
+    :param packet: a pyshark packet.
+    :return: the 4-tuple of the packet.
+    """
+    return packet["IP"].src, packet["TCP"].srcport, packet["IP"].dst, packet["TCP"].dstport
 
 
-def fix_order(http_packets):
+def pair_http_packets(keyed_packets):
     """
-    Re-organizes the http packets to be request-response pairs.
+    Pairs the http packets to request-response pairs.
     Sometimes pyshark doesn't put the packets in the order they are HTTP-wise.
-    So we are re-organizing them according to the tcp and ip information of the packets.
-    :param http_packets:
-    :return: http_packets
+    So each packet is paired with the earliest pending packet that has the reversed tcp,ip tuple,
+    and the pairs are yielded as soon as they are complete.
+    Packets left without a pair are yielded at the end, in capture order, with None as their pair.
+
+    :param keyed_packets: an iterable of (4-tuple, packet) in capture order.
+    :return: a generator of (packet, matching packet or None) pairs.
     """
-    new_order = []
-
-    # For each packet find the next one that matches the tcp,ip tuple.
-    while len(http_packets) > 0:
-        packet = http_packets[0]
-        tcp_src = packet["TCP"].srcport
-        tcp_dst = packet["TCP"].dstport
-        ip_src = packet["IP"].src
-        ip_dst = packet["IP"].dst
-        new_order.append(packet)
-        del http_packets[0]
-
-        next_matching_index = get_next_matching_index(http_packets, tcp_src, tcp_dst, ip_src, ip_dst)
-        if next_matching_index is None:
-            new_order.append(None)
+    pending_packets = {}  # 4-tuple -> deque of (capture index, packet) waiting for their pair
+
+    for capture_index, (flow_key, packet) in enumerate(keyed_packets):
+        reverse_flow_key = (flow_key[2], flow_key[3], flow_key[0], flow_key[1])
+        matching_packets = pending_packets.get(reverse_flow_key)
+
+        if matching_packets:
+            _, matching_packet = matching_packets.popleft()
+            if not matching_packets:
+                del pending_packets[reverse_flow_key]
+            yield matching_packet, packet
         else:
-            new_order.append(http_packets[next_matching_index])
-            del http_packets[next_matching_index]
+            pending_packets.setdefault(flow_key, deque()).append((capture_index, packet))
 
-    return new_order
+    unmatched_packets = sorted((item for items in pending_packets.values() for item in items), key=lambda x: x[0])
+    for _, packet in unmatched_packets:
+        yield packet, None
 
 
-def get_http_flows(pcap_file_path):
+def get_http_flows(pcap_file_path, keys_transform_map, trim_file_data_size, allowed_content_types):
     """
-    Return a list of HTTP requests/responses from pcap file
+    Return a generator of HTTP requests/responses from pcap file.
+    The capture is streamed, and each packet is formatted (and filtered by content type) as soon as it is read,
+    so only the formatted packets which are waiting for their pair are kept in memory.
 
-    :param pcap_file_path:
-    :return: list of requests/response pairs.
+    :param pcap_file_path: path to the pcap file.
+    :param keys_transform_map: a map of pyshark keys to Demisto standard keys.
+    :param trim_file_data_size: the byte size of max file_data_size
+    :param allowed_content_types: allowed content types to display
+    :return: generator of formatted requests/response pairs.
     """
-    capture_object = pyshark.FileCapture(pcap_file_path, display_filter='tcp')
-
-    # Filter all non HTTP packets
-    http_packets = [p for p in capture_object if "HTTP" in p]
-
-    http_packets = fix_order(http_packets)
-
-    # Construct request <> response dicts
-    http_flows = []
-    for req, res in _chunker(http_packets, 2):
-        # GZ decompress if needed
-        # if res["HTTP"].get_field_value("Content-Encoding") == "gzip":
-        #
-        #     # Fix data not existing
-        #     if not hasattr(res["HTTP"], "data"):
-        #         res["HTTP"].data = res["HTTP"].get("file_data")
-        #     # else:
-        #         # try:
-        #         #     res["HTTP"].data = decode_gzip(res["HTTP"].data)
-        #         # except zlib.error:
-        #         #     res["HTTP"].data = "Couldn't decompress gzip data (incomplete or truncated stream)."
-
-        http_flows.append({
-            "Request": req,
-            "Response": res
-        })
-    return http_flows
+    with closing(pyshark.FileCapture(pcap_file_path, display_filter='http', keep_packets=False)) as capture_object:
+        keyed_packets = ((get_flow_key(p),
+                          create_flow_object(p, keys_transform_map, trim_file_data_size, allowed_content_types))
+                         for p in capture_object if "HTTP" in p)
+
+        for req, res in pair_http_packets(keyed_packets):
+            if res is None:
+                res = create_flow_object(None, keys_transform_map, trim_file_data_size, allowed_content_types)
+
+            yield {
+                "Request": req,
+                "Response": res
+            }
 
 
 def get_flow_info(http_flow):
@@ -321,28 +296,6 @@ def create_flow_object(flow, keys_transform_map, trim_file_data_size, allowed_co
     return r
 
 
-def format_http_flows(http_flows, keys_transform_map, trim_file_data_size, allowed_content_types):
-    """
-    Merge the HTTP, IP and TCP fields together and create a usable object for further proceeding.
-
-    :param http_flows:
-    :param keys_transform_map:
-    :return: http_flows object
-    """
-    formatted_http_flows = []
-
-    for flow in http_flows:
-        req = create_flow_object(flow["Request"], keys_transform_map, trim_file_data_size, allowed_content_types)
-        res = create_flow_object(flow["Response"], keys_transform_map, trim_file_data_size, allowed_content_types)
-
-        formatted_http_flows.append({
-            "Request": req,
-            "Response": res
-        })
-
-    return formatted_http_flows
-
-
 def get_markdown_output(http_flows):
     """
            Convert a list of http flows into a markdown table
@@ -385,17 +338,14 @@ if __name__ == "builtins":
     else:
         ALLOWED_CONTENT_TYPES = tuple(demisto.args()["allowedContentTypes"].split(","))  # type: ignore
 
-    # Work on the pcap file and return a result
-    http_flows = get_http_flows(pcap_file_path_in_container)
-
-    # Cut results according to the user args (times 2, because we are working on pairs of requests and responses).
-    if START:
-        http_flows = http_flows[int(START):]
-    if LIMIT:
-        http_flows = http_flows[:int(LIMIT)]
+    # Work on the pcap file and return a result, the capture is read only until the requested flows are found
+    start = int(START) if START else 0
+    stop = start + int(LIMIT) if LIMIT else None
+    with closing(get_http_flows(pcap_file_path_in_container, PYSHARK_RES_TO_DEMISTO, LIMIT_DATA,
+                                ALLOWED_CONTENT_TYPES)) as http_flows:
+        formatted_http_flows = list(islice(http_flows, start, stop))
 
-    # Format and get output representation of the flows
-    formatted_http_flows = format_http_flows(http_flows, PYSHARK_RES_TO_DEMISTO, LIMIT_DATA, ALLOWED_CONTENT_TYPES)
+    # Get output representation of the flows
     markdown_output = get_markdown_output(formatted_http_flows)
     context_output = formatted_http_flows
 
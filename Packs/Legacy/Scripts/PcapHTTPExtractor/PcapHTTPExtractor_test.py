@@ -0,0 +1,61 @@
+from PcapHTTPExtractor import pair_http_packets
+
+CLIENT_1 = ('10.0.0.1', '50001', '10.0.0.2', '80')
+CLIENT_2 = ('10.0.0.3', '50002', '10.0.0.2', '80')
+
+
+def reverse(flow_key):
+    return flow_key[2], flow_key[3], flow_key[0], flow_key[1]
+
+
+def test_pair_http_packets():
+    """
+    Given
+    - Two connections with interleaved requests and responses, and a request with no response.
+
+    When
+    - Pairing the http packets.
+
+    Then
+    - Ensure each request is paired with the earliest response of its connection, as the responses arrive.
+    - Ensure the request with no response is returned last, with no pair.
+    """
+    keyed_packets = [
+        (CLIENT_1, 'req1'),
+        (CLIENT_2, 'req2'),
+        (CLIENT_1, 'req3'),
+        (reverse(CLIENT_2), 'res2'),
+        (reverse(CLIENT_1), 'res1'),
+        (CLIENT_2, 'req4'),
+        (reverse(CLIENT_1), 'res3'),
+    ]
+
+    assert list(pair_http_packets(keyed_packets)) == [
+        ('req2', 'res2'),
+        ('req1', 'res1'),
+        ('req3', 'res3'),
+        ('req4', None)
+    ]
+
+
+def test_pair_http_packets_is_lazy():
+    """
+    Given
+    - An endless stream of request/response packets.
+
+    When
+    - Pairing the http packets.
+
+    Then
+    - Ensure pairs are yielded before the stream is exhausted.
+    """
+    def endless_packets():
+        index = 0
+        while True:
+            yield CLIENT_1, 'req{}'.format(index)
+            yield reverse(CLIENT_1), 'res{}'.format(index)
+            index += 1
+
+    pairs = pair_http_packets(endless_packets())
+
+    assert [next(pairs) for _ in range(3)] == [('req0', 'res0'), ('req1', 'res1'), ('req2', 'res2')]
@@ -18,6 +18,7 @@ REPLACE_URLS = demisto.args()['replaceUrls'] == 'yes'
 REPLACE_NUMBERS = demisto.args()['replaceNumbers'] == 'yes'
 LEMMATIZER = demisto.args()['useLemmatization'] == 'yes'
 VALUE_IS_JSON = demisto.args()['isValueJson'] == 'yes'
+BATCH_SIZE = int(demisto.args().get('batchSize', 1000))
 
 HTML_PATTERNS = [
     re.compile(r"(?is)<(script|style).*?>.*?(</\1>)"),
@@ -26,10 +27,15 @@ HTML_PATTERNS = [
     re.compile(r"&nbsp;"),
     re.compile(r" +")
 ]
+WORD_PATTERN = re.compile(r"\S+", re.UNICODE)
+
+# pipeline components which are not used by the tokenization
+DISABLED_PIPELINE_COMPONENTS = ['tagger', 'parser', 'ner', 'textcat']
 
 # define global parsers
 html_parser = HTMLParser()
-nlp = spacy.load('en_core_web_sm', disable=['tagger', 'parser', 'ner', 'textcat'])
+nlp = spacy.load('en_core_web_sm', disable=DISABLED_PIPELINE_COMPONENTS)
+hashed_words = {}  # type: ignore
 
 
 def clean_html(text):
@@ -53,16 +59,32 @@ def remove_multiple_whitespaces(text):
 
 
 def hash_word(word):
-    return str(hash_djb2(word, int(HASH_SEED)))
+    hashed_word = hashed_words.get(word)
+    if hashed_word is None:
+        hashed_word = hashed_words[word] = str(hash_djb2(word, int(HASH_SEED)))
+    return hashed_word
 
 
-def tokenize_text(text):
+def to_unicode(text):
     try:
-        unicode_text = unicode(text)
+        return unicode(text)
     except Exception:
-        unicode_text = text
-    doc = nlp(unicode(unicode_text))
-    original_text_indices_to_words = map_indices_to_words(unicode_text)
+        return text
+
+
+def tokenize_text(text):
+    return tokenize_doc(nlp(to_unicode(text)))
+
+
+def tokenize_texts(texts):
+    """Tokenizes a list of texts, processing them in batches with nlp.pipe"""
+    docs = nlp.pipe((to_unicode(text) for text in texts), batch_size=BATCH_SIZE)
+    return [tokenize_doc(doc) for doc in docs]
+
+
+def tokenize_doc(doc):
+    words_spans = get_words_spans(doc.text)
+    word_index = 0
     tokens_list = []
     original_words_to_tokens = {}  # type: ignore
     for word in doc:
@@ -88,7 +110,10 @@ def tokenize_text(text):
             else:
                 token_to_add = word.lower_
             tokens_list.append(token_to_add)
-            original_word = original_text_indices_to_words[word.idx]
+            # tokens are ordered by their offsets, so the word containing the token is found by moving forward
+            while words_spans[word_index][1] <= word.idx:
+                word_index += 1
+            original_word = words_spans[word_index][2]
             if original_word not in original_words_to_tokens:
                 original_words_to_tokens[original_word] = []
             original_words_to_tokens[original_word].append(token_to_add)
@@ -105,19 +130,9 @@ def tokenize_text(text):
         hashed_tokens_list) > 0 else None, original_words_to_tokens, hashed_words_to_tokens
 
 
-def map_indices_to_words(unicode_text):
-    original_text_indices_to_words = {}
-    word_start = 0
-    while word_start < len(unicode_text) and unicode_text[word_start].isspace():
-        word_start += 1
-    for word in unicode_text.split():
-        for char_idx, char in enumerate(word):
-            original_text_indices_to_words[word_start + char_idx] = word
-        # find beginning of next word
-        word_start += len(word)
-        while word_start < len(unicode_text) and unicode_text[word_start].isspace():
-            word_start += 1
-    return original_text_indices_to_words
+def get_words_spans(unicode_text):
+    """Returns the (start, end, word) spans of the whitespace separated words of the text"""
+    return [(match.start(), match.end(), match.group()) for match in WORD_PATTERN.finditer(unicode_text)]
 
 
 def word_tokenize(text):
@@ -131,12 +146,9 @@ def word_tokenize(text):
         text = [text]
 
     result = []
-    for t in text:
-        original_text = t
-        t = remove_line_breaks(t)
-        t = clean_html(t)
-        t = remove_multiple_whitespaces(t)
-        tokenized_text, hash_tokenized_text, original_words_to_tokens, words_to_hashed_tokens = tokenize_text(t)
+    cleaned_texts = [remove_multiple_whitespaces(clean_html(remove_line_breaks(t))) for t in text]
+    for original_text, tokenized in zip(text, tokenize_texts(cleaned_texts)):
+        tokenized_text, hash_tokenized_text, original_words_to_tokens, words_to_hashed_tokens = tokenized
         text_result = {
             'originalText': original_text,
             'tokenizedText': tokenized_text,
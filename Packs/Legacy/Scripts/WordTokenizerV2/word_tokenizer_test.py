@@ -14,7 +14,7 @@ def get_args():
 demistomock.args = get_args
 
 from WordTokenizer import remove_line_breaks, clean_html, tokenize_text, word_tokenize,\
-    remove_multiple_whitespaces, map_indices_to_words  # noqa
+    remove_multiple_whitespaces, get_words_spans, tokenize_texts  # noqa
 
 
 def test_remove_line_breaks():
@@ -55,5 +55,10 @@ def test_word_tokenize_words_to_tokens():
 
 def test_inclusion():
     text = 'a aa  aaa'
-    indices_to_words = map_indices_to_words(text)
-    assert indices_to_words == {0: 'a', 2: 'aa', 3: 'aa', 6: 'aaa', 7: 'aaa', 8: 'aaa'}
+    words_spans = get_words_spans(text)
+    assert words_spans == [(0, 1, 'a'), (2, 4, 'aa'), (6, 9, 'aaa')]
+
+
+def test_tokenize_texts():
+    texts = ["test@demisto.com is 100 going to http://google.com bla bla", "let's go  now"]
+    assert tokenize_texts(texts) == [tokenize_text(text) for text in texts]
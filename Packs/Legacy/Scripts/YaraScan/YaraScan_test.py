@@ -1,11 +1,13 @@
 
+import importlib
+
+import yara
+import YaraScan
 from YaraScan import main
 import demistomock as demisto
 from CommonServerPython import entryTypes
 
-
-def test_main(mocker):
-    rule = '''rule PE_file_identifier
+RULE = '''rule PE_file_identifier
 {
     meta:
         author = "Adam Burt"
@@ -19,6 +21,10 @@ def test_main(mocker):
         $MZ at 0
 }'''
 
+
+def test_main(mocker):
+    rule = RULE
+
     def executeCommand(name, args=None):
         if name == 'getFilePath':
             return [
@@ -46,3 +52,65 @@ def test_main(mocker):
     assert results[0]['Type'] == entryTypes['note']
     assert results[0]['Contents'][0]['HasMatch']
     assert results[0]['Contents'][0]['Matches'][0]['RuleName'] == 'PE_file_identifier'
+
+
+def test_main_multiple_files_cached_rule(mocker, tmp_path):
+    """
+    Given
+    - A yara rule and several files, one of them missing.
+
+    When
+    - Scanning the files twice.
+
+    Then
+    - Ensure the rule is compiled only once.
+    - Ensure the results keep the order of the entries, and the missing file is reported as an error.
+    """
+    files = {
+        'entry1': 'test_data/unzip.exe',
+        'entry2': 'test_data/missing.exe',
+        'entry3': 'test_data/unzip.exe'
+    }
+
+    def executeCommand(name, args=None):
+        return [{'Type': entryTypes['note'],
+                 'Contents': {'path': files[args['id']], 'name': args['id'], 'ID': args['id']}}]
+
+    mocker.patch.object(YaraScan, 'COMPILED_RULES_CACHE_DIR', str(tmp_path))
+    compile_spy = mocker.spy(yara, 'compile')
+    mocker.patch.object(demisto, 'args', return_value={'entryIDs': 'entry1,entry2,entry3', 'yaraRule': RULE})
+    mocker.patch.object(demisto, 'executeCommand', side_effect=executeCommand)
+    mocker.patch.object(demisto, 'results')
+
+    main()
+    main()
+
+    assert compile_spy.call_count == 1
+    contents = demisto.results.call_args[0][0]['Contents']
+    assert [result['entryID'] for result in contents] == ['entry1', 'entry2', 'entry3']
+    assert [result['HasMatch'] for result in contents] == [True, False, True]
+    assert contents[1]['HasError']
+
+
+def test_compiled_rules_cache_survives_module_reload(mocker, tmp_path):
+    """
+    Given
+    - A yara rule which was compiled by a previous run of the script.
+
+    When
+    - Loading the script module again, as a new run in the same container does, and getting the compiled rule.
+
+    Then
+    - Ensure the compiled rule is loaded from the cache on disk instead of being compiled again.
+    """
+    mocker.patch('tempfile.gettempdir', return_value=str(tmp_path))
+    first_run = importlib.reload(YaraScan)
+    first_run.get_compiled_rules(RULE)
+
+    compile_spy = mocker.spy(yara, 'compile')
+    second_run = importlib.reload(YaraScan)
+    compiled_rules = second_run.get_compiled_rules(RULE)
+
+    assert compile_spy.call_count == 0
+    assert second_run.COMPILED_RULES_CACHE_DIR.startswith(str(tmp_path))
+    assert compiled_rules.match(filepath='test_data/unzip.exe')[0].rule == 'PE_file_identifier'
@@ -1,12 +1,26 @@
 from CommonServerPython import *
 
 # IMPORTS
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from typing import Dict
+
 # Disable insecure warnings
 requests.packages.urllib3.disable_warnings()
 
 # CONSTANTS
 DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
 SEARCH_LIMIT = 200
+# The maximal page size of the logs and group members endpoints
+MAX_PAGE_SIZE = 1000
+# Wait for the rate limit window to reset once this number of requests (or fewer) remain in it
+RATE_LIMIT_REMAINING_THRESHOLD = 2
+MAX_RATE_LIMIT_WAIT_SECONDS = 60
+# The number of logins to resolve with a single combined filter query
+MAX_LOGINS_PER_FILTER = 20
+# The number of concurrent requests of the bulk commands
+MAX_BULK_WORKERS = 5
+MAX_RATE_LIMITED_ATTEMPTS = 3
 PROFILE_ARGS = [
     'firstName',
     'lastName',
@@ -47,9 +61,15 @@ class Client(BaseClient):
     Client will implement the service API, and should not contain any Demisto logic.
     Should only do requests and return data.
     """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Group IDs are looked up only once per run
+        self.group_ids: Dict[str, str] = {}
 
     # Getting Group Id with a given group name
     def get_group_id(self, group_name):
+        if group_name in self.group_ids:
+            return self.group_ids[group_name]
         uri = 'groups'
         query_params = {
             'q': encode_string_results(group_name)
@@ -60,6 +80,7 @@ class Client(BaseClient):
             params=query_params
         )
         if res and len(res) == 1:
+            self.group_ids[group_name] = res[0].get('id')
             return res[0].get('id')
 
     # Getting User Id with a given username
@@ -78,6 +99,20 @@ class Client(BaseClient):
             return res[0].get('id')
         raise Exception(f'Failed to find userID for: {username} username.')
 
+    # Getting the User Ids of many usernames, with a combined filter query per chunk of usernames
+    def get_user_ids(self, usernames):
+        user_ids = {}
+        for i in range(0, len(usernames), MAX_LOGINS_PER_FILTER):
+            query_filter = ' or '.join(f'profile.login eq "{escape_filter_value(username)}"'
+                                       for username in usernames[i:i + MAX_LOGINS_PER_FILTER])
+            query_params = {
+                'filter': encode_string_results(query_filter)
+            }
+            for user in self.get_paged_results('users', query_params):
+                # Okta logins are case insensitive
+                user_ids[user.get('profile', {}).get('login', '').lower()] = user.get('id')
+        return {username: user_ids.get(username.lower()) for username in usernames}
+
     def unlock_user(self, user_id):
         """
         sending a POST request to unlock a specific user
@@ -415,39 +450,77 @@ class Client(BaseClient):
             json_data=body
         )
 
-    def get_paged_results(self, uri, query_param=None):
+    @staticmethod
+    def wait_for_rate_limit(response, threshold=RATE_LIMIT_REMAINING_THRESHOLD):
+        """
+        Sleeps until the rate limit window resets if the response shows that it is about to be exhausted,
+        instead of running into 429 errors.
+        """
+        remaining = response.headers.get('X-Rate-Limit-Remaining')
+        reset = response.headers.get('X-Rate-Limit-Reset')
+        if remaining is None or reset is None or int(remaining) > threshold:
+            return
+        seconds_to_wait = min(max(int(reset) - time.time(), 0) + 1, MAX_RATE_LIMIT_WAIT_SECONDS)
+        demisto.debug(f'Okta rate limit is about to be exceeded ({remaining} requests remaining), '
+                      f'waiting {seconds_to_wait} seconds for it to reset.')
+        time.sleep(seconds_to_wait)
+
+    def rate_limited_request(self, method, url_suffix):
+        """
+        Sends a request which may run concurrently with other requests of a bulk command.
+        Waits for the rate limit window to reset when it is about to be exhausted by the concurrent requests,
+        and retries the request if it was rate limited anyway.
+        """
+        for _ in range(MAX_RATE_LIMITED_ATTEMPTS):
+            response = self._http_request(
+                method=method,
+                url_suffix=url_suffix,
+                resp_type='response',
+                ok_codes=(200, 204, 429)
+            )
+            self.wait_for_rate_limit(response, threshold=MAX_BULK_WORKERS)
+            if response.status_code != 429:
+                return response
+        raise Exception(f'Okta rate limit was exceeded {MAX_RATE_LIMITED_ATTEMPTS} times for {url_suffix}')
+
+    def get_paged_results(self, uri, query_param=None, max_results=None):
+        """
+        Yields the results of a paged request, following the `next` links one page at a time.
+        Stops once max_results results were yielded (if supplied) or there are no more results.
+        The commands return all of the results in a single entry and collect them into a list, so their memory
+        is bounded by max_results and, for logs, by the `until` time window, rather than by the page size.
+        """
         response = self._http_request(
             method="GET",
             url_suffix=uri,
             resp_type='response',
             params=query_param
         )
-        paged_results = response.json()
-        while "next" in response.links and len(response.json()) > 0:
-            next_page = response.links.get("next").get("url")
+        results_count = 0
+        while True:
+            page = response.json()
+            if max_results:
+                page = page[:max_results - results_count]
+            yield from page
+            results_count += len(page)
+            if not page or "next" not in response.links or (max_results and results_count >= max_results):
+                return
+            self.wait_for_rate_limit(response)
+            # the next link already contains all of the query parameters
             response = self._http_request(
                 method="GET",
-                full_url=next_page,
+                full_url=response.links.get("next").get("url"),
                 url_suffix='',
-                resp_type='response',
-                params=query_param
-
+                resp_type='response'
             )
-            paged_results += response.json()
-        return paged_results
 
     def get_group_members(self, group_id, limit):
         uri = f'groups/{group_id}/users'
+        query_params = {}
         if limit:
-            query_params = {
-                'limit': limit
-            }
-            return self._http_request(
-                method="GET",
-                url_suffix=uri,
-                params=query_params
-            )
-        return self.get_paged_results(uri)
+            limit = int(limit)
+            query_params['limit'] = min(limit, MAX_PAGE_SIZE)
+        return list(self.get_paged_results(uri, query_params, max_results=limit))
 
     def list_groups(self, args):
         # Base url - if none of the the above specified - returns all the groups (default 200 items)
@@ -457,13 +530,10 @@ class Client(BaseClient):
             if key == 'query':
                 key = 'q'
             query_params[key] = encode_string_results(value)
-        if args.get('limit'):
-            return self._http_request(
-                method='GET',
-                url_suffix=uri,
-                params=query_params
-            )
-        return self.get_paged_results(uri, query_params)
+        limit = int(args['limit']) if args.get('limit') else None
+        if limit:
+            query_params['limit'] = min(limit, MAX_PAGE_SIZE)
+        return list(self.get_paged_results(uri, query_params, max_results=limit))
 
     def get_logs(self, args):
         uri = f'logs'
@@ -472,13 +542,14 @@ class Client(BaseClient):
             if key == 'query':
                 key = 'q'
             query_params[key] = encode_string_results(value)
-        if args.get('limit'):
-            return self._http_request(
-                method='GET',
-                url_suffix=uri,
-                params=query_params
-            )
-        return self.get_paged_results(uri, query_params)
+        if not query_params.get('until'):
+            # Without an upper time bound Okta keeps returning `next` links for new events as they arrive,
+            # so the time window is closed at the time of the request
+            query_params['until'] = datetime.utcnow().strftime(DATE_FORMAT)
+        limit = int(args['limit']) if args.get('limit') else None
+        if limit:
+            query_params['limit'] = min(limit, MAX_PAGE_SIZE)
+        return list(self.get_paged_results(uri, query_params, max_results=limit))
 
     def delete_user(self, user_term):
         uri = f"users/{encode_string_results(user_term)}"
@@ -674,6 +745,135 @@ def remove_from_group_command(client, args):
         raw_response)
 
 
+def escape_filter_value(value):
+    """
+    Escapes the backslashes and double quotes of a string value of an Okta filter expression.
+    """
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def unique_pairs(pairs):
+    """
+    Removes the (name, ID) pairs whose ID, or name when the ID was not found, appeared in an earlier pair.
+    """
+    seen = set()
+    unique = []
+    for name, item_id in pairs:
+        key = item_id or name
+        if key not in seen:
+            seen.add(key)
+            unique.append((name, item_id))
+    return unique
+
+
+def resolve_users(client, args):
+    """
+    Returns a list of (username, user ID) pairs of the users given by the 'userIds' and 'usernames' arguments.
+    The user ID is None for usernames which were not found.
+    """
+    user_ids = argToList(args.get('userIds'))
+    usernames = argToList(args.get('usernames'))
+    if not (user_ids or usernames):
+        raise Exception("You must supply either 'usernames' or 'userIds'")
+    users = [(user_id, user_id) for user_id in user_ids]
+    if usernames:
+        users.extend(client.get_user_ids(list(dict.fromkeys(usernames))).items())
+    return unique_pairs(users)
+
+
+def run_bulk_requests(client, actions):
+    """
+    Runs the requests of a bulk command with a bounded pool of concurrent workers.
+
+    Args:
+        client: Okta client
+        actions: A list of (result row, method, url suffix) tuples, one per request.
+
+    Returns:
+        The result rows, each with a 'Result' column.
+    """
+    def run_action(action):
+        row, method, url_suffix = action
+        try:
+            client.rate_limited_request(method, url_suffix)
+            row['Result'] = 'Success'
+        except Exception as e:
+            row['Result'] = f'Failed: {str(e)}'
+        return row
+
+    if not actions:
+        return []
+    with ThreadPoolExecutor(max_workers=min(MAX_BULK_WORKERS, len(actions))) as executor:
+        return list(executor.map(run_action, actions))
+
+
+def bulk_group_membership_command(client, args, remove=False):
+    users = resolve_users(client, args)
+    groups = [(group_id, group_id) for group_id in argToList(args.get('groupIds'))]
+    groups.extend((group_name, client.get_group_id(group_name)) for group_name in argToList(args.get('groupNames')))
+    if not groups:
+        raise Exception("You must supply either 'groupNames' or 'groupIds'")
+    groups = unique_pairs(groups)
+
+    method = 'DELETE' if remove else 'PUT'
+    rows = []
+    actions = []
+    for (username, user_id), (group_name, group_id) in product(users, groups):
+        row = {'User': username, 'UserID': user_id, 'Group': group_name, 'GroupID': group_id}
+        if not user_id:
+            row['Result'] = 'Failed: user was not found'
+        elif not group_id:
+            row['Result'] = 'Failed: group was not found'
+        else:
+            actions.append((row, method, f'groups/{group_id}/users/{user_id}'))
+        rows.append(row)
+    run_bulk_requests(client, actions)
+
+    title = 'Removing users from groups' if remove else 'Adding users to groups'
+    readable_output = tableToMarkdown(title, rows, headers=['User', 'UserID', 'Group', 'GroupID', 'Result'])
+    return (
+        readable_output,
+        {},
+        rows
+    )
+
+
+def bulk_lifecycle_command(client, args, operation):
+    rows = []
+    actions = []
+    for username, user_id in resolve_users(client, args):
+        row = {'User': username, 'UserID': user_id}
+        if not user_id:
+            row['Result'] = 'Failed: user was not found'
+        else:
+            actions.append((row, 'POST', f'users/{user_id}/lifecycle/{operation}'))
+        rows.append(row)
+    run_bulk_requests(client, actions)
+
+    readable_output = tableToMarkdown(f'{operation.capitalize()} users', rows, headers=['User', 'UserID', 'Result'])
+    return (
+        readable_output,
+        {},
+        rows
+    )
+
+
+def add_users_to_groups_command(client, args):
+    return bulk_group_membership_command(client, args)
+
+
+def remove_users_from_groups_command(client, args):
+    return bulk_group_membership_command(client, args, remove=True)
+
+
+def activate_users_command(client, args):
+    return bulk_lifecycle_command(client, args, 'activate')
+
+
+def suspend_users_command(client, args):
+    return bulk_lifecycle_command(client, args, 'suspend')
+
+
 def get_groups_for_user_command(client, args):
     user_id = client.get_user_id(args.get('username'))
     raw_response = client.get_groups_for_user(user_id)
@@ -975,6 +1175,10 @@ def main():
         'okta-set-password': set_password_command,
         'okta-add-to-group': add_user_to_group_command,
         'okta-remove-from-group': remove_from_group_command,
+        'okta-add-users-to-groups': add_users_to_groups_command,
+        'okta-remove-users-from-groups': remove_users_from_groups_command,
+        'okta-activate-users': activate_users_command,
+        'okta-suspend-users': suspend_users_command,
         'okta-get-groups': get_groups_for_user_command,
         'okta-get-user-factors': get_user_factors_command,
         'okta-verify-push-factor': verify_push_factor_command,
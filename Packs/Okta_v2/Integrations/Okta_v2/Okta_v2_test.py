@@ -1,5 +1,9 @@
 from Okta_v2 import Client, get_user_command, get_group_members_command, create_user_command, \
-    verify_push_factor_command, get_groups_for_user_command, get_user_factors_command, get_logs_command
+    verify_push_factor_command, get_groups_for_user_command, get_user_factors_command, get_logs_command, \
+    add_users_to_groups_command, suspend_users_command
+import re
+import time
+
 import pytest
 
 
@@ -619,6 +623,156 @@ def test_get_logs_command(mocker):
     assert 'Unknown browser on Unknown OS Unknown device' in readable
     assert 'Chrome on Windows Computer' in readable
 
+
+def mock_paged_logs(requests_mock, rate_limit_remaining='100'):
+    pages = [[{'uuid': str(i)} for i in range(start, start + 2)] for start in range(0, 6, 2)]
+    for i, page in enumerate(pages):
+        headers = {'X-Rate-Limit-Remaining': rate_limit_remaining, 'X-Rate-Limit-Reset': str(int(time.time()) + 5)}
+        if i < len(pages) - 1:
+            headers['Link'] = f'<https://test.com/api/v1/logs?after={i + 1}>; rel="next"'
+        url = 'https://test.com/api/v1/logs' + (f'?after={i}' if i else '')
+        requests_mock.get(url, json=page, headers=headers, complete_qs=bool(i))
+    return pages
+
+
+def test_get_paged_results_pages_until_exhausted(mocker, requests_mock):
+    """
+    Given:
+        - Logs which are split into 3 pages.
+    When:
+        - Getting the logs without a limit.
+    Then:
+        - Ensure all the pages are fetched, and the time window is closed at the time of the request.
+    """
+    pages = mock_paged_logs(requests_mock)
+    sleep = mocker.patch.object(time, 'sleep')
+    paging_client = Client(base_url='https://test.com/api/v1/')
+
+    results = paging_client.get_logs({'since': '2020-04-01T00:00:00Z'})
+
+    assert results == pages[0] + pages[1] + pages[2]
+    assert requests_mock.call_count == 3
+    assert 'until' in requests_mock.request_history[0].qs
+    assert sleep.call_count == 0
+
+
+def test_get_paged_results_stops_at_limit(requests_mock):
+    """
+    Given:
+        - Logs which are split into 3 pages.
+    When:
+        - Getting the logs with a limit of 3.
+    Then:
+        - Ensure only the first 2 pages are fetched, and exactly 3 results are returned.
+    """
+    pages = mock_paged_logs(requests_mock)
+    paging_client = Client(base_url='https://test.com/api/v1/')
+
+    results = paging_client.get_logs({'limit': '3'})
+
+    assert results == pages[0] + pages[1][:1]
+    assert requests_mock.call_count == 2
+    assert requests_mock.request_history[0].qs['limit'] == ['3']
+
+
+def test_get_paged_results_waits_for_rate_limit(mocker, requests_mock):
+    """
+    Given:
+        - Logs which are split into 3 pages, where the rate limit is about to be exceeded.
+    When:
+        - Getting the logs.
+    Then:
+        - Ensure the integration waits for the rate limit window to reset before fetching each of the next pages.
+    """
+    mock_paged_logs(requests_mock, rate_limit_remaining='1')
+    sleep = mocker.patch.object(time, 'sleep')
+    paging_client = Client(base_url='https://test.com/api/v1/')
+
+    paging_client.get_logs({})
+
+    assert sleep.call_count == 2
+    assert 0 < sleep.call_args[0][0] <= 6
+
+
+def test_add_users_to_groups_command(mocker, requests_mock):
+    """
+    Given:
+        - 3 distinct usernames, one of which is repeated and one of which does not exist.
+        - 2 distinct group names, one of which is repeated.
+    When:
+        - Running the okta-add-users-to-groups command.
+    Then:
+        - Ensure the usernames are resolved with a single filter query, and each group name is looked up once.
+        - Ensure every existing user is added to every group exactly once, and the missing user is reported.
+    """
+    mocker.patch.object(time, 'sleep')
+    users = requests_mock.get('https://test.com/api/v1/users', json=[
+        {'id': 'id1', 'profile': {'login': 'user1@test.com'}},
+        {'id': 'id2', 'profile': {'login': 'User2@test.com'}}
+    ])
+    group1 = requests_mock.get('https://test.com/api/v1/groups?q=group1', json=[{'id': 'group_id1'}])
+    group2 = requests_mock.get('https://test.com/api/v1/groups?q=group2', json=[{'id': 'group_id2'}])
+    membership = requests_mock.put(re.compile('https://test.com/api/v1/groups/.*/users/.*'), status_code=204)
+    bulk_client = Client(base_url='https://test.com/api/v1/', ok_codes=(200, 204))
+    args = {'usernames': 'user1@test.com,user2@test.com,missing@test.com,user1@test.com',
+            'groupNames': 'group1,group2,group1'}
+
+    readable, _, rows = add_users_to_groups_command(bulk_client, args)
+
+    assert users.call_count == 1
+    assert users.last_request.qs['filter'] == [
+        'profile.login eq "user1@test.com" or profile.login eq "user2@test.com" or profile.login eq "missing@test.com"'
+    ]
+    assert group1.call_count == 1
+    assert group2.call_count == 1
+    assert sorted(request.path for request in membership.request_history) == [
+        '/api/v1/groups/group_id1/users/id1', '/api/v1/groups/group_id1/users/id2',
+        '/api/v1/groups/group_id2/users/id1', '/api/v1/groups/group_id2/users/id2'
+    ]
+    assert [row['Result'] for row in rows] == ['Success'] * 4 + ['Failed: user was not found'] * 2
+    assert 'Adding users to groups' in readable
+
+
+def test_get_user_ids_escapes_logins(requests_mock):
+    """
+    Given:
+        - A username containing a double quote and a backslash.
+    When:
+        - Resolving the user IDs of the usernames.
+    Then:
+        - Ensure the double quote and the backslash are escaped in the filter query.
+    """
+    users = requests_mock.get('https://test.com/api/v1/users', json=[])
+    bulk_client = Client(base_url='https://test.com/api/v1/')
+
+    assert bulk_client.get_user_ids(['a"b\\c']) == {'a"b\\c': None}
+    assert users.last_request.qs['filter'] == ['profile.login eq "a\\"b\\\\c"']
+
+
+def test_suspend_users_command_retries_rate_limited_requests(mocker, requests_mock):
+    """
+    Given:
+        - 2 user IDs, where the first request is rate limited.
+    When:
+        - Running the okta-suspend-users command.
+    Then:
+        - Ensure the rate limited request waits for the rate limit window to reset and is retried.
+    """
+    sleep = mocker.patch.object(time, 'sleep')
+    reset = str(int(time.time()) + 3)
+    requests_mock.post('https://test.com/api/v1/users/id1/lifecycle/suspend', [
+        {'status_code': 429, 'headers': {'X-Rate-Limit-Remaining': '0', 'X-Rate-Limit-Reset': reset}},
+        {'json': {}, 'headers': {'X-Rate-Limit-Remaining': '50', 'X-Rate-Limit-Reset': reset}}
+    ])
+    requests_mock.post('https://test.com/api/v1/users/id2/lifecycle/suspend', json={})
+    bulk_client = Client(base_url='https://test.com/api/v1/', ok_codes=(200, 204))
+
+    _, _, rows = suspend_users_command(bulk_client, {'userIds': 'id1,id2'})
+
+    assert rows == [{'User': 'id1', 'UserID': 'id1', 'Result': 'Success'},
+                    {'User': 'id2', 'UserID': 'id2', 'Result': 'Success'}]
+    assert sleep.call_count == 1
+
 # #
 # #
 
@@ -8,6 +8,11 @@ from CommonServerPython import *
 # Disable insecure warnings
 urllib3.disable_warnings()
 
+TOKEN_VALIDITY_DAYS = 1
+# regenerate the token a little before it actually expires, to avoid racing the server clock
+TOKEN_EXPIRATION_MARGIN_SECONDS = 10 * 60
+AUTH_FAILURE_STATUS_CODES = (401, 403)
+
 
 def reformat_resource_groups_outputs(text: str) -> str:
     """rg_*text -> ResourceGroupText
@@ -125,22 +130,38 @@ class Client(BaseClient):
         self._password = password
         self._tenant = tenant
         self._proxies = handle_proxy() if proxy else None
-        self._token = self._generate_token()
+        # a single keep-alive session, so all the requests of a command or a fetch share one connection
+        self._session = requests.Session()
+        if self._proxies:
+            self._session.proxies.update(self._proxies)
+        self._token = self._get_token()
 
     def http_request(self, method, url_suffix, headers=None, params=None, response_type: str = 'json'):
         """
-        Generic request to Securonix
+        Generic request to Securonix.
+        If the request is authenticated with a token that the server rejects, a new token is generated
+        and the request is sent once more.
         """
         full_url = urljoin(self._base_url, url_suffix)
         try:
-            result = requests.request(
+            result = self._session.request(
                 method,
                 full_url,
                 params=params,
                 headers=headers,
-                verify=self._verify,
-                proxies=self._proxies
+                verify=self._verify
             )
+            if result.status_code in AUTH_FAILURE_STATUS_CODES and headers and 'token' in headers:
+                demisto.debug(f'Securonix rejected the token with status {result.status_code}, regenerating it.')
+                self._token = self._get_token(force_refresh=True)
+                headers = dict(headers, token=self._token)
+                result = self._session.request(
+                    method,
+                    full_url,
+                    params=params,
+                    headers=headers,
+                    verify=self._verify
+                )
             if not result.ok:
                 raise ValueError(f'Error in API call to Securonix {result.status_code}. Reason: {result.text}')
             try:
@@ -188,16 +209,42 @@ class Client(BaseClient):
         headers = {
             'username': self._username,
             'password': self._password,
-            'validity': "1",
+            'validity': str(TOKEN_VALIDITY_DAYS),
             'tenant': self._tenant,
         }
         token = self.http_request('GET', '/token/generate', headers=headers, response_type='text')
         return token
 
+    def _get_token(self, force_refresh: bool = False) -> str:
+        """Get a valid token, generating a new one only if the cached token is missing or about to expire.
+
+        Args:
+            force_refresh: whether to generate a new token even if the cached one did not expire.
+
+        Returns:
+            A valid token.
+        """
+        integration_context = demisto.getIntegrationContext()
+        token = integration_context.get('token')
+        valid_until = integration_context.get('token_valid_until', 0)
+        now = int(time.time())
+        if token and not force_refresh and now < valid_until:
+            return token
+
+        token = self._generate_token()
+        integration_context.update({
+            'token': token,
+            'token_valid_until': now + TOKEN_VALIDITY_DAYS * 24 * 60 * 60 - TOKEN_EXPIRATION_MARGIN_SECONDS
+        })
+        demisto.setIntegrationContext(integration_context)
+        return token
+
     def test_module_request(self):
         """
-        Testing the instance configuration by sending a GET request
+        Testing the instance configuration by sending a GET request.
+        A new token is generated so that the configured credentials are validated rather than the cached token.
         """
+        self._token = self._get_token(force_refresh=True)
         self.list_workflows_request()
 
     def list_workflows_request(self) -> Dict:
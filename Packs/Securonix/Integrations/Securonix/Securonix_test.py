@@ -1,4 +1,8 @@
+import time
+
 import pytest
+
+import demistomock as demisto
 from Securonix import reformat_resource_groups_outputs, reformat_outputs, parse_data_arr, Client, list_workflows,\
     get_default_assignee_for_workflow, list_possible_threat_actions, list_resource_groups, list_users,\
     list_incidents, get_incident, create_incident, perform_action_on_incident, list_watchlists, get_watchlist, \
@@ -102,3 +106,92 @@ def test_commands(command, args, response, expected_result, mocker):
     mocker.patch.object(client, 'http_request', return_value=response)
     result = command(client, args)
     assert expected_result == result[1]  # entry context is found in the 2nd place in the result of the command
+
+
+def test_token_is_cached_in_integration_context(mocker, requests_mock):
+    """
+    Given:
+        - Two consecutive runs of the integration (e.g. a command followed by fetch).
+    When:
+        - Creating a Client in each run.
+    Then:
+        - Ensure a token is generated only once and reused from the integration context.
+    """
+    integration_context: dict = {}
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=lambda: dict(integration_context))
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=integration_context.update)
+    token_request = requests_mock.get('https://test.com/ws/token/generate', text='token1')
+
+    client = Client('tenant', 'https://test.com/ws/', 'username', 'password', False, False)
+    Client('tenant', 'https://test.com/ws/', 'username', 'password', False, False)
+
+    assert token_request.call_count == 1
+    assert client._token == 'token1'
+    assert integration_context['token'] == 'token1'
+
+
+def test_expired_token_is_regenerated(mocker, requests_mock):
+    """
+    Given:
+        - A token in the integration context which already expired.
+    When:
+        - Creating a Client.
+    Then:
+        - Ensure a new token is generated and cached.
+    """
+    integration_context = {'token': 'old_token', 'token_valid_until': 0}
+    mocker.patch.object(demisto, 'getIntegrationContext', return_value=integration_context)
+    set_context = mocker.patch.object(demisto, 'setIntegrationContext')
+    requests_mock.get('https://test.com/ws/token/generate', text='new_token')
+
+    client = Client('tenant', 'https://test.com/ws/', 'username', 'password', False, False)
+
+    assert client._token == 'new_token'
+    assert set_context.call_args[0][0]['token'] == 'new_token'
+
+
+def test_rejected_token_is_regenerated(mocker, requests_mock):
+    """
+    Given:
+        - A cached token which the server no longer accepts.
+    When:
+        - Sending an authenticated request.
+    Then:
+        - Ensure a new token is generated and the request is sent again with it.
+    """
+    integration_context = {'token': 'old_token', 'token_valid_until': time.time() + 3600}
+    mocker.patch.object(demisto, 'getIntegrationContext', return_value=integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext')
+    token_request = requests_mock.get('https://test.com/ws/token/generate', text='new_token')
+    requests_mock.get('https://test.com/ws/incident/get', [
+        {'status_code': 401, 'text': 'Invalid token'},
+        {'json': RESPONSE_LIST_WORKFLOWS}
+    ])
+
+    client = Client('tenant', 'https://test.com/ws/', 'username', 'password', False, False)
+    assert token_request.call_count == 0
+
+    assert client.list_workflows_request() == RESPONSE_LIST_WORKFLOWS['result']['workflows']
+    assert token_request.call_count == 1
+    assert requests_mock.last_request.headers['token'] == 'new_token'
+
+
+def test_unsecure_requests_ignore_ca_bundle_env(mocker, monkeypatch, requests_mock):
+    """
+    Given:
+        - An instance configured to trust any certificate, on a host which sets REQUESTS_CA_BUNDLE.
+    When:
+        - Sending requests through the client session.
+    Then:
+        - Ensure the certificates are not verified.
+    """
+    monkeypatch.setenv('REQUESTS_CA_BUNDLE', '/etc/ssl/certs/ca-certificates.crt')
+    mocker.patch.object(demisto, 'getIntegrationContext', return_value={})
+    mocker.patch.object(demisto, 'setIntegrationContext')
+    requests_mock.get('https://test.com/ws/token/generate', text='token')
+    requests_mock.get('https://test.com/ws/incident/get', json=RESPONSE_LIST_WORKFLOWS)
+
+    client = Client('tenant', 'https://test.com/ws/', 'username', 'password', False, False)
+    client.list_workflows_request()
+
+    assert [request.verify for request in requests_mock.request_history] == [False, False]
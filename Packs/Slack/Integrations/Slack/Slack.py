@@ -49,6 +49,7 @@ POLL_INTERVAL_MINUTES: Dict[Tuple, float] = {
     (60, ): 5
 }
 DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+DIRECTORY_MIN_REFRESH_MINUTES = 5
 
 ''' GLOBALS '''
 
@@ -71,6 +72,8 @@ BOT_NAME: str
 BOT_ICON_URL: str
 MAX_LIMIT_TIME: int
 PAGINATED_COUNT: int
+DIRECTORY_TTL_HOURS: int
+DIRECTORY_CACHE: Tuple[str, dict] = ('', {})
 
 ''' HELPER FUNCTIONS '''
 
@@ -134,6 +137,112 @@ def merge_lists(original_list: List[dict], updated_list: List[dict], key: str) -
     return list(original_dict.values())
 
 
+def get_directory() -> dict:
+    """
+    Gets the directory of the workspace from the integration context.
+    The directory holds the users by ID, an index of user names, emails and real names to user IDs,
+    and the conversations by name. The decoded directory is kept as long as the integration context value is unchanged.
+    :return: A copy of the directory
+    """
+    global DIRECTORY_CACHE
+    raw_directory = demisto.getIntegrationContext().get('directory', '')
+    if raw_directory != DIRECTORY_CACHE[0]:
+        DIRECTORY_CACHE = (raw_directory, json.loads(raw_directory) if raw_directory else {})
+
+    return DIRECTORY_CACHE[1].copy()
+
+
+def directory_needs_refresh(directory: dict, key: str, missed: bool) -> bool:
+    """
+    Checks whether a part of the directory should be refreshed from Slack.
+    :param directory: The directory
+    :param key: The key of the last refresh time (users_updated or conversations_updated)
+    :param missed: Whether the object being looked up is missing from the directory
+    :return: True if the directory part was never refreshed, its TTL passed, or a missing object can be looked up
+    """
+    last_updated = directory.get(key)
+    if not last_updated:
+        return missed
+    age = get_current_utc_time() - datetime.strptime(last_updated, DATE_FORMAT)
+    if age > timedelta(hours=DIRECTORY_TTL_HOURS):
+        return True
+
+    return missed and age > timedelta(minutes=DIRECTORY_MIN_REFRESH_MINUTES)
+
+
+def index_user(directory: dict, user: dict):
+    """
+    Adds a slack user to the directory, keeping only the user fields in use.
+    :param directory: The directory
+    :param user: The slack user
+    """
+    user_id = user.get('id')
+    if not user_id:
+        return
+    directory_user = {key: user[key] for key in ('id', 'name', 'real_name') if key in user}
+    if 'profile' in user:
+        directory_user['profile'] = {key: user['profile'][key] for key in
+                                     ('email', 'real_name', 'real_name_normalized', 'display_name')
+                                     if key in user['profile']}
+    directory.setdefault('users', {})[user_id] = directory_user
+    user_index = directory.setdefault('user_index', {})
+    for key in (user.get('name'), user.get('profile', {}).get('email'), user.get('real_name')):
+        if key:
+            user_index[key.lower()] = user_id
+
+
+def refresh_directory_users(directory: dict):
+    """
+    Rebuilds the users of the directory from all of the workspace users.
+    :param directory: The directory
+    """
+    directory['users'] = {}
+    directory['user_index'] = {}
+    body = {
+        'limit': PAGINATED_COUNT
+    }
+    response = send_slack_request_sync(CLIENT, 'users.list', http_verb='GET', body=body)
+    while True:
+        workspace_users = response['members'] if response and response.get('members', []) else []
+        for user in workspace_users:
+            index_user(directory, user)
+        cursor = response.get('response_metadata', {}).get('next_cursor')
+        if not cursor:
+            break
+        body = body.copy()
+        body.update({'cursor': cursor})
+        response = send_slack_request_sync(CLIENT, 'users.list', http_verb='GET', body=body)
+
+    directory['users_updated'] = datetime.strftime(get_current_utc_time(), DATE_FORMAT)
+
+
+def refresh_directory_conversations(directory: dict):
+    """
+    Rebuilds the conversations of the directory from all of the workspace public and private channels.
+    :param directory: The directory
+    """
+    directory['conversations'] = {}
+    body = {
+        'types': 'private_channel,public_channel',
+        'limit': PAGINATED_COUNT
+    }
+    response = send_slack_request_sync(CLIENT, 'conversations.list', http_verb='GET', body=body)
+    while True:
+        conversations = response['channels'] if response and response.get('channels') else []
+        for conversation in conversations:
+            if conversation.get('name'):
+                directory['conversations'][conversation['name']] = {'id': conversation.get('id'),
+                                                                    'name': conversation['name']}
+        cursor = response.get('response_metadata', {}).get('next_cursor')
+        if not cursor:
+            break
+        body = body.copy()
+        body.update({'cursor': cursor})
+        response = send_slack_request_sync(CLIENT, 'conversations.list', http_verb='GET', body=body)
+
+    directory['conversations_updated'] = datetime.strftime(get_current_utc_time(), DATE_FORMAT)
+
+
 def get_user_by_name(user_to_search: str, update_context: bool = True) -> dict:
     """
     Gets a slack user by a user name
@@ -141,47 +250,51 @@ def get_user_by_name(user_to_search: str, update_context: bool = True) -> dict:
     :param update_context Whether to update the integration context
     :return: A slack user object
     """
-
-    user: dict = {}
-    users: list = []
-    integration_context = demisto.getIntegrationContext()
-
+    directory = get_directory()
     user_to_search = user_to_search.lower()
-    if integration_context.get('users'):
-        users = json.loads(integration_context['users'])
-        users_filter = list(filter(lambda u: u.get('name', '').lower() == user_to_search
-                                             or u.get('profile', {}).get('email', '').lower() == user_to_search
-                                             or u.get('real_name', '').lower() == user_to_search, users))
-        if users_filter:
-            user = users_filter[0]
-    if not user:
-        body = {
-            'limit': PAGINATED_COUNT
-        }
-        response = send_slack_request_sync(CLIENT, 'users.list', http_verb='GET', body=body)
-        while True:
-            workspace_users = response['members'] if response and response.get('members', []) else []
-            cursor = response.get('response_metadata', {}).get('next_cursor')
-            users_filter = list(filter(lambda u: u.get('name', '').lower() == user_to_search
-                                                 or u.get('profile', {}).get('email', '').lower() == user_to_search
-                                                 or u.get('real_name', '').lower() == user_to_search, workspace_users))
-            if users_filter:
-                break
-            if not cursor:
-                break
-            body = body.copy()
-            body.update({'cursor': cursor})
-            response = send_slack_request_sync(CLIENT, 'users.list', http_verb='GET', body=body)
-
-        if users_filter:
-            user = users_filter[0]
+
+    if 'user_index' not in directory:
+        # Index the users cached before the directory existed
+        integration_context = demisto.getIntegrationContext()
+        for user in json.loads(integration_context.get('users') or '[]'):
+            index_user(directory, user)
+
+    user_id = directory.get('user_index', {}).get(user_to_search)
+    if directory_needs_refresh(directory, 'users_updated', not user_id):
+        refresh_directory_users(directory)
+        if update_context:
+            set_to_latest_integration_context({'directory': directory})
+        user_id = directory['user_index'].get(user_to_search)
+    elif not user_id and '@' in user_to_search:
+        # The user may have joined after the last refresh, before its team_join event arrived
+        user = get_user_by_email(user_to_search)
+        if user.get('id'):
+            index_user(directory, user)
             if update_context:
-                users.append(user)
-                set_to_latest_integration_context({'users': users})
-        else:
-            return {}
+                set_to_latest_integration_context({'directory': directory})
+            user_id = user['id']
 
-    return user
+    if not user_id:
+        return {}
+
+    return directory['users'][user_id]
+
+
+def get_user_by_email(email: str) -> dict:
+    """
+    Looks up a single slack user by email, without refreshing the directory
+    :param email: The user email
+    :return: A slack user object, empty if no user has this email
+    """
+    try:
+        response = send_slack_request_sync(CLIENT, 'users.lookupByEmail', http_verb='GET', body={'email': email})
+    except SlackApiError as e:
+        message = str(e)
+        if message.find('users_not_found') == -1:
+            raise
+        return {}
+
+    return response.get('user', {}) if response else {}
 
 
 def search_slack_users(users) -> list:
@@ -366,8 +479,8 @@ async def get_slack_name(slack_id: str, client) -> str:
                                                            body=body)).get('channel', {})
         slack_name = conversation.get('name', '')
     elif prefix == 'U':
-        user: dict = {}
-        if integration_context.get('users'):
+        user: dict = get_directory().get('users', {}).get(slack_id, {})
+        if not user and integration_context.get('users'):
             users = list(filter(lambda u: u['id'] == slack_id, json.loads(integration_context['users'])))
             if users:
                 user = users[0]
@@ -676,15 +789,17 @@ def check_for_answers():
         if actions:
             demisto.info('Slack - received answer from user for entitlement {}.'.format(question.get('entitlement')))
             user_id = payload.get('user', {}).get('id')
-            user_filter = list(filter(lambda u: u['id'] == user_id, users))
-            if user_filter:
-                user = user_filter[0]
-            else:
-                body = {
-                    'user': user_id
-                }
-                user = send_slack_request_sync(CLIENT, 'users.info', http_verb='GET', body=body).get('user', {})
-                users.append(user)
+            user = get_directory().get('users', {}).get(user_id, {})
+            if not user:
+                user_filter = list(filter(lambda u: u['id'] == user_id, users))
+                if user_filter:
+                    user = user_filter[0]
+                else:
+                    body = {
+                        'user': user_id
+                    }
+                    user = send_slack_request_sync(CLIENT, 'users.info', http_verb='GET', body=body).get('user', {})
+                    users.append(user)
 
             answer_question(actions[0].get('text', {}).get('text'), question, questions,
                             user.get('profile', {}).get('email'))
@@ -1122,7 +1237,9 @@ async def listen(**payload):
 
 
 async def get_user_by_id_async(client, user_id):
-    user: dict = {}
+    user: dict = get_directory().get('users', {}).get(user_id, {})
+    if user:
+        return user
     users: list = []
     integration_context = demisto.getIntegrationContext()
     if integration_context.get('users'):
@@ -1205,29 +1322,58 @@ def get_conversation_by_name(conversation_name: str) -> dict:
     :param conversation_name: The conversation name
     :return: The slack conversation
     """
-    body = {
-        'types': 'private_channel,public_channel',
-        'limit': PAGINATED_COUNT
-    }
+    directory = get_directory()
+    conversation = directory.get('conversations', {}).get(conversation_name)
+    if directory_needs_refresh(directory, 'conversations_updated', not conversation):
+        refresh_directory_conversations(directory)
+        set_to_latest_integration_context({'directory': directory})
+        conversation = directory['conversations'].get(conversation_name)
 
-    response = send_slack_request_sync(CLIENT, 'conversations.list', http_verb='GET', body=body)
-    conversation: dict = {}
-    while True:
-        conversations = response['channels'] if response and response.get('channels') else []
-        cursor = response.get('response_metadata', {}).get('next_cursor')
-        conversation_filter = list(filter(lambda c: c.get('name') == conversation_name, conversations))
-        if conversation_filter:
-            break
-        if not cursor:
-            break
-        body = body.copy()
-        body.update({'cursor': cursor})
-        response = send_slack_request_sync(CLIENT, 'conversations.list', http_verb='GET', body=body)
+    return conversation or {}
 
-    if conversation_filter:
-        conversation = conversation_filter[0]
 
-    return conversation
+@slack.RTMClient.run_on(event='team_join')
+@slack.RTMClient.run_on(event='user_change')
+@slack.RTMClient.run_on(event='channel_created')
+@slack.RTMClient.run_on(event='channel_rename')
+@slack.RTMClient.run_on(event='channel_deleted')
+@slack.RTMClient.run_on(event='group_rename')
+async def update_directory(**payload):
+    """
+    Updates the directory according to Slack RTM user and channel events
+    :param payload: The event payload
+    """
+    data: dict = payload.get('data', {})
+    directory = get_directory()
+    try:
+        if 'user' in data and isinstance(data['user'], dict):
+            # team_join, user_change
+            if not directory.get('users_updated'):
+                return
+            directory['users'] = directory.get('users', {}).copy()
+            directory['user_index'] = directory.get('user_index', {}).copy()
+            old_user = directory['users'].pop(data['user'].get('id'), None)
+            if old_user:
+                directory['user_index'] = {key: user_id for key, user_id in directory['user_index'].items()
+                                           if user_id != old_user['id']}
+            if not data['user'].get('deleted'):
+                index_user(directory, data['user'])
+        elif 'channel' in data:
+            # channel_created, channel_rename, group_rename, channel_deleted
+            if not directory.get('conversations_updated'):
+                return
+            channel = data['channel']
+            channel_id = channel.get('id') if isinstance(channel, dict) else channel
+            directory['conversations'] = {name: conversation for name, conversation
+                                          in directory.get('conversations', {}).items()
+                                          if conversation.get('id') != channel_id}
+            if isinstance(channel, dict) and channel.get('name'):
+                directory['conversations'][channel['name']] = {'id': channel_id, 'name': channel['name']}
+        else:
+            return
+        set_to_latest_integration_context({'directory': directory})
+    except Exception as e:
+        demisto.error('Slack - failed updating the directory: {}'.format(str(e)))
 
 
 def slack_send():
@@ -1789,6 +1935,12 @@ def get_user():
     if not slack_user:
         return_error('User not found')
 
+    # The directory keeps only the user fields in use, the full user object is returned as the raw response
+    body = {
+        'user': slack_user.get('id')
+    }
+    slack_user = send_slack_request_sync(CLIENT, 'users.info', http_verb='GET', body=body).get('user') or slack_user
+
     profile = slack_user.get('profile', {})
     result_user = {
         'ID': slack_user.get('id'),
@@ -1821,7 +1973,7 @@ def init_globals():
     """
     global BOT_TOKEN, ACCESS_TOKEN, PROXY_URL, PROXIES, DEDICATED_CHANNEL, CLIENT, CHANNEL_CLIENT
     global SEVERITY_THRESHOLD, ALLOW_INCIDENTS, NOTIFY_INCIDENTS, INCIDENT_TYPE, VERIFY_CERT
-    global BOT_NAME, BOT_ICON_URL, MAX_LIMIT_TIME, PAGINATED_COUNT, SSL_CONTEXT
+    global BOT_NAME, BOT_ICON_URL, MAX_LIMIT_TIME, PAGINATED_COUNT, SSL_CONTEXT, DIRECTORY_TTL_HOURS
 
     VERIFY_CERT = not demisto.params().get('unsecure', False)
     if not VERIFY_CERT:
@@ -1853,6 +2005,7 @@ def init_globals():
     BOT_ICON_URL = demisto.params().get('bot_icon')
     MAX_LIMIT_TIME = int(demisto.params().get('max_limit_time', '60'))
     PAGINATED_COUNT = int(demisto.params().get('paginated_count', '200'))
+    DIRECTORY_TTL_HOURS = int(demisto.params().get('directory_ttl', '24'))
 
 
 def print_thread_dump():
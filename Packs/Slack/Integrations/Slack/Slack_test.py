@@ -524,11 +524,11 @@ def test_get_user_by_name(mocker):
     assert user['id'] == 'U012B3CUI'
     assert slack.WebClient.api_call.call_count == 2
 
-    # User doesn't exist
+    # User doesn't exist - the users were just refreshed, so no need to look for it again
     username = 'alexios'
     user = get_user_by_name(username)
     assert user == {}
-    assert slack.WebClient.api_call.call_count == 3
+    assert slack.WebClient.api_call.call_count == 2
 
 
 def test_get_user_by_name_paging(mocker):
@@ -3473,6 +3473,116 @@ def test_get_conversation_by_name_paging(mocker):
     assert slack.WebClient.api_call.call_count == 2
 
 
+def test_get_conversation_by_name_from_directory(mocker):
+    from Slack import get_conversation_by_name
+
+    # Set
+
+    def api_call(method: str, http_verb: str = 'POST', file: dict = None, params=None, json=None, data=None):
+        return {'channels': js.loads(CONVERSATIONS), 'response_metadata': {'next_cursor': ''}}
+
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
+    mocker.patch.object(slack.WebClient, 'api_call', side_effect=api_call)
+
+    # Arrange
+    first_channel = get_conversation_by_name('general')
+    second_channel = get_conversation_by_name('general')
+    missing_channel = get_conversation_by_name('no-such-channel')
+
+    # Assert
+    assert first_channel == second_channel == {'id': 'C012AB3CD', 'name': 'general'}
+    assert missing_channel == {}
+    assert slack.WebClient.api_call.call_count == 1
+
+
+def test_get_user_by_name_directory_expired(mocker):
+    import Slack
+    from slack.errors import SlackApiError
+    from slack.web.slack_response import SlackResponse
+
+    # Set
+
+    def api_call(method: str, http_verb: str = 'POST', file: dict = None, params=None, json=None, data=None):
+        if method == 'users.lookupByEmail':
+            if params['email'] == 'glenda@south.oz.coven':
+                return {'user': {'id': 'U012A3CGL', 'name': 'glenda', 'profile': {'email': 'Glenda@south.oz.coven'}}}
+            raise SlackApiError('The request to the Slack API failed.', SlackResponse(
+                api_url='', client=None, http_verb='GET', req_args={}, data={'ok': False, 'error': 'users_not_found'},
+                status_code=200, headers={}))
+        return {'members': js.loads(USERS)}
+
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
+    mocker.patch.object(slack.WebClient, 'api_call', side_effect=api_call)
+    directory = {
+        'users': {'U012A3CDE': {'id': 'U012A3CDE', 'name': 'spengler'}},
+        'user_index': {'spengler': 'U012A3CDE'},
+        'users_updated': '2019-09-26 16:00:00'
+    }
+    set_integration_context({'directory': js.dumps(directory)})
+    mocker.patch.object(Slack, 'get_current_utc_time', return_value=datetime.datetime(2019, 9, 26, 16, 3, 0))
+
+    # Arrange
+    # Users missing from a recently refreshed directory are looked up by email, without refreshing it
+    user = Slack.get_user_by_name('Glenda@south.oz.coven')
+    assert slack.WebClient.api_call.call_count == 1
+    assert slack.WebClient.api_call.call_args[0][0] == 'users.lookupByEmail'
+    assert user['id'] == 'U012A3CGL'
+    assert js.loads(get_integration_context()['directory'])['user_index']['glenda'] == 'U012A3CGL'
+
+    user = Slack.get_user_by_name('Glenda@south.oz.coven')
+    assert slack.WebClient.api_call.call_count == 1
+    assert user['id'] == 'U012A3CGL'
+
+    user = Slack.get_user_by_name('nobody@south.oz.coven')
+    assert slack.WebClient.api_call.call_count == 2
+    assert user == {}
+
+    # Names can't be looked up on their own
+    user = Slack.get_user_by_name('glinda')
+    assert slack.WebClient.api_call.call_count == 2
+    assert user == {}
+
+    mocker.patch.object(Slack, 'get_current_utc_time', return_value=datetime.datetime(2019, 9, 27, 17, 0, 0))
+    user = Slack.get_user_by_name('spengler')
+
+    # Assert
+    assert slack.WebClient.api_call.call_count == 3
+    assert user['profile']['email'] == 'spengler@ghostbusters.example.com'
+
+
+@pytest.mark.asyncio
+async def test_update_directory(mocker):
+    from Slack import update_directory, get_user_by_name, get_conversation_by_name
+
+    # Set
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
+    mocker.patch.object(slack.WebClient, 'api_call')
+    directory = {
+        'users': {'U012A3CDE': {'id': 'U012A3CDE', 'name': 'spengler'}},
+        'user_index': {'spengler': 'U012A3CDE'},
+        'users_updated': datetime.datetime.strftime(datetime.datetime.utcnow(), '%Y-%m-%d %H:%M:%S'),
+        'conversations': {'general': {'id': 'C012AB3CD', 'name': 'general'}},
+        'conversations_updated': datetime.datetime.strftime(datetime.datetime.utcnow(), '%Y-%m-%d %H:%M:%S')
+    }
+    set_integration_context({'directory': js.dumps(directory)})
+
+    # Arrange
+    await update_directory(data={'user': {'id': 'U012A3CDE', 'name': 'egon'}})
+    await update_directory(data={'user': {'id': 'U248918AB', 'name': 'alexios'}})
+    await update_directory(data={'channel': {'id': 'C012AB3CD', 'name': 'specific'}})
+
+    # Assert
+    assert get_user_by_name('spengler') == {}
+    assert get_user_by_name('egon')['id'] == 'U012A3CDE'
+    assert get_user_by_name('alexios')['id'] == 'U248918AB'
+    assert get_conversation_by_name('general') == {}
+    assert get_conversation_by_name('specific')['id'] == 'C012AB3CD'
+    assert slack.WebClient.api_call.call_count == 0
+
+
 def test_send_file_no_args_investigation(mocker):
     import Slack
 
@@ -3893,10 +4003,19 @@ def test_get_user(mocker):
 
     # Set
 
+    def api_call(method: str, http_verb: str = 'POST', file: dict = None, params=None, json=None, data=None):
+        if method == 'users.info':
+            user = [user for user in js.loads(USERS) if user['id'] == params['user']][0]
+            user.update({'tz': 'America/New_York', 'is_admin': True})
+            user['profile']['title'] = 'Ghostbuster'
+            return {'user': user}
+        return {}
+
     mocker.patch.object(demisto, 'args', return_value={'user': 'spengler'})
     mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
     mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
     mocker.patch.object(demisto, 'results')
+    mocker.patch.object(slack.WebClient, 'api_call', side_effect=api_call)
 
     # Arrange
 
@@ -3910,6 +4029,11 @@ def test_get_user(mocker):
         'DisplayName': 'spengler',
         'Email': 'spengler@ghostbusters.example.com',
     }}
+    # The raw response is the full slack user, not the fields kept in the directory
+    assert user_results[0]['Contents']['tz'] == 'America/New_York'
+    assert user_results[0]['Contents']['is_admin'] is True
+    assert user_results[0]['Contents']['profile']['title'] == 'Ghostbuster'
+    assert slack.WebClient.api_call.call_args[1]['params'] == {'user': 'U012A3CDE'}
 
 
 def test_get_user_by_name_paging_rate_limit(mocker):
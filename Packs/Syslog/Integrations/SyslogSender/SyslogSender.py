@@ -8,7 +8,7 @@ from logging.handlers import SysLogHandler
 from distutils.util import strtobool
 from logging import Logger, getLogger, INFO, DEBUG, WARNING, ERROR, CRITICAL
 from socket import SOCK_STREAM
-from typing import Union, Tuple, Dict, Any, Generator
+from typing import Union, Tuple, Dict, Any, Generator, List
 
 ''' CONSTANTS '''
 
@@ -56,23 +56,52 @@ TCP = 'tcp'
 UDP = 'udp'
 PROTOCOLS = {TCP, UDP}
 
+# TCP framing methods (RFC 6587)
+NON_TRANSPARENT_FRAMING = 'non-transparent'
+OCTET_COUNTING_FRAMING = 'octet-counting'
+FRAMING_METHODS = {NON_TRANSPARENT_FRAMING, OCTET_COUNTING_FRAMING}
+
+DEFAULT_FLUSH_INTERVAL = 5
+
 ''' Syslog Manager '''
 
 
+class OctetCountingSysLogHandler(SysLogHandler):
+    """
+    A TCP syslog handler which prefixes every message with its length in octets (RFC 6587, section 3.4.1),
+    instead of terminating it with a NUL character.
+    """
+
+    def emit(self, record):
+        try:
+            message = self.format(record)
+            if self.ident:
+                message = self.ident + message
+            priority = self.encodePriority(self.facility, self.mapPriority(record.levelname))
+            frame = f'<{priority}>{message}'.encode('utf-8')
+            self.socket.sendall(f'{len(frame)} '.encode('utf-8') + frame)  # type: ignore[attr-defined]
+        except Exception:
+            self.handleError(record)
+
+
 class SyslogManager:
-    def __init__(self, address: str, port: int, protocol: str, logging_level: int, facility: int):
+    def __init__(self, address: str, port: int, protocol: str, logging_level: int, facility: int,
+                 framing: str = NON_TRANSPARENT_FRAMING):
         """
         Class for managing instances of a syslog logger.
         :param address: The IP address of the syslog server.
         :param port: The port of the syslog server.
         :param protocol: The messaging protocol (TCP / UDP).
         :param logging_level: The logging level.
+        :param facility: The syslog facility.
+        :param framing: The framing method of messages sent over TCP (non-transparent / octet-counting).
         """
         self.address = address
         self.port = port
         self.protocol = protocol
         self.logging_level = logging_level
         self.facility = facility
+        self.framing = framing
 
     @contextmanager  # type: ignore[misc, arg-type]
     def get_logger(self) -> Generator:
@@ -105,6 +134,8 @@ class SyslogManager:
 
         kwargs['address'] = address
 
+        if self.protocol == TCP and self.framing == OCTET_COUNTING_FRAMING:
+            return OctetCountingSysLogHandler(**kwargs)
         return SysLogHandler(**kwargs)
 
     def _init_logger(self, handler: SysLogHandler) -> Logger:
@@ -120,6 +151,52 @@ class SyslogManager:
         return syslog_logger
 
 
+class SyslogQueue:
+    def __init__(self, manager: SyslogManager, max_size: int, flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        """
+        A bounded in-memory queue of messages, which are sent to syslog over a single connection whenever
+        the queue is full or its oldest message has waited for the flush interval.
+        Remaining messages are sent when the queue is used as a context manager and exits.
+        :param manager: The syslog manager
+        :param max_size: The maximal number of messages to hold before sending them.
+        :param flush_interval: The maximal number of seconds to hold a message before sending it.
+        """
+        if max_size < 1:
+            raise ValueError('The queue size must be a positive number.')
+        self.manager = manager
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._messages: List[Tuple[str, str]] = []
+        self._oldest_message_time = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.flush()
+
+    def put(self, message: str, log_level: str):
+        """
+        Add a message to the queue, sending the queued messages if the queue is full or the interval passed.
+        :param message: The message to send
+        :param log_level: The logging level
+        """
+        if not self._messages:
+            self._oldest_message_time = time.monotonic()
+        self._messages.append((message, log_level))
+        if len(self._messages) >= self.max_size \
+                or time.monotonic() - self._oldest_message_time >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Send all the queued messages over a single connection.
+        """
+        if self._messages:
+            messages, self._messages = self._messages, []
+            send_logs(self.manager, messages)
+
+
 ''' HELPER FUNCTIONS '''
 
 
@@ -134,13 +211,35 @@ def init_manager(params: dict) -> SyslogManager:
     protocol = params.get('protocol', UDP).lower()
     facility = FACILITY_DICT.get(params.get('facility', 'LOG_SYSLOG'), SysLogHandler.LOG_SYSLOG)
     logging_level = LOGGING_LEVEL_DICT.get(params.get('logging_level', 'LOG_INFO'), INFO)
+    framing = params.get('framing', NON_TRANSPARENT_FRAMING).lower()
 
     if not address:
         raise ValueError('A Syslog server address must be provided.')
     if not port and protocol in PROTOCOLS:
         raise ValueError('A port must be provided in TCP or UDP protocols.')
+    if framing not in FRAMING_METHODS:
+        raise ValueError(f'Invalid framing method: {framing}. Possible values: {", ".join(FRAMING_METHODS)}.')
 
-    return SyslogManager(address, port, protocol, logging_level, facility)
+    return SyslogManager(address, port, protocol, logging_level, facility, framing)
+
+
+def log_message(syslog_logger: Logger, message: str, log_level: str):
+    """
+    Send a message with a syslog logger according to the logging level.
+    :param syslog_logger: The syslog logger
+    :param message: The message to send
+    :param log_level: The logging level
+    """
+    if log_level == 'DEBUG':
+        syslog_logger.debug(message)
+    if log_level == 'INFO':
+        syslog_logger.info(message)
+    if log_level == 'WARNING':
+        syslog_logger.warning(message)
+    if log_level == 'ERROR':
+        syslog_logger.error(message)
+    if log_level == 'CRITICAL':
+        syslog_logger.critical(message)
 
 
 def send_log(manager: SyslogManager, message: str, log_level: str):
@@ -151,16 +250,18 @@ def send_log(manager: SyslogManager, message: str, log_level: str):
     :param log_level: The logging level
     """
     with manager.get_logger() as syslog_logger:   # type: Logger
-        if log_level == 'DEBUG':
-            syslog_logger.debug(message)
-        if log_level == 'INFO':
-            syslog_logger.info(message)
-        if log_level == 'WARNING':
-            syslog_logger.warning(message)
-        if log_level == 'ERROR':
-            syslog_logger.error(message)
-        if log_level == 'CRITICAL':
-            syslog_logger.critical(message)
+        log_message(syslog_logger, message, log_level)
+
+
+def send_logs(manager: SyslogManager, messages: List[Tuple[str, str]]):
+    """
+    Use a syslog manager to get a single logger, and send several messages to syslog over its connection.
+    :param manager: The syslog manager
+    :param messages: Pairs of the message to send and its logging level
+    """
+    with manager.get_logger() as syslog_logger:   # type: Logger
+        for message, log_level in messages:
+            log_message(syslog_logger, message, log_level)
 
 
 def mirror_investigation():
@@ -251,6 +352,29 @@ def syslog_send(manager):
     demisto.results('Message sent to Syslog successfully.')
 
 
+def syslog_send_batch(manager: SyslogManager):
+    """
+    Send several messages to syslog over a single connection, or in chunks through a bounded queue.
+    :param manager: Syslog manager
+    """
+    messages = argToList(demisto.args().get('messages'))
+    log_level = demisto.args().get('level', 'INFO')
+    queue_size = int(demisto.args().get('queue_size') or 0)
+    flush_interval = float(demisto.args().get('flush_interval') or DEFAULT_FLUSH_INTERVAL)
+
+    if not messages:
+        raise ValueError('No messages received')
+
+    if queue_size:
+        with SyslogQueue(manager, queue_size, flush_interval) as queue:
+            for message in messages:
+                queue.put(message, log_level)
+    else:
+        send_logs(manager, [(message, log_level) for message in messages])
+
+    demisto.results(f'{len(messages)} messages sent to Syslog successfully.')
+
+
 ''' MAIN '''
 
 
@@ -272,6 +396,13 @@ def main():
             else:
                 syslog_manager = init_manager(demisto.params())
             syslog_send(syslog_manager)
+        elif demisto.command() == 'syslog-send-batch':
+            if 'address' in demisto.args():
+                # params provided in the command args
+                syslog_manager = init_manager(demisto.args())
+            else:
+                syslog_manager = init_manager(demisto.params())
+            syslog_send_batch(syslog_manager)
         elif demisto.command() == 'send-notification':
             min_severity = SEVERITY_DICT.get(demisto.params().get('severity', 'Low'), 1)
             syslog_manager = init_manager(demisto.params())
@@ -1,4 +1,6 @@
 from CommonServerPython import *
+import socket
+import threading
 import pytest
 from contextlib import contextmanager
 
@@ -141,3 +143,128 @@ def test_send(mocker):
     # Assert
     assert send_args[0] == '1, eyy https://www.eizelulz.com:8443/#/WarRoom/727'
     assert results == 'Message sent to Syslog successfully.'
+
+
+class SyslogListener:
+    """
+    A local TCP syslog listener, which records the raw data received on every connection.
+    """
+    def __init__(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(5)
+        self.server.settimeout(0.1)
+        self.port = self.server.getsockname()[1]
+        self.connections: list = []
+        self._stopped = False
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except socket.timeout:
+                # stop only once there are no more pending connections
+                if self._stopped:
+                    return
+                continue
+            connection.settimeout(None)
+            data = b''
+            with connection:
+                chunk = connection.recv(4096)
+                while chunk:
+                    data += chunk
+                    chunk = connection.recv(4096)
+            self.connections.append(data)
+
+    def close(self):
+        self._stopped = True
+        self._thread.join()
+        self.server.close()
+
+
+def parse_octet_counted_frames(data):
+    frames = []
+    while data:
+        length, data = data.split(b' ', 1)
+        frames.append(data[:int(length)])
+        data = data[int(length):]
+    return frames
+
+
+@pytest.fixture()
+def listener():
+    syslog_listener = SyslogListener()
+    yield syslog_listener
+    syslog_listener.close()
+
+
+def test_send_batch_over_single_connection(mocker, listener):
+    """
+    Given:
+        - Several messages to send over TCP with octet-counting framing.
+    When:
+        - Running the syslog-send-batch command.
+    Then:
+        - Ensure all the messages are sent over a single connection, each framed with its length.
+    """
+    from SyslogSender import init_manager, syslog_send_batch
+
+    messages = ['first message', 'second, message', 'third message ✓']
+    manager = init_manager({'address': '127.0.0.1', 'port': listener.port, 'protocol': 'tcp',
+                            'facility': 'LOG_USER', 'framing': 'Octet-counting'})
+    mocker.patch.object(demisto, 'args', return_value={'messages': json.dumps(messages), 'level': 'INFO'})
+    mocker.patch.object(demisto, 'results')
+
+    syslog_send_batch(manager)
+    listener.close()
+
+    assert len(listener.connections) == 1
+    frames = parse_octet_counted_frames(listener.connections[0])
+    assert frames == [f'<14>{message}'.encode('utf-8') for message in messages]
+    assert demisto.results.call_args[0][0] == '3 messages sent to Syslog successfully.'
+
+
+def test_send_batch_through_queue(mocker, listener):
+    """
+    Given:
+        - Five messages to send over TCP through a queue of size 2.
+    When:
+        - Running the syslog-send-batch command.
+    Then:
+        - Ensure the messages are sent over three connections, the last one being flushed when the queue exits.
+    """
+    from SyslogSender import init_manager, syslog_send_batch
+
+    manager = init_manager({'address': '127.0.0.1', 'port': listener.port, 'protocol': 'tcp',
+                            'facility': 'LOG_USER'})
+    mocker.patch.object(demisto, 'args', return_value={'messages': 'a,b,c,d,e', 'queue_size': '2'})
+    mocker.patch.object(demisto, 'results')
+
+    syslog_send_batch(manager)
+    listener.close()
+
+    assert len(listener.connections) == 3
+    # non-transparent framing terminates each message with a NUL character
+    assert b''.join(listener.connections) == b'<14>a\x00<14>b\x00<14>c\x00<14>d\x00<14>e\x00'
+
+
+def test_queue_flushes_on_interval(mocker):
+    """
+    Given:
+        - A queue with a large size and a flush interval which already passed.
+    When:
+        - Adding a message to the queue.
+    Then:
+        - Ensure the queued messages are sent without waiting for the queue to fill.
+    """
+    import SyslogSender
+    from SyslogSender import SyslogQueue
+
+    send_logs = mocker.patch.object(SyslogSender, 'send_logs')
+    queue = SyslogQueue(Manager(), max_size=100, flush_interval=0)
+
+    queue.put('message', 'INFO')
+
+    send_logs.assert_called_once_with(queue.manager, [('message', 'INFO')])
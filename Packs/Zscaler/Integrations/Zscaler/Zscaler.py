@@ -18,11 +18,31 @@ API_KEY = str(demisto.params()['key'])
 BASE_URL = CLOUD_NAME + '/api/v1'
 USE_SSL = not demisto.params().get('insecure', False)
 PROXY = demisto.params().get('proxy', True)
+AUTO_ACTIVATE = demisto.params().get('auto_activate', True)
 DEFAULT_HEADERS = {
     'content-type': 'application/json'
 }
 EXCEEDED_RATE_LIMIT_STATUS_CODE = 429
+SESSION_TIMED_OUT_STATUS_CODE = 401
 MAX_SECONDS_TO_WAIT = 30
+# the maximal number of URLs or IP addresses the /urlLookup endpoint accepts in a single request
+MAX_LOOKUP_CHUNK_SIZE = 100
+# Zscaler API sessions time out after 30 minutes of inactivity, keep a margin to avoid using a timed out session
+SESSION_TIMEOUT_SECONDS = 25 * 60
+MUTATING_COMMANDS = {
+    'zscaler-blacklist-url',
+    'zscaler-undo-blacklist-url',
+    'zscaler-whitelist-url',
+    'zscaler-undo-whitelist-url',
+    'zscaler-blacklist-ip',
+    'zscaler-undo-blacklist-ip',
+    'zscaler-whitelist-ip',
+    'zscaler-undo-whitelist-ip',
+    'zscaler-category-add-url',
+    'zscaler-category-add-ip',
+    'zscaler-category-remove-url',
+    'zscaler-category-remove-ip'
+}
 ERROR_CODES_DICT = {
     400: 'Invalid or bad request',
     401: 'Session is not authenticated or timed out',
@@ -48,25 +68,49 @@ if not PROXY:
 
 ''' HELPER FUNCTIONS '''
 
+# a single keep-alive session, so consecutive requests (e.g. the chunks of a bulk lookup) reuse one connection
+SESSION = requests.Session()
+
+
+def get_retry_after(res):
+    """
+    Returns the number of seconds Zscaler asked to wait before retrying a rate limited request, if it did.
+    """
+    retry_after = res.headers.get('Retry-After', '')
+    try:
+        return int(retry_after.split()[0])
+    except (ValueError, IndexError):
+        return None
+
 
-def http_request(method, url_suffix, data=None, headers=None, num_of_seconds_to_wait=3):
+def http_request(method, url_suffix, data=None, headers=None, num_of_seconds_to_wait=3, session_refreshed=False):
     if headers is None:
         headers = DEFAULT_HEADERS
     data = {} if data is None else data
     url = BASE_URL + url_suffix
     try:
-        res = requests.request(method,
-                               url,
-                               verify=USE_SSL,
-                               data=data,
-                               headers=headers
-                               )
+        res = SESSION.request(method,
+                              url,
+                              verify=USE_SSL,
+                              data=data,
+                              headers=headers
+                              )
         if res.status_code not in (200, 204):
-            if res.status_code == EXCEEDED_RATE_LIMIT_STATUS_CODE and num_of_seconds_to_wait <= MAX_SECONDS_TO_WAIT:
-                random_num_of_seconds = random.randint(num_of_seconds_to_wait, num_of_seconds_to_wait + 3)
-                time.sleep(random_num_of_seconds)
+            if res.status_code == EXCEEDED_RATE_LIMIT_STATUS_CODE and num_of_seconds_to_wait <= MAX_SECONDS_TO_WAIT \
+                    and (get_retry_after(res) or 0) <= MAX_SECONDS_TO_WAIT:
+                seconds_to_wait = get_retry_after(res)
+                if seconds_to_wait is None:
+                    seconds_to_wait = random.randint(num_of_seconds_to_wait, num_of_seconds_to_wait + 3)
+                time.sleep(seconds_to_wait)
                 return http_request(method, url_suffix, data, headers=headers,
-                                    num_of_seconds_to_wait=num_of_seconds_to_wait + 3)
+                                    num_of_seconds_to_wait=num_of_seconds_to_wait + 3,
+                                    session_refreshed=session_refreshed)
+            elif res.status_code == SESSION_TIMED_OUT_STATUS_CODE and 'cookie' in headers \
+                    and url_suffix != '/authenticatedSession' and not session_refreshed:
+                # The cached session timed out before we expected it to, log in again and retry once
+                headers['cookie'] = DEFAULT_HEADERS['cookie'] = get_session_id(force_login=True)
+                return http_request(method, url_suffix, data, headers=headers,
+                                    num_of_seconds_to_wait=num_of_seconds_to_wait, session_refreshed=True)
             else:
                 raise Exception('Your request failed with the following error: ' + ERROR_CODES_DICT[res.status_code])
     except Exception as e:
@@ -113,14 +157,69 @@ def login():
     return result.headers['Set-Cookie']
 
 
+def get_session_id(force_login=False):
+    """
+    Returns the JSESSIONID cookie of the cached session, logging in only if there is no session which is still valid.
+    """
+    integration_context = demisto.getIntegrationContext()
+    session_id = integration_context.get('session_id')
+    if session_id and not force_login and time.time() < integration_context.get('session_expiry', 0):
+        return session_id
+
+    auth = login()
+    session_id = auth[:auth.index(';')]
+    integration_context.update({
+        'session_id': session_id,
+        'session_expiry': time.time() + SESSION_TIMEOUT_SECONDS
+    })
+    demisto.setIntegrationContext(integration_context)
+    return session_id
+
+
+def extend_session_expiry():
+    """
+    The session timeout is measured from its last use, so every successful command extends the cached session.
+    """
+    integration_context = demisto.getIntegrationContext()
+    integration_context['session_expiry'] = time.time() + SESSION_TIMEOUT_SECONDS
+    demisto.setIntegrationContext(integration_context)
+
+
 def activate_changes():
     cmd_url = '/status/activate'
     http_request('POST', cmd_url, None, DEFAULT_HEADERS)
 
 
-def logout():
-    cmd_url = '/authenticatedSession'
-    http_request('DELETE', cmd_url, None, DEFAULT_HEADERS)
+def add_pending_change(command, args):
+    """
+    Records a change which was saved but not activated yet, to be activated by the zscaler-activate-changes command.
+    """
+    integration_context = demisto.getIntegrationContext()
+    pending_changes = integration_context.get('pending_changes', [])
+    pending_changes.append({
+        'Command': command,
+        'Arguments': ', '.join('{}={}'.format(key, value) for key, value in sorted(args.items())),
+        'Time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    })
+    integration_context['pending_changes'] = pending_changes
+    demisto.setIntegrationContext(integration_context)
+
+
+def activate_changes_command():
+    activate_changes()
+    integration_context = demisto.getIntegrationContext()
+    pending_changes = integration_context.pop('pending_changes', [])
+    demisto.setIntegrationContext(integration_context)
+    if not pending_changes:
+        return 'Activated the configuration changes. There were no pending changes made by this integration.'
+    return {
+        'Type': entryTypes['note'],
+        'Contents': pending_changes,
+        'ContentsFormat': formats['json'],
+        'ReadableContentsFormat': formats['markdown'],
+        'HumanReadable': tableToMarkdown('Activated the following changes', pending_changes,
+                                         headers=['Command', 'Arguments', 'Time'])
+    }
 
 
 def blacklist_url(url):
@@ -335,44 +434,45 @@ def get_whitelist():
 
 
 def url_lookup(url):
-    response = lookup_request(url)
-    hr = json.loads(response.content)
+    hr = lookup_request(url)
     if hr:
-        data = hr[0]
         suspicious_categories = ['SUSPICIOUS_DESTINATION', 'SPYWARE_OR_ADWARE']
-        ioc_context = {'Address': data['url'], 'Data': data['url']}
-        score = 1
-        if len(data['urlClassifications']) == 0:
-            data['urlClassifications'] = ''
-        else:
-            data['urlClassifications'] = ''.join(data['urlClassifications'])
-            ioc_context['urlClassifications'] = data['urlClassifications']
-            if data['urlClassifications'] == 'MISCELLANEOUS_OR_UNKNOWN':
-                score = 0
-        if len(data['urlClassificationsWithSecurityAlert']) == 0:
-            data['urlClassificationsWithSecurityAlert'] = ''
-        else:
-            data['urlClassificationsWithSecurityAlert'] = ''.join(data['urlClassificationsWithSecurityAlert'])
-            if data['urlClassificationsWithSecurityAlert'] in suspicious_categories:
-                score = 2
+        ioc_contexts = []
+        dbot_scores = []
+        for data in hr:
+            looked_up_url = data['url']
+            ioc_context = {'Address': looked_up_url, 'Data': looked_up_url}
+            score = 1
+            if len(data['urlClassifications']) == 0:
+                data['urlClassifications'] = ''
             else:
-                score = 3
-            ioc_context['Malicious'] = {
-                'Vendor': 'Zscaler',
-                'Description': data['urlClassificationsWithSecurityAlert']
-            }
-            data['ip'] = data.pop('url')
-        ioc_context = createContext(data=ioc_context, removeNull=True)
-        ec = {
-            outputPaths['url']: ioc_context,
-            'DBotScore': [
-                {
-                    "Indicator": url,
-                    "Score": score,
-                    "Type": "url",
-                    "Vendor": "Zscaler"
+                data['urlClassifications'] = ''.join(data['urlClassifications'])
+                ioc_context['urlClassifications'] = data['urlClassifications']
+                if data['urlClassifications'] == 'MISCELLANEOUS_OR_UNKNOWN':
+                    score = 0
+            if len(data['urlClassificationsWithSecurityAlert']) == 0:
+                data['urlClassificationsWithSecurityAlert'] = ''
+            else:
+                data['urlClassificationsWithSecurityAlert'] = ''.join(data['urlClassificationsWithSecurityAlert'])
+                if data['urlClassificationsWithSecurityAlert'] in suspicious_categories:
+                    score = 2
+                else:
+                    score = 3
+                ioc_context['Malicious'] = {
+                    'Vendor': 'Zscaler',
+                    'Description': data['urlClassificationsWithSecurityAlert']
                 }
-            ]
+                data['ip'] = data.pop('url')
+            ioc_contexts.append(createContext(data=ioc_context, removeNull=True))
+            dbot_scores.append({
+                "Indicator": looked_up_url,
+                "Score": score,
+                "Type": "url",
+                "Vendor": "Zscaler"
+            })
+        ec = {
+            outputPaths['url']: ioc_contexts if len(ioc_contexts) > 1 else ioc_contexts[0],
+            'DBotScore': dbot_scores
         }
         title = 'Zscaler URL Lookup'
         entry = {
@@ -380,7 +480,7 @@ def url_lookup(url):
             'Contents': hr,
             'ContentsFormat': formats['json'],
             'ReadableContentsFormat': formats['markdown'],
-            'HumanReadable': tableToMarkdown(title, data, removeNull=True),
+            'HumanReadable': tableToMarkdown(title, hr, removeNull=True),
             'EntryContext': ec
         }
     else:
@@ -389,8 +489,7 @@ def url_lookup(url):
 
 
 def ip_lookup(ip):
-    response = lookup_request(ip)
-    hr = json.loads(response.content)
+    hr = lookup_request(ip)
     if hr:
         ioc_context = [None] * len(hr)  # type: List[Any]
         suspicious_categories = ['SUSPICIOUS_DESTINATION', 'SPYWARE_OR_ADWARE']
@@ -445,11 +544,24 @@ def ip_lookup(ip):
 
 
 def lookup_request(ioc):
+    """
+    Looks up the given URLs or IP addresses, without duplicates, in chunks of the maximal size the API accepts.
+    Each chunk is retried on its own if it is rate limited, so a rate limit never resends the chunks already looked up.
+    """
     cmd_url = '/urlLookup'
-    ioc_list = ioc.split(',')
-    json_data = json.dumps(ioc_list)
-    response = http_request('POST', cmd_url, json_data, DEFAULT_HEADERS)
-    return response
+    ioc_list = []  # type: List[str]
+    seen_iocs = set()  # type: Set[str]
+    for single_ioc in argToList(ioc):
+        if single_ioc and single_ioc not in seen_iocs:
+            seen_iocs.add(single_ioc)
+            ioc_list.append(single_ioc)
+
+    results = []  # type: List[Dict]
+    for i in range(0, len(ioc_list), MAX_LOOKUP_CHUNK_SIZE):
+        json_data = json.dumps(ioc_list[i:i + MAX_LOOKUP_CHUNK_SIZE])
+        response = http_request('POST', cmd_url, json_data, DEFAULT_HEADERS)
+        results.extend(json.loads(response.content))
+    return results
 
 
 def category_add_url(category_id, url):
@@ -729,12 +841,11 @@ def sandbox_report(md5, details):
 
 
 def main():
-    auth = login()
-    jsession_id = auth[:auth.index(';')]
-    DEFAULT_HEADERS['cookie'] = jsession_id
-
-    LOG('command is %s' % (demisto.command(),))
+    command = demisto.command()
+    LOG('command is %s' % (command,))
     try:
+        # test-module always logs in, to validate the configured credentials rather than the cached session
+        DEFAULT_HEADERS['cookie'] = get_session_id(force_login=command == 'test-module')
         if demisto.command() == 'test-module':
             # Checks if there is an authenticated session
             http_request('GET', '/authenticatedSession', None, DEFAULT_HEADERS)
@@ -775,16 +886,21 @@ def main():
             demisto.results(get_whitelist_command())
         elif demisto.command() == 'zscaler-sandbox-report':
             demisto.results(sandbox_report_command())
+        elif demisto.command() == 'zscaler-activate-changes':
+            demisto.results(activate_changes_command())
+        if command in MUTATING_COMMANDS and not AUTO_ACTIVATE:
+            add_pending_change(command, demisto.args())
+        extend_session_expiry()
     except Exception as e:
         LOG(str(e))
         LOG.print_log()
         raise
     finally:
-        try:
-            activate_changes()
-            logout()
-        except Exception as err:
-            demisto.info("Zscaler error: " + str(err))
+        if command in MUTATING_COMMANDS and AUTO_ACTIVATE:
+            try:
+                activate_changes()
+            except Exception as err:
+                demisto.info("Zscaler error: " + str(err))
 
 
 # python2 uses __builtin__ python3 uses builtins
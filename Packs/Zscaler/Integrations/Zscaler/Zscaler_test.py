@@ -2,6 +2,7 @@ import demistomock as demisto
 import CommonServerPython
 import pytest
 import json
+import time
 
 
 class ResponseMock:
@@ -122,3 +123,165 @@ def test_get_whitelist(mocker):
                      response_path='test_data/responses/whitelist_url.json',
                      expected_result_path='test_data/results/whitelist.json',
                      mocker=mocker)
+
+
+@pytest.fixture()
+def integration_context(mocker):
+    context = {}
+
+    def set_integration_context(new_context):
+        context.clear()
+        context.update(new_context)
+
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=lambda: dict(context))
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
+    return context
+
+
+def mock_zscaler_api(mocker, requests_mock):
+    import Zscaler
+    mocker.patch.object(Zscaler, 'API_KEY', 'abcdefghijkl')
+    mocker.patch.object(Zscaler, 'BASE_URL', 'https://cloud/api/v1')
+    login = requests_mock.post('https://cloud/api/v1/authenticatedSession', headers={'Set-Cookie': 'JSESSIONID=123; Path=/'})
+    activate = requests_mock.post('https://cloud/api/v1/status/activate', json={'status': 'ACTIVE'})
+    with open('test_data/responses/url.json', 'r') as response_f:
+        requests_mock.post('https://cloud/api/v1/urlLookup', json=json.load(response_f))
+    requests_mock.post('https://cloud/api/v1/security/advanced/blacklistUrls?action=ADD_TO_LIST', status_code=204)
+    return login, activate
+
+
+def test_session_is_reused_by_read_only_commands(mocker, requests_mock, integration_context):
+    """
+    Given:
+        - Two consecutive runs of the url command.
+    When:
+        - Running the integration.
+    Then:
+        - Ensure the integration logs in only once, reusing the cached session, and activates no changes.
+    """
+    import Zscaler
+    login, activate = mock_zscaler_api(mocker, requests_mock)
+    mocker.patch.object(demisto, 'command', return_value='url')
+    mocker.patch.object(demisto, 'args', return_value={'url': 'www.demisto22.com'})
+    mocker.patch.object(demisto, 'results')
+
+    Zscaler.main()
+    Zscaler.main()
+
+    assert login.call_count == 1
+    assert activate.call_count == 0
+    assert integration_context['session_id'] == 'JSESSIONID=123'
+    assert requests_mock.last_request.headers['cookie'] == 'JSESSIONID=123'
+
+
+def test_timed_out_session_is_refreshed(mocker, requests_mock, integration_context):
+    """
+    Given:
+        - A cached session which Zscaler already timed out.
+    When:
+        - Running the url command.
+    Then:
+        - Ensure the integration logs in again and retries the request with the new session.
+    """
+    import Zscaler
+    integration_context.update({'session_id': 'JSESSIONID=old', 'session_expiry': time.time() + 600})
+    login, _ = mock_zscaler_api(mocker, requests_mock)
+    with open('test_data/responses/url.json', 'r') as response_f:
+        requests_mock.post('https://cloud/api/v1/urlLookup', [{'status_code': 401}, {'json': json.load(response_f)}])
+    mocker.patch.object(demisto, 'command', return_value='url')
+    mocker.patch.object(demisto, 'args', return_value={'url': 'www.demisto22.com'})
+    mocker.patch.object(demisto, 'results')
+
+    Zscaler.main()
+
+    assert login.call_count == 1
+    assert integration_context['session_id'] == 'JSESSIONID=123'
+    assert requests_mock.last_request.headers['cookie'] == 'JSESSIONID=123'
+
+
+def test_mutating_command_activates_changes(mocker, requests_mock, integration_context):
+    """
+    Given:
+        - The auto activate parameter is enabled.
+    When:
+        - Running the zscaler-blacklist-url command.
+    Then:
+        - Ensure the changes are activated.
+    """
+    import Zscaler
+    _, activate = mock_zscaler_api(mocker, requests_mock)
+    mocker.patch.object(Zscaler, 'AUTO_ACTIVATE', True)
+    mocker.patch.object(demisto, 'command', return_value='zscaler-blacklist-url')
+    mocker.patch.object(demisto, 'args', return_value={'url': 'www.demisto22.com'})
+    mocker.patch.object(demisto, 'results')
+
+    Zscaler.main()
+
+    assert activate.call_count == 1
+    assert 'pending_changes' not in integration_context
+
+
+def test_batched_activation(mocker, requests_mock, integration_context):
+    """
+    Given:
+        - The auto activate parameter is disabled.
+    When:
+        - Running the zscaler-blacklist-url command twice, and then the zscaler-activate-changes command.
+    Then:
+        - Ensure the changes are activated only once, by the zscaler-activate-changes command.
+    """
+    import Zscaler
+    _, activate = mock_zscaler_api(mocker, requests_mock)
+    mocker.patch.object(Zscaler, 'AUTO_ACTIVATE', False)
+    mocker.patch.object(demisto, 'results')
+    mocker.patch.object(demisto, 'command', return_value='zscaler-blacklist-url')
+    for url in ('www.demisto22.com', 'www.demisto33.com'):
+        mocker.patch.object(demisto, 'args', return_value={'url': url})
+        Zscaler.main()
+
+    assert activate.call_count == 0
+    assert [change['Arguments'] for change in integration_context['pending_changes']] == \
+        ['url=www.demisto22.com', 'url=www.demisto33.com']
+
+    mocker.patch.object(demisto, 'command', return_value='zscaler-activate-changes')
+    mocker.patch.object(demisto, 'args', return_value={})
+    Zscaler.main()
+
+    assert activate.call_count == 1
+    assert 'pending_changes' not in integration_context
+    assert len(demisto.results.call_args[0][0]['Contents']) == 2
+
+
+def test_bulk_url_lookup(mocker, requests_mock):
+    """
+    Given:
+        - 250 distinct URLs, some of them given more than once.
+    When:
+        - Running the url command, while the second chunk is rate limited once.
+    Then:
+        - Ensure the URLs are looked up without duplicates in chunks of 100.
+        - Ensure only the rate limited chunk is retried, after the time requested by Zscaler.
+        - Ensure a result is returned for every URL.
+    """
+    import Zscaler
+    mocker.patch.object(Zscaler, 'BASE_URL', 'https://cloud/api/v1')
+    sleep = mocker.patch.object(Zscaler.time, 'sleep')
+    urls = ['www.demisto{}.com'.format(i) for i in range(250)]
+
+    def lookup_response(request, context):
+        return [{'url': url, 'urlClassifications': ['NEWS_AND_MEDIA'], 'urlClassificationsWithSecurityAlert': []}
+                for url in request.json()]
+
+    lookup = requests_mock.post('https://cloud/api/v1/urlLookup', [
+        {'json': lookup_response},
+        {'status_code': 429, 'headers': {'Retry-After': '2 seconds'}},
+        {'json': lookup_response},
+        {'json': lookup_response}
+    ])
+
+    entry = Zscaler.url_lookup(','.join(urls + urls[:50]))
+
+    assert [len(request.json()) for request in lookup.request_history] == [100, 100, 100, 50]
+    assert lookup.request_history[1].json() == lookup.request_history[2].json()
+    sleep.assert_called_once_with(2)
+    assert [score['Indicator'] for score in entry['EntryContext']['DBotScore']] == urls
@@ -1,3 +1,6 @@
+import json
+import shutil
+import yaml
 import pytest
 from Tests.Marketplace.marketplace_services import Pack
 
@@ -86,4 +89,59 @@ class TestVersionSorting:
         mocker.patch("os.path.exists", return_value=False)
         latest_version = dummy_pack.latest_version
         assert latest_version == "1.0.0"
+
+
+class TestBuildCache:
+    @staticmethod
+    def build_pack(pack_source_path, pack_path, index_folder_path, build_cache_path):
+        shutil.copytree(pack_source_path, pack_path)
+        pack = Pack(pack_name="TestPack", pack_path=pack_path)
+        assert pack.load_build_manifest(build_cache_path)
+        task_status, content_items = pack.collect_content_items()
+        assert task_status
+        assert pack.format_metadata(content_items, [], "", index_folder_path)
+
+        return pack, content_items
+
+    def test_reuse_cached_build(self, tmp_path, mocker):
+        """
+        Given
+        - A pack that was built and stored in the build cache.
+
+        When
+        - Building the pack again, without changes and after changing one of its scripts.
+
+        Then
+        - Ensure the unchanged pack reuses the previous zip and doesn't parse its content items again.
+        - Ensure the changed pack is built and only the changed script is parsed.
+        """
+        pack_source_path = tmp_path / 'source'
+        (pack_source_path / 'Scripts').mkdir(parents=True)
+        (pack_source_path / 'Scripts' / 'script-a.yml').write_text('name: a\ncomment: first')
+        (pack_source_path / 'Scripts' / 'script-b.yml').write_text('name: b\ncomment: second')
+        (pack_source_path / Pack.USER_METADATA).write_text(json.dumps({'name': 'Test Pack'}))
+        index_folder_path = tmp_path / 'index'
+        (index_folder_path / 'Base').mkdir(parents=True)
+        (index_folder_path / 'Base' / Pack.METADATA).write_text(json.dumps({'name': 'Base'}))
+        build_cache_path = str(tmp_path / 'cache')
+
+        pack, _ = self.build_pack(pack_source_path, tmp_path / 'build1', index_folder_path, build_cache_path)
+        assert pack.reuse_cached_build() == (False, f"{tmp_path / 'build1'}.zip")
+        task_status, zip_pack_path = pack.zip_pack()
+        assert pack.save_build_cache(zip_pack_path)
+
+        yaml_load = mocker.spy(yaml, 'safe_load')
+        pack, content_items = self.build_pack(pack_source_path, tmp_path / 'build2', index_folder_path,
+                                              build_cache_path)
+        assert yaml_load.call_count == 0
+        assert sorted(item['description'] for item in content_items['automation']) == ['first', 'second']
+        assert pack.reuse_cached_build() == (True, f"{tmp_path / 'build2'}.zip")
+        assert pack.is_cached_build
+
+        (pack_source_path / 'Scripts' / 'script-b.yml').write_text('name: b\ncomment: changed')
+        pack, content_items = self.build_pack(pack_source_path, tmp_path / 'build3', index_folder_path,
+                                              build_cache_path)
+        assert yaml_load.call_count == 1
+        assert sorted(item['description'] for item in content_items['automation']) == ['changed', 'first']
+        assert pack.reuse_cached_build() == (False, f"{tmp_path / 'build3'}.zip")
 # disable-secrets-detection-end
@@ -88,3 +88,40 @@ class TestPrivatePacks:
         private_packs = upload_packs.get_private_packs('path')
 
         assert private_packs == []
+
+
+class TestProcessPacks:
+    def test_process_packs_local_storage(self, tmp_path):
+        """
+        Given
+        - A valid pack and a pack with no metadata, and a local storage bucket.
+
+        When
+        - Processing the packs.
+
+        Then
+        - Ensure the valid pack is zipped, uploaded to the bucket and copied to the index folder.
+        - Ensure the pack with no metadata fails and doesn't stop the processing of the other pack.
+        """
+        import json
+        from Tests.Marketplace import upload_packs
+        from Tests.Marketplace.marketplace_services import Pack, PackStatus, LocalStorageBucket
+
+        index_folder_path = tmp_path / 'index'
+        (index_folder_path / 'Base').mkdir(parents=True)
+        (index_folder_path / 'Base' / Pack.METADATA).write_text(json.dumps({'name': 'Base'}))
+        (tmp_path / 'ValidPack').mkdir()
+        (tmp_path / 'ValidPack' / Pack.USER_METADATA).write_text(json.dumps({'name': 'Valid Pack'}))
+        (tmp_path / 'InvalidPack').mkdir()
+        packs_list = [Pack('ValidPack', str(tmp_path / 'ValidPack')),
+                      Pack('InvalidPack', str(tmp_path / 'InvalidPack'))]
+        storage_bucket = LocalStorageBucket(str(tmp_path / 'bucket'))
+
+        upload_packs.process_packs(packs_list, storage_bucket, str(index_folder_path), signature_key=None,
+                                   override_pack=False, upload_workers=2, zip_workers=1)
+
+        assert packs_list[0].status == PackStatus.SUCCESS.name
+        assert packs_list[1].status == PackStatus.FAILED_METADATA_PARSING.name
+        assert [blob.name for blob in storage_bucket.list_blobs(prefix='content/packs/ValidPack')] == \
+            ['content/packs/ValidPack/1.0.0/ValidPack.zip']
+        assert (index_folder_path / 'ValidPack' / Pack.METADATA).exists()
@@ -7,6 +7,8 @@ import shutil
 import yaml
 import enum
 import base64
+import hashlib
+import threading
 from distutils.util import strtobool
 from distutils.version import LooseVersion
 from datetime import datetime
@@ -31,6 +33,77 @@ class GCPConfig(object):
     INDEX_NAME = "index"  # main index folder name
 
 
+class LocalStorageBucket(object):
+    """ Local file system storage bucket.
+
+    Implements the subset of google.cloud.storage.bucket.Bucket interface that is used by the packs upload flow,
+    so the whole flow can run and be benchmarked offline.
+
+    Args:
+        bucket_path (str): full path to the folder that acts as the bucket.
+
+    """
+
+    def __init__(self, bucket_path):
+        self._bucket_path = bucket_path
+        self.name = os.path.basename(os.path.normpath(bucket_path))
+
+    @property
+    def path(self):
+        """ str: bucket folder full path.
+        """
+        return self._bucket_path
+
+    def blob(self, blob_name):
+        return LocalStorageBlob(self, blob_name)
+
+    def list_blobs(self, prefix=""):
+        for root, dirs, files in os.walk(self._bucket_path):
+            for blob_file in files:
+                blob_name = os.path.relpath(os.path.join(root, blob_file), self._bucket_path)
+                if blob_name.startswith(prefix):
+                    yield LocalStorageBlob(self, blob_name)
+
+
+class LocalStorageBlob(object):
+    """ Local file system storage blob, see LocalStorageBucket.
+
+    Args:
+        bucket (LocalStorageBucket): the bucket of the blob.
+        blob_name (str): the blob path, relative to the bucket.
+
+    """
+
+    def __init__(self, bucket, blob_name):
+        self.bucket = bucket
+        self.name = blob_name
+        self.cache_control = None
+
+    @property
+    def public_url(self):
+        """ str: blob full path in the local file system.
+        """
+        return os.path.join(self.bucket.path, self.name)
+
+    def exists(self):
+        return os.path.isfile(self.public_url)
+
+    def reload(self):
+        pass
+
+    def upload_from_file(self, file_obj):
+        os.makedirs(os.path.dirname(self.public_url), exist_ok=True)
+        with open(self.public_url, "wb") as blob_file:
+            shutil.copyfileobj(file_obj, blob_file)
+
+    def upload_from_filename(self, filename):
+        with open(filename, "rb") as file_obj:
+            self.upload_from_file(file_obj)
+
+    def download_to_filename(self, filename):
+        shutil.copyfile(self.public_url, filename)
+
+
 class PackFolders(enum.Enum):
     """ Pack known folders. Should be replaced by constants from demisto-sdk in later step.
 
@@ -103,6 +176,8 @@ class Pack(object):
         USER_METADATA (str); user metadata file name, the one that located in content repo.
         EXCLUDE_DIRECTORIES (list): list of directories to excluded before uploading pack zip to storage.
         AUTHOR_IMAGE_NAME (str): author image file name.
+        BUILD_MANIFEST (str): pack's build manifest file name, stored in the build cache folder.
+        BUILD_MANIFEST_IGNORED_METADATA_FIELDS (list): metadata fields that change on every build.
 
     """
     PACK_INITIAL_VERSION = "1.0.0"
@@ -114,6 +189,8 @@ class Pack(object):
     METADATA = "metadata.json"
     AUTHOR_IMAGE_NAME = "Author_image.png"
     EXCLUDE_DIRECTORIES = [PackFolders.TEST_PLAYBOOKS.value]
+    BUILD_MANIFEST = "build_manifest.json"
+    BUILD_MANIFEST_IGNORED_METADATA_FIELDS = ['created', 'updated']
 
     def __init__(self, pack_name, pack_path):
         self._pack_name = pack_name
@@ -122,6 +199,12 @@ class Pack(object):
         self._status = None
         self._relative_storage_path = ""
         self._remove_files_list = []  # tracking temporary files, in order to delete in later step
+        self._build_cache_path = ""  # pack folder inside the build cache, empty when build cache isn't used
+        self._previous_build_manifest = {}
+        self._content_hashes = {}  # relative file path to sha256 of the pack files, before any modification
+        self._content_items_cache = {}  # relative file path to sha256 and collected content item
+        self._formatted_metadata = {}
+        self._is_cached_build = False
 
     @property
     def name(self):
@@ -165,6 +248,12 @@ class Pack(object):
         """
         self._relative_storage_path = path_value
 
+    @property
+    def is_cached_build(self):
+        """ bool: whether the pack zip was reused from the build cache.
+        """
+        return self._is_cached_build
+
     def _get_latest_version(self):
         """ Return latest semantic version of the pack.
 
@@ -324,7 +413,7 @@ class Pack(object):
         if self._pack_name != GCPConfig.BASE_PACK:  # check that current pack isn't Base Pack in order to prevent loop
             dependencies_ids.add(GCPConfig.BASE_PACK)  # Base pack is always added as pack dependency
 
-        for dependency_pack_id in dependencies_ids:
+        for dependency_pack_id in sorted(dependencies_ids):  # sorted, for the metadata to be deterministic
             dependency_metadata_path = os.path.join(index_folder_path, dependency_pack_id, Pack.METADATA)
 
             if os.path.exists(dependency_metadata_path):
@@ -387,8 +476,11 @@ class Pack(object):
 
         try:
             if signature_string:
-                with open("keyfile", "wb") as keyfile:
+                # packs may be signed concurrently, the key file is replaced atomically to never be read partially
+                temp_keyfile_path = f"keyfile.{os.getpid()}.{threading.get_ident()}"
+                with open(temp_keyfile_path, "wb") as keyfile:
                     keyfile.write(signature_string.encode())
+                os.replace(temp_keyfile_path, "keyfile")
                 arg = f'./signDirectory {self._pack_path} /keyfile base64'
                 signing_process = subprocess.Popen(arg, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
                 output, err = signing_process.communicate()
@@ -510,6 +602,19 @@ class Pack(object):
                         continue
 
                     pack_file_path = os.path.join(root, pack_file_name)
+                    relative_file_path = os.path.relpath(pack_file_path, self._pack_path)
+                    file_hash = self._content_hashes.get(relative_file_path) or Pack._calculate_file_hash(
+                        pack_file_path)
+                    cached_content_item = self._previous_build_manifest.get('content_items', {}).get(
+                        relative_file_path, {})
+
+                    if cached_content_item.get('sha256') == file_hash:
+                        # the file wasn't changed since the previous build, no need to parse it again
+                        folder_collected_items.append(cached_content_item['item'])
+                        self._content_items_cache[relative_file_path] = cached_content_item
+                        continue
+
+                    collected_items_count = len(folder_collected_items)
 
                     with open(pack_file_path, 'r') as pack_file:
                         if current_directory in PackFolders.yml_supported_folders():
@@ -575,6 +680,12 @@ class Pack(object):
                             'fromDateLicense': dash_board_section.get('fromDateLicense', "")
                         })
 
+                    if len(folder_collected_items) > collected_items_count:
+                        self._content_items_cache[relative_file_path] = {
+                            'sha256': file_hash,
+                            'item': folder_collected_items[-1]
+                        }
+
                 content_item_key = content_item_name_mapping[current_directory]
                 content_items_result[content_item_key] = folder_collected_items
 
@@ -627,6 +738,7 @@ class Pack(object):
 
             with open(metadata_path, "w") as metadata_file:
                 json.dump(formatted_metadata, metadata_file, indent=4)  # writing back parsed metadata
+            self._formatted_metadata = formatted_metadata
 
             print_color(f"Finished formatting {self._pack_name} packs's {Pack.METADATA} {metadata_path} file.",
                         LOG_COLORS.GREEN)
@@ -636,6 +748,154 @@ class Pack(object):
         finally:
             return task_status
 
+    @staticmethod
+    def _calculate_file_hash(file_path):
+        """ Calculates sha256 of the file content.
+
+        Args:
+            file_path (str): full path to the file.
+
+        Returns:
+            str: hex digest of the file content sha256.
+
+        """
+        file_hash = hashlib.sha256()
+
+        with open(file_path, 'rb') as hashed_file:
+            for chunk in iter(lambda: hashed_file.read(65536), b''):
+                file_hash.update(chunk)
+
+        return file_hash.hexdigest()
+
+    def load_build_manifest(self, build_cache_path):
+        """ Calculates the content hashes of the pack files and loads the manifest of the previous build.
+
+        Should be called before the pack folder is modified.
+
+        Args:
+            build_cache_path (str): full path to the build cache folder.
+
+        Returns:
+            bool: whether the operation succeeded.
+
+        """
+        task_status = False
+
+        try:
+            self._build_cache_path = os.path.join(build_cache_path, self._pack_name)
+
+            for root, dirs, files in os.walk(self._pack_path):
+                for pack_file in files:
+                    full_file_path = os.path.join(root, pack_file)
+                    relative_file_path = os.path.relpath(full_file_path, self._pack_path)
+                    self._content_hashes[relative_file_path] = Pack._calculate_file_hash(full_file_path)
+
+            build_manifest_path = os.path.join(self._build_cache_path, Pack.BUILD_MANIFEST)
+            if os.path.exists(build_manifest_path):
+                with open(build_manifest_path, 'r') as build_manifest_file:
+                    self._previous_build_manifest = json.load(build_manifest_file)
+
+            task_status = True
+        except Exception as e:
+            print_error(f"Failed loading {self._pack_name} pack build manifest. Additional info:\n {e}")
+            self._content_hashes = {}
+            self._previous_build_manifest = {}
+        finally:
+            return task_status
+
+    def _build_manifest(self, signature_string=None):
+        """ Builds the manifest of the current pack build.
+
+        Args:
+            signature_string (str): Base64 encoded string used to sign the pack.
+
+        Returns:
+            dict: the files content hashes, the formatted metadata and the signature key hash of the build.
+
+        """
+        metadata = {k: v for k, v in self._formatted_metadata.items()
+                    if k not in Pack.BUILD_MANIFEST_IGNORED_METADATA_FIELDS}
+        signature_hash = hashlib.sha256(signature_string.encode()).hexdigest() if signature_string else ""
+
+        return {
+            'files': self._content_hashes,
+            'metadata': metadata,
+            'signature': signature_hash
+        }
+
+    def reuse_cached_build(self, signature_string=None):
+        """ Reuses the pack zip of the previous build in case the pack content and metadata inputs weren't changed.
+
+        The pack metadata file is restored from the previous build as well, so the uploaded zip and the index
+        remain consistent.
+
+        Args:
+            signature_string (str): Base64 encoded string used to sign the pack.
+
+        Returns:
+            bool: whether the previous build was reused.
+            str: full path to the reused pack zip.
+
+        """
+        zip_pack_path = f"{self._pack_path}.zip"
+
+        try:
+            if not self._build_cache_path or not self._content_hashes or not self._previous_build_manifest:
+                return False, zip_pack_path
+
+            previous_build_manifest = {k: v for k, v in self._previous_build_manifest.items() if k != 'content_items'}
+            cached_zip_path = os.path.join(self._build_cache_path, f"{self._pack_name}.zip")
+            cached_metadata_path = os.path.join(self._build_cache_path, Pack.METADATA)
+
+            if previous_build_manifest != self._build_manifest(signature_string) \
+                    or not os.path.exists(cached_zip_path) or not os.path.exists(cached_metadata_path):
+                return False, zip_pack_path
+
+            shutil.copyfile(cached_zip_path, zip_pack_path)
+            shutil.copyfile(cached_metadata_path, os.path.join(self._pack_path, Pack.METADATA))
+            self._is_cached_build = True
+            print_color(f"{self._pack_name} pack wasn't changed, reusing the previous build.", LOG_COLORS.GREEN)
+
+            return True, zip_pack_path
+        except Exception as e:
+            print_warning(f"Failed reusing {self._pack_name} pack previous build, building the pack. "
+                          f"Additional info:\n {e}")
+            return False, zip_pack_path
+
+    def save_build_cache(self, zip_pack_path, signature_string=None):
+        """ Stores the pack zip, metadata and build manifest in the build cache, for reuse by the next builds.
+
+        Args:
+            zip_pack_path (str): full path to pack zip artifact.
+            signature_string (str): Base64 encoded string used to sign the pack.
+
+        Returns:
+            bool: whether the operation succeeded.
+
+        """
+        task_status = False
+
+        try:
+            if not self._build_cache_path or not self._content_hashes:
+                return task_status
+
+            os.makedirs(self._build_cache_path, exist_ok=True)
+            shutil.copyfile(zip_pack_path, os.path.join(self._build_cache_path, f"{self._pack_name}.zip"))
+            shutil.copyfile(os.path.join(self._pack_path, Pack.METADATA),
+                            os.path.join(self._build_cache_path, Pack.METADATA))
+
+            build_manifest = self._build_manifest(signature_string)
+            build_manifest['content_items'] = self._content_items_cache
+
+            with open(os.path.join(self._build_cache_path, Pack.BUILD_MANIFEST), 'w') as build_manifest_file:
+                json.dump(build_manifest, build_manifest_file, indent=4)
+
+            task_status = True
+        except Exception as e:
+            print_warning(f"Failed saving {self._pack_name} pack build cache. Additional info:\n {e}")
+        finally:
+            return task_status
+
     def parse_release_notes(self):
         """ Need to implement the changelog.md parsing and changelog.json creation after design is finalized.
 
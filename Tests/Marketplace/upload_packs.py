@@ -8,13 +8,19 @@ import uuid
 import prettytable
 import google.auth
 import glob
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait
 from google.cloud import storage
 from datetime import datetime
 from zipfile import ZipFile
 from Tests.Marketplace.marketplace_services import Pack, PackStatus, GCPConfig, PACKS_FULL_PATH, IGNORED_FILES, \
-    PACKS_FOLDER, IGNORED_PATHS
+    PACKS_FOLDER, IGNORED_PATHS, LocalStorageBucket
 from demisto_sdk.commands.common.tools import run_command, print_error, print_warning, print_color, LOG_COLORS
 
+UPLOAD_WORKERS = 8  # number of threads uploading packs and images to storage
+INDEX_UPDATE_WORKERS = 4  # number of packs copied into the index folder concurrently
+
 
 def get_modified_packs(specific_packs=""):
     """Detects and returns modified or new packs names.
@@ -96,6 +102,37 @@ def init_storage_client(service_account=None):
         return storage_client
 
 
+def init_storage_buckets(bucket_name, private_bucket_name=None, service_account=None, local_storage_path=None):
+    """Initialize the public and private storage buckets.
+
+    In case a local storage path is given, the buckets are folders inside it and cloud storage isn't used.
+
+    Args:
+        bucket_name (str): public storage bucket name.
+        private_bucket_name (str): private storage bucket name.
+        service_account (str): full path to service account json.
+        local_storage_path (str): full path to local folder that is used as storage.
+
+    Returns:
+        storage.Bucket or LocalStorageBucket: public storage bucket.
+        storage.Bucket or LocalStorageBucket: private storage bucket, None if no private bucket name was given.
+
+    """
+    if local_storage_path:
+        print(f"Using local storage at {local_storage_path}")
+        storage_bucket = LocalStorageBucket(os.path.join(local_storage_path, bucket_name))
+        private_storage_bucket = LocalStorageBucket(os.path.join(local_storage_path, private_bucket_name)) \
+            if private_bucket_name else None
+
+        return storage_bucket, private_storage_bucket
+
+    storage_client = init_storage_client(service_account)
+    storage_bucket = storage_client.bucket(bucket_name)
+    private_storage_bucket = storage_client.bucket(private_bucket_name) if private_bucket_name else None
+
+    return storage_bucket, private_storage_bucket
+
+
 def download_and_extract_index(storage_bucket, extract_destination_path):
     """Downloads and extracts index zip from cloud storage.
 
@@ -338,6 +375,189 @@ def print_packs_summary(packs_list):
         print_error(failed_packs_table)
 
 
+def prepare_pack(pack, storage_bucket, index_folder_path, build_cache_path=None):
+    """Uploads pack images, collects pack content items and formats pack metadata.
+
+    Args:
+        pack (Pack): pack to prepare.
+        storage_bucket (google.cloud.storage.bucket.Bucket): google storage bucket where images will be uploaded.
+        index_folder_path (str): downloaded index folder directory path.
+        build_cache_path (str): full path to the build cache folder, None in case build cache isn't used.
+
+    Returns:
+        bool: whether the pack is ready for signing and zipping. In case of failure, pack status is updated.
+
+    """
+    if build_cache_path and not pack.load_build_manifest(build_cache_path):
+        print_warning(f"Building {pack.name} pack without build cache.")
+
+    task_status, integration_images = pack.upload_integration_images(storage_bucket)
+    if not task_status:
+        pack.status = PackStatus.FAILED_IMAGES_UPLOAD.name
+        pack.cleanup()
+        return False
+
+    task_status, author_image = pack.upload_author_image(storage_bucket)
+    if not task_status:
+        pack.status = PackStatus.FAILED_AUTHOR_IMAGE_UPLOAD.name
+        pack.cleanup()
+        return False
+
+    task_status, pack_content_items = pack.collect_content_items()
+    if not task_status:
+        pack.status = PackStatus.FAILED_COLLECT_ITEMS.name
+        pack.cleanup()
+        return False
+
+    task_status = pack.format_metadata(pack_content_items, integration_images, author_image, index_folder_path)
+    if not task_status:
+        pack.status = PackStatus.FAILED_METADATA_PARSING.name
+        pack.cleanup()
+        return False
+
+    # todo finish implementation of release notes
+    # pack.parse_release_notes()
+
+    task_status = pack.remove_unwanted_files()
+    if not task_status:
+        pack.status = PackStatus.FAILED_REMOVING_PACK_SKIPPED_FOLDERS
+        pack.cleanup()
+        return False
+
+    return True
+
+
+def sign_and_zip_pack(pack, signature_key):
+    """Signs and zips pack folder. Runs in a worker process, therefore the pack status isn't updated here.
+
+    Args:
+        pack (Pack): pack to sign and zip.
+        signature_key (str): base64 encoded signature key used for signing the pack.
+
+    Returns:
+        str: the failure status of the pack, None in case of success.
+        str: full path to created pack zip.
+
+    """
+    task_status = pack.sign_pack(signature_key)
+    if not task_status:
+        return PackStatus.FAILED_SIGNING_PACKS.name, ""
+
+    task_status, zip_pack_path = pack.zip_pack()
+    if not task_status:
+        return PackStatus.FAILED_ZIPPING_PACK_ARTIFACTS.name, zip_pack_path
+
+    return None, zip_pack_path
+
+
+def upload_pack(pack, zip_pack_path, storage_bucket, override_pack, index_folder_path, index_update_semaphore):
+    """Uploads pack zip to storage and copies the pack to the index folder.
+
+    Args:
+        pack (Pack): pack to upload.
+        zip_pack_path (str): full path to pack zip artifact.
+        storage_bucket (google.cloud.storage.bucket.Bucket): google cloud storage bucket.
+        override_pack (bool): whether to override existing pack.
+        index_folder_path (str): downloaded index folder directory path.
+        index_update_semaphore (threading.BoundedSemaphore): bounds the number of concurrent index folder updates.
+
+    """
+    # a reused build is identical to the one that was uploaded, so it's uploaded only when missing from storage
+    task_status, skipped_pack_uploading = pack.upload_to_storage(zip_pack_path, pack.latest_version, storage_bucket,
+                                                                 override_pack and not pack.is_cached_build)
+    if not task_status:
+        pack.status = PackStatus.FAILED_UPLOADING_PACK.name
+        pack.cleanup()
+        return
+
+    # in case that pack already exist at cloud storage path, skipped further steps
+    if skipped_pack_uploading:
+        pack.status = PackStatus.PACK_ALREADY_EXISTS.name
+        pack.cleanup()
+        return
+
+    task_status = pack.prepare_for_index_upload()
+    if not task_status:
+        pack.status = PackStatus.FAILED_PREPARING_INDEX_FOLDER.name
+        pack.cleanup()
+        return
+
+    with index_update_semaphore:
+        task_status = update_index_folder(index_folder_path=index_folder_path, pack_name=pack.name,
+                                          pack_path=pack.path)
+    if not task_status:
+        pack.status = PackStatus.FAILED_UPDATING_INDEX_FOLDER.name
+        pack.cleanup()
+        return
+
+    pack.status = PackStatus.SUCCESS.name
+
+
+def process_packs(packs_list, storage_bucket, index_folder_path, signature_key, override_pack,
+                  upload_workers=UPLOAD_WORKERS, zip_workers=None, index_update_workers=INDEX_UPDATE_WORKERS,
+                  build_cache_path=None):
+    """Processes the packs in a pipeline and updates their status.
+
+    Images uploads, content items collection and metadata formatting run in a thread pool. Each prepared pack is
+    signed and zipped in a process pool, and the zipped packs are uploaded in the thread pool. Copying the uploaded
+    packs into the index folder is bounded by index_update_workers.
+    In case a build cache is used, packs whose content and metadata inputs weren't changed since the previous
+    build reuse its zip instead of being signed and zipped again.
+
+    Args:
+        packs_list (list): list of initialized packs.
+        storage_bucket (google.cloud.storage.bucket.Bucket): google cloud storage bucket.
+        index_folder_path (str): downloaded index folder directory path.
+        signature_key (str): base64 encoded signature key used for signing packs.
+        override_pack (bool): whether to override existing packs.
+        upload_workers (int): number of threads preparing and uploading packs.
+        zip_workers (int): number of processes signing and zipping packs, defaults to the number of processors.
+        index_update_workers (int): number of packs copied into the index folder concurrently.
+        build_cache_path (str): full path to the build cache folder, None in case build cache isn't used.
+
+    """
+    index_update_semaphore = threading.BoundedSemaphore(index_update_workers)
+    # the zip workers are started while the upload threads are running, forking them then could copy locks held by
+    # those threads into the workers, so the workers are spawned instead
+    zip_context = multiprocessing.get_context('spawn')
+
+    with ThreadPoolExecutor(max_workers=upload_workers) as upload_executor, \
+            ProcessPoolExecutor(max_workers=zip_workers, mp_context=zip_context) as zip_executor:
+        prepare_futures = {upload_executor.submit(prepare_pack, pack, storage_bucket, index_folder_path,
+                                                  build_cache_path): pack
+                           for pack in packs_list}
+        zip_futures = {}
+        upload_futures = []
+        for prepare_future in as_completed(prepare_futures):
+            pack = prepare_futures[prepare_future]
+            if not prepare_future.result():
+                continue
+
+            is_cached_build, zip_pack_path = pack.reuse_cached_build(signature_key)
+            if is_cached_build:
+                upload_futures.append(upload_executor.submit(upload_pack, pack, zip_pack_path, storage_bucket,
+                                                             override_pack, index_folder_path,
+                                                             index_update_semaphore))
+            else:
+                zip_futures[zip_executor.submit(sign_and_zip_pack, pack, signature_key)] = pack
+
+        for zip_future in as_completed(zip_futures):
+            pack = zip_futures[zip_future]
+            failed_status, zip_pack_path = zip_future.result()
+            if failed_status:
+                pack.status = failed_status
+                pack.cleanup()
+                continue
+
+            pack.save_build_cache(zip_pack_path, signature_key)
+
+            upload_futures.append(upload_executor.submit(upload_pack, pack, zip_pack_path, storage_bucket,
+                                                         override_pack, index_folder_path, index_update_semaphore))
+
+        for upload_future in wait(upload_futures).done:
+            upload_future.result()
+
+
 def option_handler():
     """Validates and parses script arguments.
 
@@ -369,6 +589,19 @@ def option_handler():
     parser.add_argument('-k', '--key_string', help="Base64 encoded signature key used for signing packs.",
                         required=False)
     parser.add_argument('-pb', '--private_bucket_name', help="Private storage bucket name", required=False)
+    parser.add_argument('-l', '--local_storage_path',
+                        help=("Full path of local folder to use as storage instead of cloud storage, "
+                              "the buckets are created as sub folders. Used for offline runs and benchmarks."),
+                        required=False)
+    parser.add_argument('-uw', '--upload_workers', help="Number of threads preparing and uploading packs",
+                        type=int, default=UPLOAD_WORKERS, required=False)
+    parser.add_argument('-zw', '--zip_workers',
+                        help="Number of processes signing and zipping packs, defaults to the number of processors",
+                        type=int, required=False)
+    parser.add_argument('-c', '--build_cache_path',
+                        help=("Full path of folder to keep the packs build cache in. Packs that weren't changed since "
+                              "the previous build reuse its zip instead of being built again."),
+                        required=False)
     # disable-secrets-detection-end
     return parser.parse_args()
 
@@ -385,9 +618,9 @@ def main():
     override_pack = option.override_pack
     signature_key = option.key_string
 
-    # google cloud storage client initialized
-    storage_client = init_storage_client(service_account)
-    storage_bucket = storage_client.bucket(storage_bucket_name)
+    # storage buckets initialized
+    storage_bucket, private_storage_bucket = init_storage_buckets(storage_bucket_name, private_bucket_name,
+                                                                  service_account, option.local_storage_path)
 
     # download and extract index from public bucket
     index_folder_path, index_blob = download_and_extract_index(storage_bucket, extract_destination_path)
@@ -398,88 +631,17 @@ def main():
     packs_list = [Pack(pack_name, os.path.join(extract_destination_path, pack_name)) for pack_name in modified_packs
                   if os.path.exists(os.path.join(extract_destination_path, pack_name))]
 
-    if private_bucket_name:  # Add private packs to the index
-        private_storage_bucket = storage_client.bucket(private_bucket_name)
+    if private_storage_bucket:  # Add private packs to the index
         private_packs = update_index_with_priced_packs(private_storage_bucket, extract_destination_path,
                                                        index_folder_path)
     else:  # skipping private packs
         print("Skipping index update of priced packs")
         private_packs = []
 
-    # starting iteration over packs
-    for pack in packs_list:
-        task_status, integration_images = pack.upload_integration_images(storage_bucket)
-        if not task_status:
-            pack.status = PackStatus.FAILED_IMAGES_UPLOAD.name
-            pack.cleanup()
-            continue
-
-        task_status, author_image = pack.upload_author_image(storage_bucket)
-        if not task_status:
-            pack.status = PackStatus.FAILED_AUTHOR_IMAGE_UPLOAD.name
-            pack.cleanup()
-            continue
-
-        task_status, pack_content_items = pack.collect_content_items()
-        if not task_status:
-            pack.status = PackStatus.FAILED_COLLECT_ITEMS.name
-            pack.cleanup()
-            continue
-
-        task_status = pack.format_metadata(pack_content_items, integration_images, author_image,
-                                           index_folder_path)
-        if not task_status:
-            pack.status = PackStatus.FAILED_METADATA_PARSING.name
-            pack.cleanup()
-            continue
-
-        # todo finish implementation of release notes
-        # pack.parse_release_notes()
-
-        task_status = pack.remove_unwanted_files()
-        if not task_status:
-            pack.status = PackStatus.FAILED_REMOVING_PACK_SKIPPED_FOLDERS
-            pack.cleanup()
-            continue
-
-        task_status = pack.sign_pack(signature_key)
-        if not task_status:
-            pack.status = PackStatus.FAILED_SIGNING_PACKS.name
-            pack.cleanup()
-            continue
-
-        task_status, zip_pack_path = pack.zip_pack()
-        if not task_status:
-            pack.status = PackStatus.FAILED_ZIPPING_PACK_ARTIFACTS.name
-            pack.cleanup()
-            continue
-
-        task_status, skipped_pack_uploading = pack.upload_to_storage(zip_pack_path, pack.latest_version, storage_bucket,
-                                                                     override_pack)
-        if not task_status:
-            pack.status = PackStatus.FAILED_UPLOADING_PACK.name
-            pack.cleanup()
-            continue
-
-        # in case that pack already exist at cloud storage path, skipped further steps
-        if skipped_pack_uploading:
-            pack.status = PackStatus.PACK_ALREADY_EXISTS.name
-            pack.cleanup()
-            continue
-
-        task_status = pack.prepare_for_index_upload()
-        if not task_status:
-            pack.status = PackStatus.FAILED_PREPARING_INDEX_FOLDER.name
-            pack.cleanup()
-            continue
-
-        task_status = update_index_folder(index_folder_path=index_folder_path, pack_name=pack.name, pack_path=pack.path)
-        if not task_status:
-            pack.status = PackStatus.FAILED_UPDATING_INDEX_FOLDER.name
-            pack.cleanup()
-            continue
-
-        pack.status = PackStatus.SUCCESS.name
+    # processing the packs in a pipeline
+    process_packs(packs_list, storage_bucket, index_folder_path, signature_key, override_pack,
+                  upload_workers=option.upload_workers, zip_workers=option.zip_workers,
+                  build_cache_path=option.build_cache_path)
 
     # finished iteration over content packs
     upload_index_to_storage(index_folder_path, extract_destination_path, index_blob, build_number, private_packs)
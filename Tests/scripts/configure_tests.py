@@ -9,6 +9,8 @@ import time
 import glob
 import random
 import argparse
+from collections import deque, defaultdict
+from functools import lru_cache
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CONTENT_DIR = os.path.abspath(SCRIPT_DIR + '/../..')
@@ -378,7 +380,7 @@ def collect_changed_ids(integration_ids, playbook_names, script_names, modified_
             script_to_version[name] = (get_from_version(file_path), get_to_version(file_path))
 
             package_name = os.path.dirname(file_path)
-            if glob.glob(package_name + "/*_test.py"):
+            if has_unit_tests(package_name):
                 catched_scripts.add(name)
                 tests_set.add('Found a unittest for the script {}'.format(package_name))
 
@@ -404,20 +406,11 @@ def collect_changed_ids(integration_ids, playbook_names, script_names, modified_
                                                   playbook_set, playbook_names,
                                                   integration_set, integration_ids)
 
-    for script_id in script_names:
-        enrich_for_script_id(script_id, script_to_version[script_id], script_names, script_set, playbook_set,
-                             playbook_names, updated_script_names, updated_playbook_names, catched_scripts,
-                             catched_playbooks, tests_set)
-
     integration_to_command, deprecated_commands_message = get_integration_commands(integration_ids, integration_set)
-    for integration_id, integration_commands in integration_to_command.items():
-        enrich_for_integration_id(integration_id, integration_to_version[integration_id], integration_commands,
-                                  script_set, playbook_set, playbook_names, script_names, updated_script_names,
-                                  updated_playbook_names, catched_scripts, catched_playbooks, tests_set)
-
-    for playbook_id in playbook_names:
-        enrich_for_playbook_id(playbook_id, playbook_to_version[playbook_id], playbook_names, script_set, playbook_set,
-                               updated_playbook_names, catched_playbooks, tests_set)
+    index = build_reverse_dependency_index(script_set, playbook_set)
+    enrich_affected_entities(index, script_to_version, playbook_to_version, integration_to_command,
+                             integration_to_version, script_names, playbook_names, updated_script_names,
+                             updated_playbook_names, catched_scripts, catched_playbooks, tests_set)
 
     for new_script in updated_script_names:
         script_names.add(new_script)
@@ -500,152 +493,159 @@ def exclude_deprecated_entities(script_set, script_names,
     return deprecated_messages_dict
 
 
-def enrich_for_integration_id(integration_id, given_version, integration_commands, script_set, playbook_set,
-                              playbook_names, script_names, updated_script_names, updated_playbook_names,
-                              catched_scripts, catched_playbooks, tests_set):
-    """Enrich the list of affected scripts/playbooks by your change set.
+def build_reverse_dependency_index(script_set, playbook_set):
+    """Builds an inverted index of the id set, mapping every entity to the entities which depend on it.
+
+    The id set is scanned only once, so walking the affected entities of a change set does not rescan
+    the whole script and playbook sets for every entity it visits. Deprecated entities are not indexed.
 
-    :param integration_id: The name of the integration we changed.
-    :param given_version: the version of the integration we changed.
-    :param integration_commands: The commands of the changed integation
     :param script_set: The set of existing scripts within Content repo.
     :param playbook_set: The set of existing playbooks within Content repo.
-    :param playbook_names: The names of the playbooks affected by your changes.
-    :param script_names: The names of the scripts affected by your changes.
-    :param updated_script_names: The names of scripts we identify as affected to your change set.
-    :param updated_playbook_names: The names of playbooks we identify as affected to your change set.
-    :param catched_scripts: The names of scripts we found tests for.
-    :param catched_playbooks: The names of playbooks we found tests for.
-    :param tests_set: The names of the caught tests.
+
+    :return: A dict of the following reverse mappings:
+        command_to_playbooks - command -> (playbook data, integration id the command is bound to or None)
+        command_to_scripts - command -> (script data, integration id the command is bound to)
+        script_to_scripts - script name -> data of the scripts executing it
+        script_to_playbooks - script name -> data of the playbooks implementing it
+        playbook_to_playbooks - playbook name -> data of the playbooks implementing it
     """
-    for playbook in playbook_set:
-        playbook_data = list(playbook.values())[0]
-        if playbook_data.get('deprecated', False):
-            continue
-        playbook_name = playbook_data.get('name')
-        playbook_fromversion = playbook_data.get('fromversion', '0.0.0')
-        playbook_toversion = playbook_data.get('toversion', '99.99.99')
-        command_to_integration = playbook_data.get('command_to_integration', {})
-        implementing_commands = command_to_integration.keys()
-        for integration_command in integration_commands:
-            if integration_command in implementing_commands and playbook_toversion >= given_version[1]:
-                if playbook_name not in playbook_names and playbook_name not in updated_playbook_names:
-                    if not command_to_integration.get(integration_command) or \
-                            command_to_integration.get(integration_command) == integration_id:
-
-                        tests = set(playbook_data.get('tests', []))
-                        if tests:
-                            catched_playbooks.add(playbook_name)
-                            update_test_set(tests, tests_set)
-
-                        updated_playbook_names.add(playbook_name)
-                        new_versions = (playbook_fromversion, playbook_toversion)
-                        enrich_for_playbook_id(playbook_name, new_versions, playbook_names, script_set, playbook_set,
-                                               updated_playbook_names, catched_playbooks, tests_set)
+    index = {
+        'command_to_playbooks': defaultdict(list),
+        'command_to_scripts': defaultdict(list),
+        'script_to_scripts': defaultdict(list),
+        'script_to_playbooks': defaultdict(list),
+        'playbook_to_playbooks': defaultdict(list)
+    }
 
     for script in script_set:
         script_data = list(script.values())[0]
         if script_data.get('deprecated', False):
             continue
-        script_name = script_data.get('name')
-        script_file_path = script_data.get('file_path')
-        script_fromversion = script_data.get('fromversion', '0.0.0')
-        script_toversion = script_data.get('toversion', '99.99.99')
+        for executed_script in set(script_data.get('script_executions', [])):
+            index['script_to_scripts'][executed_script].append(script_data)
+
         command_to_integration = script_data.get('command_to_integration', {})
-        for integration_command in integration_commands:
-            if integration_command in script_data.get('depends_on', []):
-                if integration_command in command_to_integration.keys() and \
-                        command_to_integration[integration_command] == integration_id and \
-                        script_toversion >= given_version[1]:
-
-                    if script_name not in script_names and script_name not in updated_script_names:
-                        tests = script_data.get('tests', [])
-                        if tests:
-                            catched_scripts.add(script_name)
-                            update_test_set(tests, tests_set)
-
-                        package_name = os.path.dirname(script_file_path)
-                        if glob.glob(package_name + "/*_test.py"):
-                            catched_scripts.add(script_name)
-                            tests_set.add('Found a unittest for the script {}'.format(script_name))
-
-                        updated_script_names.add(script_name)
-                        new_versions = (script_fromversion, script_toversion)
-                        enrich_for_script_id(script_name, new_versions, script_names, script_set, playbook_set,
-                                             playbook_names, updated_script_names, updated_playbook_names,
-                                             catched_scripts, catched_playbooks, tests_set)
-
-
-def enrich_for_playbook_id(given_playbook_id, given_version, playbook_names, script_set, playbook_set,
-                           updated_playbook_names, catched_playbooks, tests_set):
+        for command in set(script_data.get('depends_on', [])):
+            if command in command_to_integration:
+                index['command_to_scripts'][command].append((script_data, command_to_integration[command]))
+
     for playbook in playbook_set:
         playbook_data = list(playbook.values())[0]
         if playbook_data.get('deprecated', False):
             continue
-        playbook_name = playbook_data.get('name')
-        playbook_fromversion = playbook_data.get('fromversion', '0.0.0')
-        playbook_toversion = playbook_data.get('toversion', '99.99.99')
-        if given_playbook_id in playbook_data.get('implementing_playbooks', []) and \
-                playbook_toversion >= given_version[1]:
-
-            if playbook_name not in playbook_names and playbook_name not in updated_playbook_names:
-                tests = set(playbook_data.get('tests', []))
-                if tests:
-                    catched_playbooks.add(playbook_name)
-                    update_test_set(tests, tests_set)
+        for implementing_script in set(playbook_data.get('implementing_scripts', [])):
+            index['script_to_playbooks'][implementing_script].append(playbook_data)
 
-                updated_playbook_names.add(playbook_name)
-                new_versions = (playbook_fromversion, playbook_toversion)
-                enrich_for_playbook_id(playbook_name, new_versions, playbook_names, script_set, playbook_set,
-                                       updated_playbook_names, catched_playbooks, tests_set)
+        for implementing_playbook in set(playbook_data.get('implementing_playbooks', [])):
+            index['playbook_to_playbooks'][implementing_playbook].append(playbook_data)
 
+        for command, integration_id in playbook_data.get('command_to_integration', {}).items():
+            index['command_to_playbooks'][command].append((playbook_data, integration_id))
 
-def enrich_for_script_id(given_script_id, given_version, script_names, script_set, playbook_set, playbook_names,
-                         updated_script_names, updated_playbook_names, catched_scripts, catched_playbooks, tests_set):
-    for script in script_set:
-        script_data = list(script.values())[0]
-        if script_data.get('deprecated', False):
-            continue
-        script_name = script_data.get('name')
-        script_file_path = script_data.get('file_path')
-        script_fromversion = script_data.get('fromversion', '0.0.0')
-        script_toversion = script_data.get('toversion', '99.99.99')
-        if given_script_id in script_data.get('script_executions', []) and script_toversion >= given_version[1]:
-            if script_name not in script_names and script_name not in updated_script_names:
-                tests = set(script_data.get('tests', []))
+    return index
+
+
+def get_dependent_entities(index, entity_type, entity_id, given_version, integration_commands=()):
+    """Lists the scripts and playbooks which depend on the given entity and are relevant to its version.
+
+    :param index: The reverse dependency index, as built by build_reverse_dependency_index.
+    :param entity_type: One of 'integration', 'script' or 'playbook'.
+    :param entity_id: The integration id, or the name of the script/playbook.
+    :param given_version: The (fromversion, toversion) of the given entity.
+    :param integration_commands: The commands of the given integration.
+
+    :return: list of (entity type, entity data) tuples.
+    """
+    dependents = []
+    if entity_type == 'integration':
+        for command in integration_commands:
+            for playbook_data, bound_integration in index['command_to_playbooks'].get(command, []):
+                if not bound_integration or bound_integration == entity_id:
+                    dependents.append(('playbook', playbook_data))
+            for script_data, bound_integration in index['command_to_scripts'].get(command, []):
+                if bound_integration == entity_id:
+                    dependents.append(('script', script_data))
+
+    elif entity_type == 'script':
+        dependents.extend(('script', script_data) for script_data in index['script_to_scripts'].get(entity_id, []))
+        dependents.extend(('playbook', playbook_data)
+                          for playbook_data in index['script_to_playbooks'].get(entity_id, []))
+
+    elif entity_type == 'playbook':
+        dependents.extend(('playbook', playbook_data)
+                          for playbook_data in index['playbook_to_playbooks'].get(entity_id, []))
+
+    return [(dependent_type, dependent_data) for dependent_type, dependent_data in dependents
+            if dependent_data.get('toversion', '99.99.99') >= given_version[1]]
+
+
+@lru_cache(maxsize=None)
+def has_unit_tests(package_path):
+    """Checks whether the given script/integration package contains unit tests."""
+    return bool(glob.glob(package_path + "/*_test.py"))
+
+
+def enrich_affected_entities(index, script_to_version, playbook_to_version, integration_to_command,
+                             integration_to_version, script_names, playbook_names, updated_script_names,
+                             updated_playbook_names, catched_scripts, catched_playbooks, tests_set):
+    """Enrich the list of affected scripts/playbooks by your change set.
+
+    Walks the reverse dependency index breadth first, starting from the changed scripts, integrations and
+    playbooks. Every entity is expanded once, using its own version range.
+
+    :param index: The reverse dependency index, as built by build_reverse_dependency_index.
+    :param script_to_version: The versions of the scripts we changed.
+    :param playbook_to_version: The versions of the playbooks we changed.
+    :param integration_to_command: The commands of the integrations we changed.
+    :param integration_to_version: The versions of the integrations we changed.
+    :param script_names: The names of the scripts affected by your changes.
+    :param playbook_names: The names of the playbooks affected by your changes.
+    :param updated_script_names: The names of scripts we identify as affected to your change set.
+    :param updated_playbook_names: The names of playbooks we identify as affected to your change set.
+    :param catched_scripts: The names of scripts we found tests for.
+    :param catched_playbooks: The names of playbooks we found tests for.
+    :param tests_set: The names of the caught tests.
+    """
+    queue = deque()
+    queue.extend(('script', script_name, script_to_version[script_name]) for script_name in script_names)
+    queue.extend(('integration', integration_id, integration_to_version[integration_id])
+                 for integration_id in integration_to_command)
+    queue.extend(('playbook', playbook_name, playbook_to_version[playbook_name]) for playbook_name in playbook_names)
+
+    while queue:
+        entity_type, entity_id, given_version = queue.popleft()
+        dependents = get_dependent_entities(index, entity_type, entity_id, given_version,
+                                            integration_to_command.get(entity_id, ()))
+        for dependent_type, dependent_data in dependents:
+            dependent_name = dependent_data.get('name')
+            if dependent_type == 'script':
+                if dependent_name in script_names or dependent_name in updated_script_names:
+                    continue
+
+                tests = set(dependent_data.get('tests', []))
                 if tests:
-                    catched_scripts.add(script_name)
+                    catched_scripts.add(dependent_name)
                     update_test_set(tests, tests_set)
 
-                package_name = os.path.dirname(script_file_path)
-                if glob.glob(package_name + "/*_test.py"):
-                    catched_scripts.add(script_name)
-                    tests_set.add('Found a unittest for the script {}'.format(script_name))
+                if has_unit_tests(os.path.dirname(dependent_data.get('file_path', ''))):
+                    catched_scripts.add(dependent_name)
+                    tests_set.add('Found a unittest for the script {}'.format(dependent_name))
 
-                updated_script_names.add(script_name)
-                new_versions = (script_fromversion, script_toversion)
-                enrich_for_script_id(script_name, new_versions, script_names, script_set, playbook_set, playbook_names,
-                                     updated_script_names, updated_playbook_names, catched_scripts, catched_playbooks,
-                                     tests_set)
+                updated_script_names.add(dependent_name)
 
-    for playbook in playbook_set:
-        playbook_data = list(playbook.values())[0]
-        if playbook_data.get('deprecated', False):
-            continue
-        playbook_name = playbook_data.get('name')
-        playbook_fromversion = playbook_data.get('fromversion', '0.0.0')
-        playbook_toversion = playbook_data.get('toversion', '99.99.99')
-        if given_script_id in playbook_data.get('implementing_scripts', []) and playbook_toversion >= given_version[1]:
-            if playbook_name not in playbook_names and playbook_name not in updated_playbook_names:
-                tests = set(playbook_data.get('tests', []))
+            else:
+                if dependent_name in playbook_names or dependent_name in updated_playbook_names:
+                    continue
+
+                tests = set(dependent_data.get('tests', []))
                 if tests:
-                    catched_playbooks.add(playbook_name)
+                    catched_playbooks.add(dependent_name)
                     update_test_set(tests, tests_set)
 
-                updated_playbook_names.add(playbook_name)
-                new_versions = (playbook_fromversion, playbook_toversion)
-                enrich_for_playbook_id(playbook_name, new_versions, playbook_names, script_set, playbook_set,
-                                       updated_playbook_names, catched_playbooks, tests_set)
+                updated_playbook_names.add(dependent_name)
+
+            new_versions = (dependent_data.get('fromversion', '0.0.0'), dependent_data.get('toversion', '99.99.99'))
+            queue.append((dependent_type, dependent_name, new_versions))
 
 
 def update_test_set(tests, tests_set):
@@ -1,6 +1,7 @@
 import json
 
-from Tests.scripts.configure_tests import get_test_list, get_modified_files, RANDOM_TESTS_NUM
+from Tests.scripts.configure_tests import get_test_list, get_modified_files, RANDOM_TESTS_NUM, \
+    build_reverse_dependency_index, enrich_affected_entities
 
 with open('Tests/scripts/infrastructure_tests/tests_data/mock_id_set.json', 'r') as mock_id_set_f:
     MOCK_ID_SET = json.load(mock_id_set_f)
@@ -229,6 +230,52 @@ class TestNoChange:
         assert len(filterd_tests) >= RANDOM_TESTS_NUM
 
 
+class TestReverseDependencyIndex:
+    SCRIPT_SET = [
+        {'ScriptA': {'name': 'ScriptA', 'file_path': 'Packs/A/Scripts/ScriptA/ScriptA.yml',
+                     'depends_on': ['integ-command'], 'command_to_integration': {'integ-command': 'IntegA'},
+                     'tests': ['ScriptA - Test']}},
+        {'ScriptB': {'name': 'ScriptB', 'file_path': 'Packs/A/Scripts/ScriptB/ScriptB.yml',
+                     'script_executions': ['ScriptA'], 'tests': ['ScriptB - Test']}},
+        {'DeprecatedScript': {'name': 'DeprecatedScript', 'file_path': 'Packs/A/Scripts/Deprecated/Deprecated.yml',
+                              'script_executions': ['ScriptA'], 'deprecated': True,
+                              'tests': ['DeprecatedScript - Test']}}
+    ]
+    PLAYBOOK_SET = [
+        {'PlaybookA': {'name': 'PlaybookA', 'implementing_scripts': ['ScriptB'], 'tests': ['PlaybookA - Test']}},
+        {'PlaybookB': {'name': 'PlaybookB', 'implementing_playbooks': ['PlaybookA'], 'tests': ['PlaybookB - Test']}},
+        {'PastPlaybook': {'name': 'PastPlaybook', 'implementing_playbooks': ['PlaybookA'], 'toversion': '4.0.0',
+                          'tests': ['PastPlaybook - Test']}},
+        {'OtherIntegrationPlaybook': {'name': 'OtherIntegrationPlaybook',
+                                      'command_to_integration': {'integ-command': 'IntegB'},
+                                      'tests': ['OtherIntegrationPlaybook - Test']}}
+    ]
+
+    def test_enrich_affected_entities__transitive_dependents(self):
+        """
+        Given
+        - An integration used by a script, which is executed by another script used in a nested playbook.
+
+        When
+        - Enriching the affected entities of a change to the integration.
+
+        Then
+        - Ensure the whole dependency chain and its tests are collected.
+        - Ensure deprecated entities, out of version entities and other integrations' commands are ignored.
+        """
+        index = build_reverse_dependency_index(self.SCRIPT_SET, self.PLAYBOOK_SET)
+        updated_script_names, updated_playbook_names = set(), set()
+        catched_scripts, catched_playbooks, tests_set = set(), set(), set()
+
+        enrich_affected_entities(index, {}, {}, {'IntegA': ['integ-command']}, {'IntegA': ('4.5.0', '99.99.99')},
+                                 set(), set(), updated_script_names, updated_playbook_names, catched_scripts,
+                                 catched_playbooks, tests_set)
+
+        assert updated_script_names == {'ScriptA', 'ScriptB'}
+        assert updated_playbook_names == {'PlaybookA', 'PlaybookB'}
+        assert tests_set == {'ScriptA - Test', 'ScriptB - Test', 'PlaybookA - Test', 'PlaybookB - Test'}
+
+
 def create_get_modified_files_ret(modified_files_list=[], modified_tests_list=[], changed_common=[], is_conf_json=[],
                                   sample_tests=[], is_reputations_json=[], is_indicator_json=[]):
     """
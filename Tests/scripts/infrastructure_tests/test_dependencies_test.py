@@ -0,0 +1,67 @@
+import json
+
+from Tests.test_dependencies import get_cost_aware_tests_allocation_for_threads, record_test_duration, \
+    load_tests_duration_history, simulate_tests_allocation, TESTS_DURATION_HISTORY_SIZE
+
+MOCK_CONF = {
+    'tests': [
+        {'playbookID': 'long_test', 'integrations': 'IntegrationA'},
+        {'playbookID': 'dependent_test_1', 'integrations': ['IntegrationB']},
+        {'playbookID': 'dependent_test_2', 'integrations': ['IntegrationB', 'IntegrationC']},
+        {'playbookID': 'short_test_1'},
+        {'playbookID': 'short_test_2'},
+        {'playbookID': 'short_test_3'}
+    ]
+}
+
+MOCK_HISTORY = {
+    'long_test': [1800, 1600],
+    'dependent_test_1': [300],
+    'dependent_test_2': [200],
+    'short_test_1': [20],
+    'short_test_2': [20]
+}
+
+
+def test_record_test_duration(tmp_path):
+    """
+    Given
+    - A test playbook which ran more times than the history keeps.
+
+    When
+    - Recording its durations.
+
+    Then
+    - Ensure only the last durations are kept.
+    """
+    history_path = str(tmp_path / 'history.json')
+    for duration in range(TESTS_DURATION_HISTORY_SIZE + 5):
+        record_test_duration('test', duration, history_path)
+
+    history = load_tests_duration_history(history_path)
+    assert history['test'] == list(range(5, TESTS_DURATION_HISTORY_SIZE + 5))
+
+
+def test_cost_aware_tests_allocation(tmp_path):
+    """
+    Given
+    - A long test, two tests sharing an integration and a few short tests.
+
+    When
+    - Allocating the tests to two instances by their recorded durations.
+
+    Then
+    - Ensure the long test runs alone, and the dependent tests run on the same instance.
+    - Ensure the expected wall-clock time is the duration of the long test.
+    """
+    conf_path = tmp_path / 'conf.json'
+    conf_path.write_text(json.dumps(MOCK_CONF))
+
+    tests_allocation = get_cost_aware_tests_allocation_for_threads(2, str(conf_path), MOCK_HISTORY)
+
+    assert ['long_test'] in tests_allocation
+    other_allocation = tests_allocation[1 - tests_allocation.index(['long_test'])]
+    assert sorted(other_allocation) == ['dependent_test_1', 'dependent_test_2', 'short_test_1', 'short_test_2',
+                                        'short_test_3']
+    _, wall_clock_time = simulate_tests_allocation(tests_allocation, MOCK_HISTORY)
+    assert wall_clock_time == 1700
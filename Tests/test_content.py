@@ -18,7 +18,8 @@ from slackclient import SlackClient
 from Tests.mock_server import MITMProxy, AMIConnection
 from Tests.test_integration import Docker, test_integration, disable_all_integrations
 from demisto_sdk.commands.common.constants import RUN_ALL_TESTS_FORMAT, FILTER_CONF, PB_Status
-from Tests.test_dependencies import get_used_integrations, get_tests_allocation_for_threads
+from Tests.test_dependencies import get_used_integrations, get_tests_allocation_for_threads, record_test_duration, \
+    TESTS_DURATION_HISTORY_PATH
 from demisto_sdk.commands.common.tools import print_color, print_error, print_warning, \
     LOG_COLORS, str2bool, server_version_compare
 
@@ -628,9 +629,11 @@ def run_test_scenario(tests_settings, t, proxy, default_test_timeout, skipped_te
         text = stdout if not stderr else stderr
         send_slack_message(slack, SLACK_MEM_CHANNEL_ID, text, 'Content CircleCI', 'False')
 
+    test_start_time = time.time()
     run_test(tests_settings, demisto_api_key, proxy, failed_playbooks, integrations, unmockable_integrations,
              playbook_id, succeed_playbooks, test_message, test_options, slack, circle_ci,
              build_number, server, build_name, prints_manager, is_ami, thread_index=thread_index)
+    record_test_duration(playbook_id, time.time() - test_start_time)
 
 
 def get_and_print_server_numeric_version(tests_settings):
@@ -842,7 +845,8 @@ def manage_tests(tests_settings):
             """
             If the build is a nightly build, run tests in parallel.
             """
-            test_allocation = get_tests_allocation_for_threads(number_of_instances, tests_settings.conf_path)
+            test_allocation = get_tests_allocation_for_threads(number_of_instances, tests_settings.conf_path,
+                                                               TESTS_DURATION_HISTORY_PATH)
             current_thread_index = 0
             all_unmockable_tests_list = get_unmockable_tests(tests_settings)
             threads_array = []
@@ -1,5 +1,15 @@
+import os
 import json
 import math
+import heapq
+import argparse
+import threading
+
+TESTS_DURATION_HISTORY_PATH = './Tests/tests_duration_history.json'
+TESTS_DURATION_HISTORY_SIZE = 10  # The number of last durations kept per test playbook.
+DEFAULT_TEST_DURATION = 180  # In seconds, used for test playbooks without a recorded history.
+
+_tests_duration_history_lock = threading.Lock()
 
 
 class TestVertex:
@@ -153,7 +163,7 @@ def get_dependent_integrations_clusters_data(tests_file_path, dependent_tests):
     return tests_graph.clusters
 
 
-def get_tests_allocation_for_threads(number_of_instances, tests_file_path):
+def get_count_based_tests_allocation_for_threads(number_of_instances, tests_file_path):
     dependent_tests, independent_tests, all_tests = get_test_dependencies(tests_file_path)
     dependent_tests_clusters = get_dependent_integrations_clusters_data(tests_file_path, dependent_tests)
     dependent_tests_clusters.sort(key=len, reverse=True)  # Sort the clusters from biggest to smallest
@@ -204,3 +214,161 @@ def get_tests_allocation_for_threads(number_of_instances, tests_file_path):
 
         tests_allocation.append(current_allocation)
     return tests_allocation
+
+
+def load_tests_duration_history(history_path=TESTS_DURATION_HISTORY_PATH):
+    """Loads the recorded test durations.
+
+    Args:
+        history_path (str): The path of the tests duration history file.
+
+    Returns:
+        dict: A mapping between a test playbook ID and its last recorded durations (in seconds).
+    """
+    if not os.path.isfile(history_path):
+        return {}
+
+    with open(history_path, 'r') as history_file:
+        try:
+            return json.load(history_file)
+        except ValueError:
+            return {}
+
+
+def record_test_duration(playbook_id, duration, history_path=TESTS_DURATION_HISTORY_PATH):
+    """Appends a test playbook run duration to the tests duration history file.
+
+    Safe to call from the threads that run the tests in parallel.
+
+    Args:
+        playbook_id (str): The ID of the test playbook.
+        duration (float): The run duration of the test playbook, in seconds.
+        history_path (str): The path of the tests duration history file.
+    """
+    with _tests_duration_history_lock:
+        history = load_tests_duration_history(history_path)
+        playbook_durations = history.get(playbook_id, [])
+        playbook_durations.append(round(duration, 2))
+        history[playbook_id] = playbook_durations[-TESTS_DURATION_HISTORY_SIZE:]
+
+        with open(history_path, 'w') as history_file:
+            json.dump(history, history_file, indent=4, sort_keys=True)
+
+
+def get_tests_expected_durations(tests, history):
+    """Estimates the duration of each test playbook from its recorded history.
+
+    Tests with no recorded history are given the average duration of the recorded tests, or
+    DEFAULT_TEST_DURATION if no test was recorded.
+
+    Args:
+        tests (list): The test playbook IDs.
+        history (dict): The tests duration history, as returned by load_tests_duration_history.
+
+    Returns:
+        dict: A mapping between a test playbook ID and its expected duration (in seconds).
+    """
+    recorded_durations = {test: sum(durations) / len(durations) for test, durations in history.items() if durations}
+    if recorded_durations:
+        default_duration = sum(recorded_durations.values()) / len(recorded_durations)
+    else:
+        default_duration = DEFAULT_TEST_DURATION
+
+    return {test: recorded_durations.get(test, default_duration) for test in tests}
+
+
+def get_cost_aware_tests_allocation_for_threads(number_of_instances, tests_file_path, history):
+    """Allocates the tests to the instances, balancing the expected run time of each instance.
+
+    Uses the longest processing time first heuristic: the clusters of tests that use mutual integrations, and the
+    independent tests, are sorted by their expected duration and each is assigned to the least loaded instance.
+    The tests of a cluster are always allocated to the same instance.
+
+    Args:
+        number_of_instances (int): The number of instances to allocate the tests to.
+        tests_file_path (str): The path of the conf.json file.
+        history (dict): The tests duration history, as returned by load_tests_duration_history.
+
+    Returns:
+        list: A list of tests allocations, one per instance.
+    """
+    dependent_tests, independent_tests, all_tests = get_test_dependencies(tests_file_path)
+    dependent_tests_clusters = get_dependent_integrations_clusters_data(tests_file_path, dependent_tests)
+    expected_durations = get_tests_expected_durations(all_tests, history)
+
+    tests_groups = dependent_tests_clusters + [[test_name] for test_name in independent_tests]
+    groups_durations = [(sum(expected_durations[test_name] for test_name in group), index, group)
+                        for index, group in enumerate(tests_groups)]
+    groups_durations.sort(key=lambda group_duration: (-group_duration[0], group_duration[1]))
+
+    tests_allocation = [[] for _ in range(number_of_instances)]
+    instances_load = [(0, instance_index) for instance_index in range(number_of_instances)]
+    for group_duration, _, group in groups_durations:
+        instance_load, instance_index = heapq.heappop(instances_load)
+        tests_allocation[instance_index].extend(group)
+        heapq.heappush(instances_load, (instance_load + group_duration, instance_index))
+
+    return tests_allocation
+
+
+def simulate_tests_allocation(tests_allocation, history):
+    """Replays the tests duration history on a tests allocation.
+
+    Args:
+        tests_allocation (list): A list of tests allocations, one per instance.
+        history (dict): The tests duration history, as returned by load_tests_duration_history.
+
+    Returns:
+        tuple: The expected run time of each instance (in seconds), and the expected wall-clock time of the run.
+    """
+    all_tests = [test_name for allocation in tests_allocation for test_name in allocation]
+    expected_durations = get_tests_expected_durations(all_tests, history)
+    instances_run_time = [sum(expected_durations[test_name] for test_name in allocation)
+                          for allocation in tests_allocation]
+    return instances_run_time, max(instances_run_time) if instances_run_time else 0
+
+
+def get_tests_allocation_for_threads(number_of_instances, tests_file_path, history_path=None):
+    """Allocates the tests to the instances.
+
+    When a tests duration history is available, the tests are allocated by their expected durations.
+    Otherwise, the tests are divided equally by their count.
+
+    Args:
+        number_of_instances (int): The number of instances to allocate the tests to.
+        tests_file_path (str): The path of the conf.json file.
+        history_path (str): The path of the tests duration history file.
+
+    Returns:
+        list: A list of tests allocations, one per instance.
+    """
+    history = load_tests_duration_history(history_path) if history_path else {}
+    if history:
+        return get_cost_aware_tests_allocation_for_threads(number_of_instances, tests_file_path, history)
+
+    return get_count_based_tests_allocation_for_threads(number_of_instances, tests_file_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Predicts the wall-clock time of the tests run by replaying the '
+                                                 'tests duration history')
+    parser.add_argument('-c', '--conf', help='Path to conf file', default='./Tests/conf.json')
+    parser.add_argument('-d', '--history', help='Path to the tests duration history file',
+                        default=TESTS_DURATION_HISTORY_PATH)
+    parser.add_argument('-n', '--instances', help='The number of instances to simulate', type=int, default=4)
+    options = parser.parse_args()
+
+    history = load_tests_duration_history(options.history)
+    allocations = [
+        ('count based', get_count_based_tests_allocation_for_threads(options.instances, options.conf)),
+        ('cost aware', get_cost_aware_tests_allocation_for_threads(options.instances, options.conf, history))
+    ]
+    for allocation_name, tests_allocation in allocations:
+        instances_run_time, wall_clock_time = simulate_tests_allocation(tests_allocation, history)
+        print('{} allocation - expected wall-clock time: {:.0f} minutes, per instance: {}'.format(
+            allocation_name, wall_clock_time / 60, ', '.join('{:.0f}'.format(run_time / 60)
+                                                             for run_time in instances_run_time)))
+
+
+if __name__ == '__main__':
+    main()